@@ -0,0 +1,123 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Synthetic molecules for the benchmarks.
+
+The basis is STO-3G for H and C (unnormalized contraction coefficients are
+fine for timing purposes). Atoms are placed on a simple cubic lattice, which
+gives a realistic number of close neighbours per atom.
+"""
+
+from __future__ import annotations
+
+import math
+
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis, CGTOBasis
+
+__all__ = ["lattice_positions", "make_atombases"]
+
+
+_STO3G = {
+    1: [
+        (
+            0,
+            [3.42525091, 0.62391373, 0.16885540],
+            [0.15432897, 0.53532814, 0.44463454],
+        ),
+    ],
+    6: [
+        (
+            0,
+            [71.6168370, 13.0450960, 3.5305122],
+            [0.15432897, 0.53532814, 0.44463454],
+        ),
+        (
+            0,
+            [2.9412494, 0.6834831, 0.2222899],
+            [-0.09996723, 0.39951283, 0.70011547],
+        ),
+        (
+            1,
+            [2.9412494, 0.6834831, 0.2222899],
+            [0.15591627, 0.60768372, 0.39195739],
+        ),
+    ],
+}
+
+
+def lattice_positions(
+    natoms: int, spacing: float = 2.5, dtype: torch.dtype = torch.double
+) -> torch.Tensor:
+    """
+    Place `natoms` atoms on a simple cubic lattice.
+
+    Parameters
+    ----------
+    natoms : int
+        Number of atoms.
+    spacing : float, optional
+        Lattice spacing in Bohr. Defaults to `2.5`.
+    dtype : torch.dtype, optional
+        Floating point type of the positions. Defaults to `torch.double`.
+
+    Returns
+    -------
+    torch.Tensor
+        Positions of shape `(natoms, 3)`.
+    """
+    n = math.ceil(natoms ** (1 / 3))
+    r = torch.arange(n, dtype=dtype) * spacing
+    grid = torch.stack(torch.meshgrid(r, r, r, indexing="ij"), dim=-1)
+    return grid.reshape(-1, 3)[:natoms].contiguous()
+
+
+def make_atombases(
+    positions: torch.Tensor, numbers: list[int] | None = None
+) -> list[AtomCGTOBasis]:
+    """
+    Create the basis of a hydrocarbon-like system.
+
+    Parameters
+    ----------
+    positions : torch.Tensor
+        Positions of shape `(natoms, 3)`.
+    numbers : list[int] | None, optional
+        Atomic numbers (1 or 6). Defaults to alternating C and H.
+
+    Returns
+    -------
+    list[AtomCGTOBasis]
+        The basis of all atoms.
+    """
+    dd = {"dtype": positions.dtype, "device": positions.device}
+    if numbers is None:
+        numbers = [6 if i % 3 == 0 else 1 for i in range(positions.shape[0])]
+
+    bases = {
+        z: [
+            CGTOBasis(l, torch.tensor(a, **dd), torch.tensor(c, **dd))
+            for l, a, c in shells
+        ]
+        for z, shells in _STO3G.items()
+    }
+
+    return [
+        AtomCGTOBasis(atomz=z, bases=bases[z], pos=pos)
+        for z, pos in zip(numbers, positions)
+    ]
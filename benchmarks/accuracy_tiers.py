@@ -0,0 +1,83 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark: Accuracy Tiers
+=========================
+
+Validation of the accuracy tiers (see :meth:`LibcintWrapper.set_accuracy`).
+For every molecule of the reference set and every tier, the maximum absolute
+deviation of the integrals from the tight tier and the speedup over the tight
+tier are reported.
+
+Run with
+
+.. code-block:: console
+
+    python benchmarks/accuracy_tiers.py
+"""
+
+from __future__ import annotations
+
+import timeit
+
+from _molecules import lattice_positions, make_atombases
+
+from tad_libcint import LibcintWrapper
+from tad_libcint.interface.integrals import int1e
+from tad_libcint.interface.wrapper import ACCURACY_TIERS
+
+NATOMS = [10, 50, 200]
+SPACINGS = [1.5, 2.5]
+INTEGRALS = ["ovlp", "kin", "nuc"]
+
+
+def main() -> None:
+    print(
+        f"{'natoms':>6} {'spacing':>8} {'intor':>6} {'tier':>8} "
+        f"{'max error':>12} {'time (s)':>10} {'speedup':>8}"
+    )
+    for natoms in NATOMS:
+        for spacing in SPACINGS:
+            pos = lattice_positions(natoms, spacing=spacing)
+            wrapper = LibcintWrapper(make_atombases(pos))
+
+            for shortname in INTEGRALS:
+
+                def run() -> None:
+                    int1e(shortname, wrapper, hermitian=True)
+
+                ref = None
+                t_ref = 0.0
+                for tier in ACCURACY_TIERS:
+                    wrapper.set_accuracy(tier)
+                    res = int1e(shortname, wrapper, hermitian=True)
+                    t = min(timeit.repeat(run, number=3, repeat=3)) / 3
+
+                    if ref is None:
+                        ref, t_ref = res, t
+                    err = float((res - ref).abs().max())
+
+                    print(
+                        f"{natoms:6d} {spacing:8.2f} {shortname:>6} "
+                        f"{tier:>8} {err:12.3e} {t:10.5f} {t_ref / t:8.2f}"
+                    )
+
+                wrapper.set_accuracy("tight")
+
+
+if __name__ == "__main__":
+    main()
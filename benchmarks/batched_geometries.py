@@ -0,0 +1,69 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark: Batched Geometries
+=============================
+
+Overlap integrals of the same molecule at many geometries: a Python loop with
+a new wrapper per geometry against a single batched call with `positions`.
+
+Run with
+
+.. code-block:: console
+
+    python benchmarks/batched_geometries.py
+"""
+
+from __future__ import annotations
+
+import timeit
+
+import torch
+from _molecules import lattice_positions, make_atombases
+
+from tad_libcint import LibcintWrapper
+from tad_libcint.interface.integrals import overlap
+
+NATOMS = 20
+NBATCH = [10, 100, 500]
+
+
+def main() -> None:
+    pos0 = lattice_positions(NATOMS)
+    wrapper = LibcintWrapper(make_atombases(pos0))
+
+    print(f"{'nbatch':>8} {'loop (s)':>12} {'batch (s)':>12}")
+    for nbatch in NBATCH:
+        torch.manual_seed(0)
+        positions = pos0 + 0.1 * torch.rand(
+            nbatch, *pos0.shape, dtype=pos0.dtype
+        )
+
+        def loop() -> None:
+            for pos in positions:
+                overlap(LibcintWrapper(make_atombases(pos)))
+
+        def batch() -> None:
+            overlap(wrapper, positions=positions)
+
+        t_loop = min(timeit.repeat(loop, number=1, repeat=3))
+        t_batch = min(timeit.repeat(batch, number=1, repeat=3))
+        print(f"{nbatch:8d} {t_loop:12.4f} {t_batch:12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark: FFI Overhead
+=======================
+
+Per-call overhead of the ctypes interface. The untyped calls, in which every
+argument is wrapped in a ctypes object (`int2ctypes`, `np2ctypes`) and the
+function is looked up on the library each time, are compared against the
+typed functions registered in :mod:`tad_libcint.api`, which are cached by the
+loader and receive plain integers and raw addresses.
+
+Run with
+
+.. code-block:: console
+
+    python benchmarks/ffi_overhead.py
+"""
+
+from __future__ import annotations
+
+import ctypes
+import timeit
+
+from _molecules import lattice_positions, make_atombases
+
+from tad_libcint import LibcintWrapper
+from tad_libcint.api import CINT
+from tad_libcint.interface.intor import Intor
+from tad_libcint.interface.namemanager import get_namemgr
+from tad_libcint.interface.utils import int2ctypes, np2ctypes
+
+NUMBER = 100_000
+NUMBER_INTOR = 100
+
+
+def main() -> None:
+    wrapper = LibcintWrapper(make_atombases(lattice_positions(10)))
+    bas = wrapper.bas
+    nbas = bas.shape[0]
+
+    # reference: untyped lookup and argument conversion on every call
+    lib = ctypes.cdll.LoadLibrary(str(CINT.path))
+
+    def untyped() -> None:
+        for i in range(nbas):
+            lib.CINTcgto_spheric(int2ctypes(i), np2ctypes(bas))
+
+    # typed: cached function, raw address
+    typed_fcn = CINT.CINTcgto_spheric
+    bas_ptr = bas.ctypes.data
+
+    def typed() -> None:
+        for i in range(nbas):
+            typed_fcn(i, bas_ptr)
+
+    n = max(NUMBER // nbas, 1)
+    t_untyped = min(timeit.repeat(untyped, number=n, repeat=5)) / (n * nbas)
+    t_typed = min(timeit.repeat(typed, number=n, repeat=5)) / (n * nbas)
+
+    print("CINTcgto_spheric (per call)")
+    print(f"  untyped : {t_untyped * 1e9:10.1f} ns")
+    print(f"  typed   : {t_typed * 1e9:10.1f} ns")
+
+    # full driver call for a small system, i.e., dominated by the overhead
+    intor = Intor(get_namemgr("int1e", "ovlp"), [wrapper, wrapper])
+    t_intor = min(timeit.repeat(intor.calc, number=NUMBER_INTOR, repeat=5))
+    t_intor /= NUMBER_INTOR
+
+    print(f"GTOint2c ({wrapper.nao()} AOs, per call)")
+    print(f"  typed   : {t_intor * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark: Wrapper Construction
+===============================
+
+Construction time of :class:`~tad_libcint.LibcintWrapper` against the number
+of atoms. The overlap integral of the smaller systems is timed for reference.
+
+Run with
+
+.. code-block:: console
+
+    python benchmarks/wrapper_construction.py
+"""
+
+from __future__ import annotations
+
+import timeit
+
+from _molecules import lattice_positions, make_atombases
+
+from tad_libcint import LibcintWrapper
+from tad_libcint.interface.integrals import overlap
+
+NATOMS = [100, 500, 1000, 5000, 10000, 20000]
+NATOMS_OVERLAP = 2000
+
+
+def main() -> None:
+    print(f"{'natoms':>8} {'nao':>8} {'wrapper (s)':>12} {'overlap (s)':>12}")
+
+    for natoms in NATOMS:
+        atombases = make_atombases(lattice_positions(natoms))
+
+        repeats = 3 if natoms < 5000 else 1
+        t_wrapper = min(
+            timeit.repeat(
+                lambda: LibcintWrapper(atombases), number=1, repeat=repeats
+            )
+        )
+
+        wrapper = LibcintWrapper(atombases)
+        if natoms <= NATOMS_OVERLAP:
+            t_ovlp = min(
+                timeit.repeat(lambda: overlap(wrapper), number=1, repeat=3)
+            )
+            ovlp = f"{t_ovlp:12.4f}"
+        else:
+            ovlp = f"{'-':>12}"
+
+        print(f"{natoms:8d} {wrapper.nao():8d} {t_wrapper:12.4f} {ovlp}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,18 +26,162 @@ loaded lazily when the first attribute is accessed.
 
 The shared objects are expected to be located in the same directory as this
 module.
+
+The signatures of the C functions called in hot loops are declared here. Those
+functions take plain Python integers for `int` arguments and integer addresses
+(e.g., `ndarray.ctypes.data` or `Tensor.data_ptr()`) for pointer arguments.
+The integral functions themselves (e.g., `int1e_ovlp_sph`) are only passed as
+function pointers to the drivers and remain untyped.
 """
 
+from ctypes import c_int, c_void_p
 from pathlib import Path
 
 from tad_libcint.lazyloader import LazySharedLibraryLoader
 
-__all__ = ["CINT", "CGTO"]
+__all__ = ["CINT", "CGTO", "NP"]
+
+
+CINT_SIGNATURES = {
+    # int CINTcgto_spheric(int bas_id, int *bas)
+    "CINTcgto_spheric": (c_int, [c_int, c_void_p]),
+    "CINTcgto_cart": (c_int, [c_int, c_void_p]),
+    # void <intor>_optimizer(CINTOpt **opt, int *atm, int natm, int *bas,
+    #                        int nbas, double *env)
+    "*_optimizer": (
+        None,
+        [c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void CINTdel_optimizer(CINTOpt **opt)
+    "CINTdel_optimizer": (None, [c_void_p]),
+}
+
+CGTO_SIGNATURES = {
+    # void GTOint2c(int (*intor)(), double *mat, int comp, int hermi,
+    #               int *shls_slice, int *ao_loc, CINTOpt *opt,
+    #               int *atm, int natm, int *bas, int nbas, double *env)
+    "GTOint2c": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # same signature, output in C-order
+    "GTOint2c_corder": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOint2c_batch(int (*intor)(), double *mat, int comp, int hermi,
+    #                     int *shls_slice, int *ao_loc, double *coords,
+    #                     int nbatch, int *atm, int natm, int *bas, int nbas,
+    #                     double *env, int nenv)
+    "GTOint2c_batch": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_void_p, c_void_p]
+        + [c_int, c_void_p, c_int, c_void_p, c_int, c_void_p, c_int],
+    ),
+    # void GTOint2c_padded(int (*intor)(), double *mat, int comp, int hermi,
+    #                      int *mol_shl_loc, int *mol_atm_loc, int nmol,
+    #                      int nao_pad, int *ao_loc, int *atm, int natm,
+    #                      int *bas, int nbas, double *env)
+    "GTOint2c_padded": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_void_p, c_int, c_int]
+        + [c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOint2c_blockdiag(int (*intor)(), double *mat, int comp,
+    #                         int hermi, int *frag_shl_loc, int *frag_atm_loc,
+    #                         int nfrag, int *ao_loc, int *atm, int natm,
+    #                         int *bas, int nbas, double *env)
+    "GTOint2c_blockdiag": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_void_p, c_int]
+        + [c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOint2c_pairs(int (*intor)(), double *out, int comp, int hermi,
+    #                     int *pairs, int npairs, int64_t *block_loc,
+    #                     int *shls_slice, int *ao_loc, CINTOpt *opt,
+    #                     int *atm, int natm, int *bas, int nbas, double *env)
+    "GTOint2c_pairs": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_void_p, c_int, c_void_p]
+        + [c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOint2c_block_norms(int (*intor)(), double *out, int comp,
+    #                           int hermi, int norm_type, int *shls_slice,
+    #                           int *ao_loc, CINTOpt *opt, int *atm, int natm,
+    #                           int *bas, int nbas, double *env)
+    "GTOint2c_block_norms": (
+        None,
+        [c_void_p, c_void_p, c_int, c_int, c_int, c_void_p, c_void_p]
+        + [c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOgrad_int2c(int (*intor_i)(), int (*intor_j)(), int trans_j,
+    #                    double *grad, double *gout, int *pairs, int npairs,
+    #                    int *shls_slice, int *ao_loc, CINTOpt *opt_i,
+    #                    CINTOpt *opt_j, int *atm, int natm, int *bas,
+    #                    int nbas, double *env)
+    "GTOgrad_int2c": (
+        None,
+        [c_void_p, c_void_p, c_int, c_void_p, c_void_p, c_void_p, c_int]
+        + [c_void_p, c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOgrad_prim_int2c(int (*intor)(), int (*intor_i)(),
+    #                         int (*intor_j)(), int trans_j, double *gval,
+    #                         double *gderiv, double *gout, int *pairs,
+    #                         int npairs, int *shls_slice, int *ao_loc,
+    #                         int *atm, int natm, int *bas, int nbas,
+    #                         double *env)
+    "GTOgrad_prim_int2c": (
+        None,
+        [c_void_p, c_void_p, c_void_p, c_int, c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOhess_int2c(int (*intor)(), int (*intor_ab)(), double *hess,
+    #                    double *dm, int *pairs, int npairs, int *shls_slice,
+    #                    int *ao_loc, CINTOpt *opt, CINTOpt *opt_ab,
+    #                    int *atm, int natm, int *bas, int nbas, double *env)
+    "GTOhess_int2c": (
+        None,
+        [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p, c_int]
+        + [c_void_p, c_void_p, c_void_p, c_void_p]
+        + [c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOoverlap_cond(double *cond, int *shls_slice,
+    #                      int *atm, int natm, int *bas, int nbas, double *env)
+    "GTOoverlap_cond": (
+        None,
+        [c_void_p, c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p],
+    ),
+    # void GTOoverlap_cond_pairs(double *cond, int *pairs, int npairs,
+    #                            int *atm, int natm, int *bas, int nbas,
+    #                            double *env)
+    "GTOoverlap_cond_pairs": (
+        None,
+        [c_void_p, c_void_p, c_int, c_void_p, c_int, c_void_p, c_int]
+        + [c_void_p],
+    ),
+    # void CINTdel_optimizer(CINTOpt **opt)
+    "CINTdel_optimizer": (None, [c_void_p]),
+}
 
+NP_SIGNATURES = {
+    # void NPcondense(double (*op)(double *, int, int, int), double *out,
+    #                 double *a, int *loc_x, int *loc_y, int nloc_x,
+    #                 int nloc_y)
+    "NPcondense": (
+        None,
+        [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p, c_int, c_int],
+    ),
+}
 
 relpath = Path(__file__).parent.resolve()
-CINT = LazySharedLibraryLoader("cint", relpath)
-CGTO = LazySharedLibraryLoader("cgto", relpath)
+CINT = LazySharedLibraryLoader("cint", relpath, CINT_SIGNATURES)
+CGTO = LazySharedLibraryLoader("cgto", relpath, CGTO_SIGNATURES)
+NP = LazySharedLibraryLoader("np_helper", relpath, NP_SIGNATURES)
 # CPBC = LazySharedLibraryLoader("cpbc", relpath)  # currently not available
 # CSYMM = LazySharedLibraryLoader("symm", relpath)  # currently not available
 # CVHF = LazySharedLibraryLoader("CVHF", relpath)  # currently not available
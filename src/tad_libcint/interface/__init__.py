@@ -21,5 +21,9 @@ Interface
 This subpackage contains the interface to the *libcint* library.
 """
 
+from .batch import *
+from .blocksparse import *
+from .condense import *
 from .integrals import *
+from .workspace import *
 from .wrapper import *
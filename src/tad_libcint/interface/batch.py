@@ -0,0 +1,283 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Batched Libcint Wrapper
+==================================
+
+Wrapper for a batch of different molecules, as required for batched
+calculations with molecules that are padded to a common size.
+
+All molecules are stored consecutively in one set of libcint arrays. The
+integrals are evaluated in a single call to libcint, in which the molecules
+are distributed over the threads and every molecule is treated as an
+independent system. The results are returned with a leading batch dimension
+and zero-padded to the largest number of atomic orbitals in the batch.
+
+Padding atoms (no basis functions and zero nuclear charge) are removed and
+never passed to libcint.
+
+Example
+-------
+>>> wrapper = BatchedLibcintWrapper([atombases_mol1, atombases_mol2])
+>>> s = overlap(wrapper)  # (2, maxnao, maxnao)
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis
+from tad_libcint.typing import Tensor
+
+from .wrapper import LibcintWrapper
+
+__all__ = ["BatchedLibcintWrapper"]
+
+
+class BatchedLibcintWrapper:
+    """
+    Wrapper for a batch of molecules with zero-padded integrals.
+    """
+
+    wrapper: LibcintWrapper
+    """Wrapper containing all molecules of the batch."""
+
+    mol_shl_loc: np.ndarray
+    """Shell offsets of the molecules, shape `(nmol + 1,)`."""
+
+    mol_atm_loc: np.ndarray
+    """Atom offsets of the molecules, shape `(nmol + 1,)`."""
+
+    def __init__(
+        self,
+        atombases: list[list[AtomCGTOBasis]],
+        spherical: bool = True,
+        accuracy: str = "tight",
+    ) -> None:
+        mols = [[ab for ab in mol if not _is_padding(ab)] for mol in atombases]
+        if any(len(mol) == 0 for mol in mols):
+            raise ValueError("Every molecule requires at least one atom.")
+
+        nshells = [sum(len(ab.bases) for ab in mol) for mol in mols]
+        natoms = [len(mol) for mol in mols]
+
+        wrapper = LibcintWrapper(
+            [ab for mol in mols for ab in mol],
+            spherical=spherical,
+            accuracy=accuracy,
+        )
+        self._setup(wrapper, _offsets(nshells), _offsets(natoms))
+
+    @classmethod
+    def from_wrapper(
+        cls,
+        wrapper: LibcintWrapper,
+        mol_shl_loc: np.ndarray,
+        mol_atm_loc: np.ndarray,
+    ) -> BatchedLibcintWrapper:
+        """
+        Create the batched wrapper from a wrapper that already contains all
+        molecules.
+
+        Parameters
+        ----------
+        wrapper : LibcintWrapper
+            Wrapper containing all molecules.
+        mol_shl_loc : np.ndarray
+            Shell offsets of the molecules.
+        mol_atm_loc : np.ndarray
+            Atom offsets of the molecules.
+
+        Returns
+        -------
+        BatchedLibcintWrapper
+            Batched wrapper.
+        """
+        obj = cls.__new__(cls)
+        obj._setup(wrapper, mol_shl_loc, mol_atm_loc)
+        return obj
+
+    def _setup(
+        self,
+        wrapper: LibcintWrapper,
+        mol_shl_loc: np.ndarray,
+        mol_atm_loc: np.ndarray,
+    ) -> None:
+        self.wrapper = wrapper
+        self.mol_shl_loc = np.ascontiguousarray(mol_shl_loc, dtype=np.int32)
+        self.mol_atm_loc = np.ascontiguousarray(mol_atm_loc, dtype=np.int32)
+        self._uncontracted: tuple[BatchedLibcintWrapper, Tensor] | None = None
+
+        # AO offsets of the molecules and position of every AO in the padded
+        # layout (molecule, local AO)
+        mol_ao_loc = wrapper.full_shell_to_aoloc[self.mol_shl_loc]
+        self._nao_pad = int(np.max(np.diff(mol_ao_loc)))
+
+        nao = wrapper.nao()
+        ao_to_mol = np.repeat(np.arange(self.nmol), np.diff(mol_ao_loc))
+        local = np.arange(nao) - mol_ao_loc[ao_to_mol]
+        self._ao_to_padded = torch.tensor(
+            ao_to_mol * self._nao_pad + local,
+            dtype=torch.long,
+            device=wrapper.device,
+        )
+
+    @property
+    def nmol(self) -> int:
+        # number of molecules in the batch
+        return self.mol_shl_loc.shape[0] - 1
+
+    @property
+    def natoms(self) -> int:
+        # total number of (non-padding) atoms in the batch
+        return self.wrapper.natoms
+
+    @property
+    def params(self) -> tuple[Tensor, Tensor, Tensor]:
+        # parameters of all molecules (coefficients, exponents, positions)
+        return self.wrapper.params
+
+    @property
+    def spherical(self) -> bool:
+        return self.wrapper.spherical
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return self.wrapper.dtype
+
+    @property
+    def device(self) -> torch.device:
+        return self.wrapper.device
+
+    def nao(self) -> int:
+        # padded number of atomic orbitals
+        return self._nao_pad
+
+    def pad(self, x: Tensor, dim: int = -1, value: float = 0.0) -> Tensor:
+        """
+        Scatter a tensor over the atomic orbitals of all molecules into the
+        padded layout, which adds a batch dimension in front.
+
+        Parameters
+        ----------
+        x : Tensor
+            Tensor of shape `(..., nao_total, ...)`.
+        dim : int, optional
+            Dimension of the atomic orbitals. Defaults to `-1`.
+        value : float, optional
+            Value of the padding. Defaults to `0.0`.
+
+        Returns
+        -------
+        Tensor
+            Tensor of shape `(nmol, ..., nao_pad, ...)`.
+        """
+        x = torch.movedim(x, dim, 0)
+        out = x.new_full((self.nmol * self._nao_pad, *x.shape[1:]), value)
+        out = out.index_copy(0, self._ao_to_padded, x)
+        out = out.reshape(self.nmol, self._nao_pad, *x.shape[1:])
+        return torch.movedim(out, 1, dim if dim < 0 else dim + 1)
+
+    def ao_to_atom(self, fill: int) -> Tensor:
+        """
+        Mapping from the padded atomic orbitals to the (global) atom index.
+
+        Parameters
+        ----------
+        fill : int
+            Atom index of the padding (e.g., a dummy atom).
+
+        Returns
+        -------
+        Tensor
+            Mapping of shape `(nmol, nao_pad)`.
+        """
+        return self.pad(self.wrapper.ao_to_atom(), value=fill)
+
+    def ao_to_shell(self, fill: int) -> Tensor:
+        """
+        Mapping from the padded atomic orbitals to the (global) shell index.
+
+        Parameters
+        ----------
+        fill : int
+            Shell index of the padding (e.g., a dummy shell).
+
+        Returns
+        -------
+        Tensor
+            Mapping of shape `(nmol, nao_pad)`.
+        """
+        return self.pad(self.wrapper.ao_to_shell(), value=fill)
+
+    def get_uncontracted_wrapper(self) -> tuple[BatchedLibcintWrapper, Tensor]:
+        """
+        Create the batched wrapper of the uncontracted basis set (for the
+        backward calculation of the integrals).
+
+        Returns
+        -------
+        tuple[BatchedLibcintWrapper, Tensor]
+            The uncontracted batched wrapper and the mapping from the padded
+            uncontracted atomic orbitals to the local (contracted) atomic
+            orbital of the same molecule, shape `(nmol, nao_pad_u)`. Padding
+            is mapped to 0.
+        """
+        if self._uncontracted is None:
+            u_wrapper, uao2ao = self.wrapper.get_uncontracted_wrapper()
+
+            # every shell becomes one shell per primitive
+            ushl_loc = _offsets(self.wrapper.ngauss_at_shell)
+            u_batched = BatchedLibcintWrapper.from_wrapper(
+                u_wrapper, ushl_loc[self.mol_shl_loc], self.mol_atm_loc
+            )
+
+            # local contracted AO index within the molecule
+            mol_ao_loc = self.wrapper.full_shell_to_aoloc[self.mol_shl_loc]
+            ao_to_mol = np.repeat(np.arange(self.nmol), np.diff(mol_ao_loc))
+            local = torch.tensor(
+                np.arange(self.wrapper.nao()) - mol_ao_loc[ao_to_mol],
+                dtype=torch.long,
+                device=self.device,
+            )
+            uao2ao_pad = u_batched.pad(local[uao2ao], value=0)
+            self._uncontracted = (u_batched, uao2ao_pad)
+
+        return self._uncontracted
+
+    def __len__(self) -> int:
+        return self.nmol
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(nmol={self.nmol}, "
+            f"nao_pad={self._nao_pad})"
+        )
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+def _is_padding(atombasis: AtomCGTOBasis) -> bool:
+    # padding atoms have neither basis functions nor a nuclear charge
+    return len(atombasis.bases) == 0 and int(atombasis.atomz) == 0
+
+
+def _offsets(counts: list[int]) -> np.ndarray:
+    # offsets (including the total) from the counts
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
@@ -0,0 +1,369 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Block-Sparse Matrices
+================================
+
+Storage of 2-centre integrals in shell-pair blocks, as obtained from a list of
+shell pairs (e.g., after screening). Only the blocks of the listed shell pairs
+are stored, i.e., the memory scales with the number of significant pairs
+instead of the square of the number of atomic orbitals.
+
+The shells have different numbers of atomic orbitals. Therefore, the blocks
+are not uniform and PyTorch's BSR format cannot be used. Instead, the values
+are stored element-wise with shape `(..., nnz)`, where the elements are
+ordered block by block (row-major within each block), and the layout holds
+the row and column of every element.
+
+Example
+-------
+>>> s = overlap(wrapper, thresh=1e-12, blocksparse=True)
+>>> s.nnz, s.shape
+>>> sc = s @ c  # without the dense matrix
+>>> s.to_dense()
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import torch
+
+from tad_libcint.typing import Tensor
+
+__all__ = ["BlockLayout", "BlockSparseMatrix"]
+
+
+class BlockLayout:
+    """
+    Layout of the stored shell-pair blocks of a block-sparse matrix.
+    """
+
+    pairs: np.ndarray
+    """Shell pairs of shape `(npairs, 2)` (int32), relative to the bases."""
+
+    ao_loc0: np.ndarray
+    """Relative AO offsets of the shells of the first basis."""
+
+    ao_loc1: np.ndarray
+    """Relative AO offsets of the shells of the second basis."""
+
+    elem_loc: np.ndarray
+    """Offsets of the blocks in the elements, shape `(npairs + 1,)`."""
+
+    def __init__(
+        self,
+        pairs: np.ndarray,
+        ao_loc0: np.ndarray,
+        ao_loc1: np.ndarray,
+        device: torch.device | None = None,
+    ) -> None:
+        self.pairs = pairs
+        self.ao_loc0 = ao_loc0
+        self.ao_loc1 = ao_loc1
+        self.device = device
+
+        ish = pairs[:, 0]
+        jsh = pairs[:, 1]
+        i0 = ao_loc0[ish].astype(np.int64)
+        j0 = ao_loc1[jsh].astype(np.int64)
+        di = ao_loc0[ish + 1] - i0
+        dj = ao_loc1[jsh + 1] - j0
+
+        self.elem_loc = np.zeros(pairs.shape[0] + 1, dtype=np.int64)
+        np.cumsum(di * dj, out=self.elem_loc[1:])
+
+        # position (a, b) of every element within its block
+        pair_of = np.repeat(np.arange(pairs.shape[0]), di * dj)
+        local = np.arange(self.nnz) - self.elem_loc[pair_of]
+        a, b = np.divmod(local, dj[pair_of])
+
+        self._pair_of = pair_of
+        self._local = local
+        self._local_t = b * di[pair_of] + a
+        self._rows = i0[pair_of] + a
+        self._cols = j0[pair_of] + b
+        self._offdiag = np.flatnonzero(ish[pair_of] != jsh[pair_of])
+        self._index: dict[int, Tensor] = {}
+        self._transposed: BlockLayout | None = None
+
+    @property
+    def npairs(self) -> int:
+        return self.pairs.shape[0]
+
+    @property
+    def nnz(self) -> int:
+        # number of stored elements (per component)
+        return int(self.elem_loc[-1])
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (int(self.ao_loc0[-1]), int(self.ao_loc1[-1]))
+
+    @property
+    def rows(self) -> Tensor:
+        return torch.as_tensor(self._rows, device=self.device)
+
+    @property
+    def cols(self) -> Tensor:
+        return torch.as_tensor(self._cols, device=self.device)
+
+    @property
+    def offdiag(self) -> Tensor:
+        # elements of the blocks with different shells (ish != jsh)
+        return torch.as_tensor(self._offdiag, device=self.device)
+
+    @property
+    def transpose_index(self) -> Tensor:
+        # index of the element (j, i) in the transposed layout for every
+        # element (i, j) of this layout
+        idx = self.elem_loc[self._pair_of] + self._local_t
+        return torch.as_tensor(idx, device=self.device)
+
+    def transposed(self) -> BlockLayout:
+        """
+        Layout of the transposed blocks, i.e., for the bases in reversed
+        order.
+
+        Returns
+        -------
+        BlockLayout
+            Transposed layout.
+        """
+        if self._transposed is None:
+            pairs = np.ascontiguousarray(self.pairs[:, ::-1])
+            self._transposed = BlockLayout(
+                pairs, self.ao_loc1, self.ao_loc0, self.device
+            )
+        return self._transposed
+
+    def index(self, ncomp: int) -> Tensor:
+        """
+        Indices of the elements in the compact block buffer of libcint (see
+        :meth:`Intor.calc_pairs`), in which every block is stored as
+        `(ncomp, di, dj)`.
+
+        Parameters
+        ----------
+        ncomp : int
+            Number of components of the integral.
+
+        Returns
+        -------
+        Tensor
+            Indices of shape `(ncomp, nnz)`.
+        """
+        if ncomp not in self._index:
+            start = self.elem_loc[self._pair_of]
+            size = self.elem_loc[self._pair_of + 1] - start
+
+            comp = np.arange(ncomp)[:, None]
+            idx = ncomp * start + comp * size + self._local
+            self._index[ncomp] = torch.as_tensor(idx, device=self.device)
+
+        return self._index[ncomp]
+
+    def expand(
+        self,
+        ushl_loc0: np.ndarray,
+        ushl_loc1: np.ndarray,
+        uao_loc0: np.ndarray,
+        uao_loc1: np.ndarray,
+    ) -> tuple[BlockLayout, Tensor]:
+        """
+        Layout of the uncontracted bases that contains all primitive pairs of
+        the stored shell pairs. The uncontracted shells of a shell have the
+        same angular momentum, i.e., the elements of the primitive blocks
+        correspond to the elements of the contracted block.
+
+        Parameters
+        ----------
+        ushl_loc0 : np.ndarray
+            Offsets of the uncontracted shells of each shell of the first
+            basis, shape `(nshells0 + 1,)`.
+        ushl_loc1 : np.ndarray
+            Offsets of the uncontracted shells of the second basis.
+        uao_loc0 : np.ndarray
+            Relative AO offsets of the uncontracted shells of the first basis.
+        uao_loc1 : np.ndarray
+            Relative AO offsets of the uncontracted shells of the second basis.
+
+        Returns
+        -------
+        tuple[BlockLayout, Tensor]
+            The uncontracted layout and the index of the contracted element
+            of every uncontracted element.
+        """
+        ish = self.pairs[:, 0]
+        jsh = self.pairs[:, 1]
+        ni = ushl_loc0[ish + 1] - ushl_loc0[ish]
+        nj = ushl_loc1[jsh + 1] - ushl_loc1[jsh]
+
+        count = (ni * nj).astype(np.int64)
+        upair_of = np.repeat(np.arange(self.npairs), count)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        ki, kj = np.divmod(k, nj[upair_of])
+
+        upairs = np.empty((upair_of.shape[0], 2), dtype=np.int32)
+        upairs[:, 0] = ushl_loc0[ish][upair_of] + ki
+        upairs[:, 1] = ushl_loc1[jsh][upair_of] + kj
+
+        u_layout = BlockLayout(upairs, uao_loc0, uao_loc1, self.device)
+        # pylint: disable=protected-access
+        u2e = self.elem_loc[upair_of[u_layout._pair_of]] + u_layout._local
+        return u_layout, torch.as_tensor(u2e, device=self.device)
+
+
+class BlockSparseMatrix:
+    """
+    Block-sparse matrix of the stored shell-pair blocks (see
+    :class:`BlockLayout`), optionally with leading component dimensions.
+
+    For hermitian matrices, only one of the blocks `(i, j)` and `(j, i)` is
+    stored and the other one is implied.
+    """
+
+    values: Tensor
+    """Stored elements of shape `(..., nnz)`."""
+
+    layout: BlockLayout
+    """Layout of the stored blocks."""
+
+    hermitian: bool
+    """Whether the transposed blocks are implied."""
+
+    def __init__(
+        self, values: Tensor, layout: BlockLayout, hermitian: bool = False
+    ) -> None:
+        if values.shape[-1] != layout.nnz:
+            raise ValueError(
+                f"Values have {values.shape[-1]} elements, but the layout "
+                f"has {layout.nnz}."
+            )
+        if hermitian is True and layout.shape[0] != layout.shape[1]:
+            raise ValueError("Hermitian matrices must be square.")
+
+        self.values = values
+        self.layout = layout
+        self.hermitian = hermitian
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return (*self.values.shape[:-1], *self.layout.shape)
+
+    @property
+    def nnz(self) -> int:
+        return self.layout.nnz
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return self.values.dtype
+
+    @property
+    def device(self) -> torch.device:
+        return self.values.device
+
+    def to_dense(self) -> Tensor:
+        """
+        Convert to a dense tensor (differentiable).
+
+        Returns
+        -------
+        Tensor
+            Dense tensor of shape :attr:`shape`.
+        """
+        nao0, nao1 = self.layout.shape
+        rows, cols = self.layout.rows, self.layout.cols
+
+        dense = self.values.new_zeros(*self.values.shape[:-1], nao0 * nao1)
+        dense = dense.index_add(-1, rows * nao1 + cols, self.values)
+        if self.hermitian is True:
+            dense = dense.index_add(-1, *self._mirrored(cols * nao1 + rows))
+
+        return dense.reshape(self.shape)
+
+    def to_sparse_coo(self) -> Tensor:
+        """
+        Convert to a sparse COO tensor (differentiable w.r.t. the values).
+        Components are stored as dense dimensions after the two sparse ones.
+
+        Returns
+        -------
+        Tensor
+            Sparse tensor of shape `(nao0, nao1, ...)`.
+        """
+        rows, cols = self.layout.rows, self.layout.cols
+        values = torch.movedim(self.values, -1, 0)
+
+        if self.hermitian is True:
+            mcols, mvalues = self._mirrored(cols, values, dim=0)
+            mrows, _ = self._mirrored(rows)
+            rows, cols = torch.cat([rows, mcols]), torch.cat([cols, mrows])
+            values = torch.cat([values, mvalues])
+
+        return torch.sparse_coo_tensor(
+            torch.stack([rows, cols]),
+            values,
+            size=(*self.layout.shape, *self.values.shape[:-1]),
+        )
+
+    def matmul(self, other: Tensor) -> Tensor:
+        """
+        Multiply with a dense matrix from the right without forming the dense
+        block-sparse matrix (differentiable).
+
+        Parameters
+        ----------
+        other : Tensor
+            Dense matrix of shape `(nao1, k)`.
+
+        Returns
+        -------
+        Tensor
+            Product of shape `(..., nao0, k)`.
+        """
+        nao0, _ = self.layout.shape
+        rows, cols = self.layout.rows, self.layout.cols
+
+        res = other.new_zeros(*self.values.shape[:-1], nao0, other.shape[-1])
+        res = res.index_add(-2, rows, self.values[..., None] * other[cols])
+        if self.hermitian is True:
+            mcols, mvalues = self._mirrored(cols, self.values)
+            mrows, _ = self._mirrored(rows)
+            res = res.index_add(-2, mcols, mvalues[..., None] * other[mrows])
+
+        return res
+
+    def __matmul__(self, other: Tensor) -> Tensor:
+        return self.matmul(other)
+
+    def _mirrored(
+        self, idx: Tensor, values: Tensor | None = None, dim: int = -1
+    ) -> tuple[Tensor, Tensor]:
+        # elements of the off-diagonal blocks, whose transposes are implied
+        sel = self.layout.offdiag
+        if values is None:
+            values = self.values
+        return idx[sel], values.index_select(dim, sel)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(shape={self.shape}, "
+            f"npairs={self.layout.npairs}, nnz={self.nnz})"
+        )
+
+    def __repr__(self) -> str:
+        return str(self)
@@ -0,0 +1,241 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Condensed Block Norms
+================================
+
+Shell- or atom-level magnitude maps of 2-centre integral matrices, e.g., for
+sparsity analysis, screening decisions or coarse-grained features.
+
+The norms are either obtained directly from the integral driver without
+storing the matrix (see :func:`~tad_libcint.interface.integrals.int1e_norms`)
+or post-hoc from an existing matrix with ``NPcondense`` (see
+:func:`block_norms`). For several components, the norms of all components of
+a block are combined.
+
+Example
+-------
+>>> norms = int1e_norms("ovlp", wrapper, level="atom")  # no dense matrix
+>>> fill = (norms > 1e-10).float().mean()
+>>> s = overlap(wrapper)
+>>> block_norms(s, wrapper, norm="fro")
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import torch
+
+from tad_libcint.api import NP
+from tad_libcint.typing import Tensor
+
+from .wrapper import ATOM_OF, LibcintWrapper
+
+__all__ = ["BLOCK_NORMS", "block_norms", "reduce_shell_norms"]
+
+
+BLOCK_NORMS = {"max": 0, "fro": 1}
+"""
+Norms of the blocks (maximum absolute value, Frobenius norm) and their
+identifiers in the C drivers.
+"""
+
+BLOCK_LEVELS = ("shell", "atom")
+
+
+def block_norms(
+    mat: Tensor,
+    wrapper: LibcintWrapper,
+    other: LibcintWrapper | None = None,
+    level: str = "shell",
+    norm: str = "max",
+) -> Tensor:
+    """
+    Norms of the shell or atom blocks of an integral matrix.
+
+    The blocks are condensed by ``NPcondense`` of the ``np_helper`` library.
+    Contiguous double precision CPU tensors are read in place, i.e., no copy
+    of the matrix is made.
+
+    Parameters
+    ----------
+    mat : Tensor
+        Integral matrix of shape `(..., nao0, nao1)`.
+    wrapper : LibcintWrapper
+        Wrapper of the first basis.
+    other : LibcintWrapper | None, optional
+        Wrapper of the second basis. Defaults to `None` (same as `wrapper`).
+    level : str, optional
+        Blocks of the shells ("shell") or of the atoms ("atom"). Defaults to
+        "shell".
+    norm : str, optional
+        Maximum absolute value ("max") or Frobenius norm ("fro") of the
+        blocks. Defaults to "max".
+
+    Returns
+    -------
+    Tensor
+        Block norms of shape `(nshells0, nshells1)` or `(natoms, natoms)`.
+        Atoms without basis functions have zero norms.
+
+    Raises
+    ------
+    ValueError
+        If the level, the norm or the shape of the matrix is invalid.
+    """
+    _check_args(level, norm)
+    other = wrapper if other is None else other
+
+    nao0, nao1 = wrapper.nao(), other.nao()
+    if tuple(mat.shape[-2:]) != (nao0, nao1):
+        raise ValueError(
+            f"Matrix has shape {tuple(mat.shape)}, but the bases have "
+            f"({nao0}, {nao1}) atomic orbitals."
+        )
+
+    # no-op for contiguous double precision CPU tensors
+    a = mat.detach().to(device="cpu", dtype=torch.float64).contiguous()
+    a = a.reshape(-1, nao0, nao1)
+
+    shl0, ids0, n0 = _blocks(wrapper, level)
+    shl1, ids1, n1 = _blocks(other, level)
+    loc0 = _ao_loc(wrapper, shl0)
+    loc1 = _ao_loc(other, shl1)
+
+    op = NP.NP_absmax if norm == "max" else NP.NP_norm
+    res = np.empty((a.shape[0], shl0.shape[0], shl1.shape[0]))
+    for ic in range(a.shape[0]):
+        NP.NPcondense(
+            op,
+            res[ic].ctypes.data,
+            a[ic].data_ptr(),
+            loc0.ctypes.data,
+            loc1.ctypes.data,
+            shl0.shape[0],
+            shl1.shape[0],
+        )
+
+    res = res.max(axis=0) if norm == "max" else np.sqrt((res**2).sum(axis=0))
+
+    out = np.zeros((n0, n1))
+    out[np.ix_(ids0, ids1)] = res
+    return torch.from_numpy(out).to(**wrapper.dd)
+
+
+def reduce_shell_norms(
+    norms: np.ndarray,
+    wrapper: LibcintWrapper,
+    other: LibcintWrapper | None = None,
+    level: str = "shell",
+    norm: str = "max",
+) -> np.ndarray:
+    """
+    Reduce the norms of the shell blocks to the requested level.
+
+    Parameters
+    ----------
+    norms : np.ndarray
+        Norms of the shell blocks of shape `(nshells0, nshells1)`.
+    wrapper : LibcintWrapper
+        Wrapper of the first basis.
+    other : LibcintWrapper | None, optional
+        Wrapper of the second basis. Defaults to `None` (same as `wrapper`).
+    level : str, optional
+        Blocks of the shells ("shell") or of the atoms ("atom"). Defaults to
+        "shell".
+    norm : str, optional
+        Norm of the blocks ("max" or "fro"). Defaults to "max".
+
+    Returns
+    -------
+    np.ndarray
+        Block norms of shape `(nshells0, nshells1)` or `(natoms, natoms)`.
+
+    Raises
+    ------
+    ValueError
+        If the level or the norm is invalid.
+    """
+    _check_args(level, norm)
+    if level == "shell":
+        return norms
+
+    other = wrapper if other is None else other
+    shl0, ids0, n0 = _blocks(wrapper, level)
+    shl1, ids1, n1 = _blocks(other, level)
+
+    if norm == "max":
+        res = np.maximum.reduceat(norms, shl0, axis=0)
+        res = np.maximum.reduceat(res, shl1, axis=1)
+    else:
+        res = np.add.reduceat(norms**2, shl0, axis=0)
+        res = np.sqrt(np.add.reduceat(res, shl1, axis=1))
+
+    out = np.zeros((n0, n1))
+    out[np.ix_(ids0, ids1)] = res
+    return out
+
+
+def _check_args(level: str, norm: str) -> None:
+    if level not in BLOCK_LEVELS:
+        raise ValueError(
+            f"Unknown block level '{level}' (available: "
+            f"{', '.join(BLOCK_LEVELS)})."
+        )
+    if norm not in BLOCK_NORMS:
+        raise ValueError(
+            f"Unknown block norm '{norm}' (available: "
+            f"{', '.join(BLOCK_NORMS)})."
+        )
+
+
+def _blocks(
+    wrapper: LibcintWrapper, level: str
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Blocks of the shells of a wrapper.
+
+    Parameters
+    ----------
+    wrapper : LibcintWrapper
+        Wrapper of the basis.
+    level : str
+        Blocks of the shells ("shell") or of the atoms ("atom").
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, int]
+        Relative index of the first shell of every (non-empty) block, the
+        row of every block in the result and the number of rows.
+    """
+    sh0, sh1 = wrapper.shell_idxs
+    if level == "shell":
+        starts = np.arange(sh1 - sh0)
+        return starts, starts, sh1 - sh0
+
+    # the shells of an atom are consecutive
+    atom_of = wrapper.atm_bas_env[1][sh0:sh1, ATOM_OF]
+    starts = np.flatnonzero(np.diff(atom_of, prepend=-1) != 0)
+    return starts, atom_of[starts], wrapper.natoms
+
+
+def _ao_loc(wrapper: LibcintWrapper, starts: np.ndarray) -> np.ndarray:
+    # relative AO offsets of the blocks (int32 for libcint)
+    sh0, sh1 = wrapper.shell_idxs
+    ao_loc = wrapper.full_shell_to_aoloc
+    loc = np.append(ao_loc[starts + sh0], ao_loc[sh1]) - ao_loc[sh0]
+    return np.ascontiguousarray(loc, dtype=np.int32)
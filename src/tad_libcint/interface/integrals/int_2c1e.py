@@ -26,25 +26,33 @@ Short-cuts for the 2c1e-integrals.
 
 from __future__ import annotations
 
+import numpy as np
 import torch
 from tad_mctc._version import __tversion__
 from tad_mctc.math import einsum
 
 from tad_libcint.typing import Callable, Protocol, Tensor
 
-from ..intor import Intor, IntorNameManager
-from ..wrapper import LibcintWrapper
-from .utils import gather_at_dims, get_integrals
+from ..batch import BatchedLibcintWrapper
+from ..blocksparse import BlockLayout, BlockSparseMatrix
+from ..condense import block_norms, reduce_shell_norms
+from ..namemanager import get_namemgr
+from ..plan import IntegralPlan, get_plan
+from ..workspace import WorkspacePool
+from ..wrapper import ATOM_OF, LibcintWrapper
+from .int_2c1e_blocksparse import get_block_integrals, int2c_blocks
+from .int_2c1e_padded import int2c_padded
+from .utils import gather_at_dims, get_integrals, mask_inactive_atoms
 
-__all__ = ["int1e", "overlap"]
+__all__ = ["int1e", "int1e_hessian", "int1e_norms", "overlap"]
 
 
 class CTX(Protocol):
     save_for_backward: Callable[[Tensor, Tensor, Tensor], None]
     saved_tensors: tuple[Tensor, Tensor, Tensor]
-    wrappers: list[LibcintWrapper]
-    int_nmgr: IntorNameManager
-    hermitian: bool
+    plan: IntegralPlan
+    env_version: int
+    active_atoms: np.ndarray | None
 
 
 class BaseInt2c(torch.autograd.Function):
@@ -55,59 +63,79 @@ class BaseInt2c(torch.autograd.Function):
 
     @staticmethod
     def backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
-        # grad_out: (..., nao0, nao1)
+        # The positions of the wrapper may have been updated in place after
+        # the forward pass. The derivatives must be evaluated at the positions
+        # of the forward pass, which are the saved ones. Batched evaluations
+        # always use the saved positions and do not depend on the wrapper.
+        wrapper = ctx.plan.wrappers[0]
+        batched = ctx.saved_tensors[2].ndim == 3
+        if not batched and wrapper.env_version != ctx.env_version:
+            with wrapper.at_positions(ctx.saved_tensors[2]):
+                return BaseInt2c._backward(ctx, grad_out)
+
+        return BaseInt2c._backward(ctx, grad_out)
+
+    @staticmethod
+    def _backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
+        # grad_out: ([nbatch,] ..., nao0, nao1)
         allcoeffs = ctx.saved_tensors[0]
         allalphas = ctx.saved_tensors[1]
         allposs = ctx.saved_tensors[2]
-        wrappers = ctx.wrappers
-        int_nmgr = ctx.int_nmgr
-        hermitian = ctx.hermitian
+        plan = ctx.plan
+        wrappers = plan.wrappers
+        active = ctx.active_atoms
+
+        # batch of geometries, positions: (nbatch, nat, 3)
+        nb = allposs.ndim - 2
+        batch_shape = allposs.shape[:nb]
 
         # gradient for all atomic positions
         grad_allposs: Tensor | None = None
+        fused = None
         if allposs.requires_grad:
-            # (ndim, natom)
-            grad_allpossT = torch.zeros_like(allposs).transpose(-2, -1)
+            fused = _fused_recipes(plan, grad_out, nb)
 
-            # get the integrals required for the derivatives
-            sname_derivs = [
-                int_nmgr.get_intgl_deriv_namemgr("ip", ib) for ib in (0, 1)
-            ]
-            # new axes added to the dimension
-            new_axes_pos = [
-                int_nmgr.get_intgl_deriv_newaxispos("ip", ib) for ib in (0, 1)
-            ]
-            assert isinstance(new_axes_pos[0], int) and isinstance(
-                new_axes_pos[1], int
+        if fused is not None:
+            grad_allposs = _grad_allposs_fused(
+                allposs, plan, fused, grad_out, active
             )
+        elif allposs.requires_grad and _sparse_backward(
+            plan, grad_out, nb, active
+        ):
+            grad_allposs = _grad_allposs_blocks(
+                allcoeffs, allalphas, allposs, plan, grad_out, active
+            )
+        elif allposs.requires_grad:
+            # ([nbatch,] ndim, natom)
+            grad_allpossT = torch.zeros_like(allposs).transpose(-2, -1)
 
-            def int_fcn(
-                wrappers: list[LibcintWrapper], namemgr: IntorNameManager
-            ) -> Tensor:
-                return _int2c(
-                    allcoeffs, allalphas, allposs, wrappers, namemgr, hermitian
-                )
+            def int_fcn(p: IntegralPlan) -> Tensor:
+                return _int2c(allcoeffs, allalphas, allposs, p)
 
-            # list of tensors with shape: (ndim, ..., nao0, nao1)
+            # list of tensors with shape: ([nbatch,] ndim, ..., nao0, nao1)
             dout_dposs = get_integrals(
-                sname_derivs, wrappers, int_fcn, new_axes_pos
+                plan.get_deriv_recipes("ip"), int_fcn, batch_dims=nb
             )
 
-            ndim = dout_dposs[0].shape[0]
-            shape = (ndim, -1, *dout_dposs[0].shape[-2:])
-            grad_out2 = grad_out.reshape(shape[1:])
+            ndim = dout_dposs[0].shape[nb]
+            shape = (*batch_shape, ndim, -1, *dout_dposs[0].shape[-2:])
+            grad_out2 = grad_out.reshape(*batch_shape, *shape[nb + 1 :])
 
             # negative because the integral calculates the nabla w.r.t. the
             # spatial coordinate, not the basis central position
             grad_dpos_i = -einsum(
-                "sij,dsij->di", grad_out2, dout_dposs[0].reshape(shape)
+                "...sij,...dsij->...di",
+                grad_out2,
+                dout_dposs[0].reshape(shape),
             )
             grad_dpos_j = -einsum(
-                "sij,dsij->dj", grad_out2, dout_dposs[1].reshape(shape)
+                "...sij,...dsij->...dj",
+                grad_out2,
+                dout_dposs[1].reshape(shape),
             )
 
-            ao_to_atom0 = wrappers[0].ao_to_atom().expand(ndim, -1)
-            ao_to_atom1 = wrappers[1].ao_to_atom().expand(ndim, -1)
+            ao_to_atom0 = wrappers[0].ao_to_atom().expand(grad_dpos_i.shape)
+            ao_to_atom1 = wrappers[1].ao_to_atom().expand(grad_dpos_j.shape)
 
             # grad_allpossT is only a view of grad_allposs, so the operation
             # below also changes grad_allposs
@@ -127,19 +155,33 @@ class BaseInt2c(torch.autograd.Function):
             # Transpose back to match the shape of grad_allposs
             grad_allposs = updated_grad_allpossT.transpose(-2, -1)
 
+        # the gradients of the inactive atoms are zero by definition
+        if grad_allposs is not None and active is not None:
+            grad_allposs = mask_inactive_atoms(grad_allposs, active)
+
         # gradient for the basis coefficients
         grad_allcoeffs: Tensor | None = None
         grad_allalphas: Tensor | None = None
+        prim_grads = None
         if allcoeffs.requires_grad or allalphas.requires_grad:
-            # obtain the uncontracted wrapper and mapping
-            # uao2aos: list of (nu_ao0,), (nu_ao1,)
-            u_wrappers_tup, uao2aos_tup = zip(
-                *[w.get_uncontracted_wrapper() for w in wrappers]
+            prim_grads = _grad_allprims(
+                allcoeffs, allalphas, plan, grad_out, nb
             )
-            u_wrappers = list(u_wrappers_tup)
-            uao2aos = list(uao2aos_tup)
+
+        if prim_grads is not None:
+            grad_allcoeffs, grad_allalphas = prim_grads
+        elif allcoeffs.requires_grad or allalphas.requires_grad:
+            # obtain the uncontracted plan and mapping
+            # uao2aos: list of (nu_ao0,), (nu_ao1,)
+            u_plan, uao2aos = plan.get_uncontracted_plan()
+            u_wrappers = u_plan.wrappers
             u_params = u_wrappers[0].params
 
+            # the uncontracted wrapper contains the same atoms, i.e., the
+            # batch of positions can be used directly
+            if nb > 0:
+                u_params = (u_params[0], u_params[1], allposs)
+
             # get the uncontracted (gathered) grad_out
             u_grad_out = gather_at_dims(
                 grad_out, mapidxs=uao2aos, dims=[-2, -1]
@@ -154,11 +196,7 @@ class BaseInt2c(torch.autograd.Function):
                 grad_allcoeffs = torch.zeros_like(allcoeffs)  # (ngauss)
 
                 # get uncontracted version of integral (..., nu_ao0, nu_ao1)
-                dout_dcoeff = _int2c(
-                    *u_params,
-                    wrappers=u_wrappers,
-                    namemgr=int_nmgr,
-                )
+                dout_dcoeff = _int2c(*u_params, plan=u_plan)
 
                 # get the coefficients and spread it on the u_ao-length tensor
                 coeffs_ao0 = torch.gather(
@@ -195,21 +233,12 @@ class BaseInt2c(torch.autograd.Function):
             if allalphas.requires_grad:
                 grad_allalphas = torch.zeros_like(allalphas)  # (ngauss)
 
-                def u_int_fcn(u_wrappers, int_nmgr) -> Tensor:
-                    return _int2c(
-                        *u_params, wrappers=u_wrappers, namemgr=int_nmgr
-                    )
+                def u_int_fcn(p: IntegralPlan) -> Tensor:
+                    return _int2c(*u_params, plan=p)
 
                 # get the uncontracted integrals
-                sname_derivs = [
-                    int_nmgr.get_intgl_deriv_namemgr("rr", ib) for ib in (0, 1)
-                ]
-                new_axes_pos = [
-                    int_nmgr.get_intgl_deriv_newaxispos("rr", ib)
-                    for ib in (0, 1)
-                ]
                 dout_dalphas = get_integrals(
-                    sname_derivs, u_wrappers, u_int_fcn, new_axes_pos
+                    u_plan.get_deriv_recipes("rr"), u_int_fcn, batch_dims=nb
                 )
 
                 # (nu_ao)
@@ -230,7 +259,323 @@ class BaseInt2c(torch.autograd.Function):
                     dim=-1, index=ao2shl1, src=grad_dalpha_j
                 )
 
-        return (grad_allcoeffs, grad_allalphas, grad_allposs, None, None, None)
+        return (grad_allcoeffs, grad_allalphas, grad_allposs, None, None)
+
+
+def _use_grad_thresh(plan: IntegralPlan, grad_out: Tensor) -> bool:
+    # The blocks of the incoming gradient below the threshold are skipped,
+    # which is only valid if the gradient w.r.t. `grad_out` itself is not
+    # required (double backward), as it involves the skipped blocks.
+    return plan.grad_thresh is not None and grad_out.requires_grad is False
+
+
+def _sparse_backward(
+    plan: IntegralPlan, grad_out: Tensor, nb: int, active: np.ndarray | None
+) -> bool:
+    # only the shell pairs of the active atoms and/or the significant blocks
+    # of the incoming gradient are evaluated (single geometry only)
+    return nb == 0 and (active is not None or _use_grad_thresh(plan, grad_out))
+
+
+def _significant_pairs(
+    plan: IntegralPlan,
+    grad_out: Tensor,
+    active: np.ndarray | None,
+    grad_thresh: bool = True,
+) -> np.ndarray:
+    """
+    Shell pairs that contribute to the position gradient, i.e., whose block
+    of the incoming gradient exceeds the threshold (maximum absolute value
+    over all components) and with at least one shell on an active atom.
+
+    Parameters
+    ----------
+    plan : IntegralPlan
+        Plan of the integral.
+    grad_out : Tensor
+        Incoming gradient of shape `(..., nao0, nao1)`.
+    active : np.ndarray | None
+        Mask of the active atoms of shape `(natoms,)`.
+    grad_thresh : bool, optional
+        Whether to apply the gradient threshold of the plan (only for the
+        position gradient). Defaults to `True`.
+
+    Returns
+    -------
+    np.ndarray
+        Shell pairs of shape `(npairs, 2)` (int32).
+    """
+    ish0, ish1, jsh0, jsh1 = plan.intor.shls_slice
+    mask = np.ones((ish1 - ish0, jsh1 - jsh0), dtype=bool)
+
+    if grad_thresh is True and _use_grad_thresh(plan, grad_out):
+        norms = block_norms(grad_out.detach(), *plan.wrappers).cpu().numpy()
+        mask &= norms > plan.grad_thresh
+
+    if active is not None:
+        on_active = active[plan.intor.bas[:, ATOM_OF]]
+        mask &= on_active[ish0:ish1, None] | on_active[None, jsh0:jsh1]
+
+    # the pairs screened out in the forward pass do not contribute
+    if plan.thresh is not None:
+        screened = np.zeros_like(mask)
+        pairs = plan.intor.screened_pairs()
+        screened[pairs[:, 0], pairs[:, 1]] = True
+        if plan.intor.hermitian is True:
+            screened |= screened.T
+        mask &= screened
+
+    return np.ascontiguousarray(np.argwhere(mask), dtype=np.int32)
+
+
+def _grad_allposs_blocks(
+    allcoeffs: Tensor,
+    allalphas: Tensor,
+    allposs: Tensor,
+    plan: IntegralPlan,
+    grad_out: Tensor,
+    active: np.ndarray | None = None,
+) -> Tensor:
+    """
+    Gradient w.r.t. the positions, in which the derivative integrals are only
+    evaluated for the significant shell blocks of the incoming gradient and
+    the shells of the active atoms (see :func:`_significant_pairs`).
+
+    Parameters
+    ----------
+    allcoeffs : Tensor
+        All coefficients of the basis functions.
+    allalphas : Tensor
+        All exponents of the basis functions.
+    allposs : Tensor
+        All atomic positions of shape `(natom, 3)`.
+    plan : IntegralPlan
+        Plan of the integral.
+    grad_out : Tensor
+        Incoming gradient of shape `(..., nao0, nao1)`.
+    active : np.ndarray | None, optional
+        Mask of the active atoms of shape `(natom,)`. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Gradient of shape `(natom, 3)`. The gradients of the inactive atoms
+        are incomplete and must be masked.
+    """
+    wrappers = plan.wrappers
+    pairs = _significant_pairs(plan, grad_out, active)
+    if pairs.shape[0] == 0:
+        return torch.zeros_like(allposs)
+
+    layout = plan.get_pair_layout(pairs)
+
+    # (ncomp, nnz)
+    nao0, nao1 = grad_out.shape[-2:]
+    grad_out2 = grad_out.reshape(-1, nao0, nao1)[:, layout.rows, layout.cols]
+
+    def int_fcn(p: IntegralPlan, lay: BlockLayout) -> Tensor:
+        return int2c_blocks(allcoeffs, allalphas, allposs, p, lay)
+
+    # list of tensors with shape: (ndim, ..., nnz)
+    dout_dposs = get_block_integrals(
+        plan.get_deriv_recipes("ip"), layout, int_fcn
+    )
+    ndim = dout_dposs[0].shape[0]
+    shape = (ndim, *grad_out2.shape)
+
+    # negative because the integral calculates the nabla w.r.t. the spatial
+    # coordinate, not the basis central position
+    grad_dpos_i = -einsum("se,dse->de", grad_out2, dout_dposs[0].reshape(shape))
+    grad_dpos_j = -einsum("se,dse->de", grad_out2, dout_dposs[1].reshape(shape))
+
+    # scatter the elements to the atoms of their rows and columns
+    atom_i = wrappers[0].ao_to_atom()[layout.rows]
+    atom_j = wrappers[1].ao_to_atom()[layout.cols]
+
+    grad_allpossT = torch.zeros_like(allposs).transpose(-2, -1)
+    grad_allpossT = grad_allpossT.index_add(-1, atom_i, grad_dpos_i)
+    grad_allpossT = grad_allpossT.index_add(-1, atom_j, grad_dpos_j)
+    return grad_allpossT.transpose(-2, -1)
+
+
+def _fused_recipes(
+    plan: IntegralPlan, grad_out: Tensor, nb: int, derivop: str = "ip"
+) -> tuple[IntegralPlan, IntegralPlan | None, bool] | None:
+    """
+    Plans of the bra and ket derivative integrals for the contracted gradient
+    drivers (see :meth:`Intor.calc_grad` and :meth:`Intor.calc_prim_grad`),
+    or `None` if they cannot be used.
+
+    The drivers only return the gradient itself, i.e., they are only used if
+    no graph of the backward pass is required (no double backward), for
+    single geometries and scalar operators.
+
+    Parameters
+    ----------
+    plan : IntegralPlan
+        Plan of the integral.
+    grad_out : Tensor
+        Incoming gradient.
+    nb : int
+        Number of batch dimensions.
+    derivop : str, optional
+        Derivative operation ("ip" or "rr"). Defaults to "ip".
+
+    Returns
+    -------
+    tuple[IntegralPlan, IntegralPlan | None, bool] | None
+        Plans of the bra and ket derivatives and whether the ket derivative
+        is evaluated for the swapped shells. The ket plan is `None` for
+        translationally invariant integrals.
+    """
+    if torch.is_grad_enabled() or nb != 0 or grad_out.ndim != 2:
+        return None
+    if plan.blockdiag is True:
+        return None
+
+    # the position derivatives add a new axis
+    ncomp = 3 if derivop == "ip" else 1
+
+    recipes = plan.get_deriv_recipes(derivop)
+    bra, ket = recipes
+    if bra.plan is None or bra.direct is False:
+        return None
+    if bra.plan.intor.ncomp != ncomp:
+        return None
+
+    # translationally invariant, the ket derivative is not evaluated
+    if ket.negate is True:
+        return bra.plan, None, False
+
+    if ket.direct is True:
+        ket_plan = ket.plan
+    elif ket.transpose_path is not None and len(ket.transpose_path) == 1:
+        source = ket.source
+        ket_plan = ket.plan if source is None else recipes[source].plan
+    else:
+        return None
+
+    if ket_plan is None or ket_plan.intor.ncomp != ncomp:
+        return None
+    return bra.plan, ket_plan, ket.direct is False
+
+
+def _grad_allposs_fused(
+    allposs: Tensor,
+    plan: IntegralPlan,
+    fused: tuple[IntegralPlan, IntegralPlan | None, bool],
+    grad_out: Tensor,
+    active: np.ndarray | None = None,
+) -> Tensor:
+    """
+    Gradient w.r.t. the positions from the contracted gradient driver, in
+    which the derivative integrals are contracted with the incoming gradient
+    shell pair by shell pair and never stored.
+
+    Parameters
+    ----------
+    allposs : Tensor
+        All atomic positions of shape `(natom, 3)`.
+    plan : IntegralPlan
+        Plan of the integral.
+    fused : tuple[IntegralPlan, IntegralPlan | None, bool]
+        Derivative plans from :func:`_fused_recipes`.
+    grad_out : Tensor
+        Incoming gradient of shape `(nao0, nao1)`.
+    active : np.ndarray | None, optional
+        Mask of the active atoms of shape `(natom,)`. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Gradient of shape `(natom, 3)`. The gradients of the inactive atoms
+        are incomplete and must be masked.
+    """
+    bra_plan, ket_plan, trans = fused
+
+    pairs = None
+    if plan.thresh is not None or _sparse_backward(plan, grad_out, 0, active):
+        pairs = _significant_pairs(plan, grad_out, active)
+        if pairs.shape[0] == 0:
+            return torch.zeros_like(allposs)
+
+    ket = None if ket_plan is None else ket_plan.intor
+    grad = bra_plan.intor.calc_grad(ket, trans, grad_out, pairs)
+    return torch.from_numpy(grad).to(allposs)
+
+
+def _grad_allprims(
+    allcoeffs: Tensor,
+    allalphas: Tensor,
+    plan: IntegralPlan,
+    grad_out: Tensor,
+    nb: int,
+) -> tuple[Tensor | None, Tensor | None] | None:
+    """
+    Gradients w.r.t. the coefficients and exponents from the primitive
+    gradient driver (see :meth:`Intor.calc_prim_grad`), which neither
+    requires the uncontracted wrapper nor uncontracted integrals. Returns
+    `None` if the driver cannot be used (see :func:`_fused_recipes`).
+
+    Parameters
+    ----------
+    allcoeffs : Tensor
+        All coefficients of the basis functions.
+    allalphas : Tensor
+        All exponents of the basis functions.
+    plan : IntegralPlan
+        Plan of the integral.
+    grad_out : Tensor
+        Incoming gradient of shape `(nao0, nao1)`.
+    nb : int
+        Number of batch dimensions.
+
+    Returns
+    -------
+    tuple[Tensor | None, Tensor | None] | None
+        Gradients w.r.t. the coefficients and exponents (`None` if not
+        required).
+    """
+    if torch.is_grad_enabled() or nb != 0 or grad_out.ndim != 2:
+        return None
+    if plan.blockdiag is True or plan.intor.ncomp != 1:
+        return None
+
+    fused = None
+    if allalphas.requires_grad:
+        fused = _fused_recipes(plan, grad_out, nb, "rr")
+        if fused is None:
+            return None
+
+    # only the pairs of the forward pass, the gradient threshold is limited
+    # to the position gradient (as in the uncontracted path)
+    pairs = None
+    if plan.thresh is not None:
+        pairs = _significant_pairs(plan, grad_out, None, grad_thresh=False)
+
+    # the integral and its "rr" derivatives in a single pass
+    bra = ket = None
+    trans = False
+    if fused is not None:
+        bra_plan, ket_plan, trans = fused
+        bra = bra_plan.intor
+        ket = None if ket_plan is None else ket_plan.intor
+
+    gval, gderiv = plan.intor.calc_prim_grad(
+        grad_out, allcoeffs.requires_grad, bra, ket, trans, pairs
+    )
+
+    # the integrals are linear in the coefficients of each primitive
+    grad_allcoeffs: Tensor | None = None
+    if gval is not None:
+        grad_allcoeffs = torch.from_numpy(gval).to(allcoeffs) / allcoeffs
+
+    # negative because the exponent is negative alpha * (r-ra)^2
+    grad_allalphas: Tensor | None = None
+    if gderiv is not None:
+        grad_allalphas = -torch.from_numpy(gderiv).to(allalphas)
+
+    return grad_allcoeffs, grad_allalphas
 
 
 class Int2c_V1(BaseInt2c):
@@ -244,27 +589,29 @@ class Int2c_V1(BaseInt2c):
         allcoeffs: Tensor,
         allalphas: Tensor,
         allposs: Tensor,
-        wrappers: list[LibcintWrapper],
-        int_nmgr: IntorNameManager,
-        hermitian: bool,
+        plan: IntegralPlan,
+        out: Tensor | None = None,
     ) -> Tensor:
         # Those tensors are not used directly in the forward calculation, but
         # required for backward propagation:
         # - allcoeffs: (ngauss_tot,)
         # - allalphas: (ngauss_tot,)
-        # - allposs: (nat, 3)
+        # - allposs: (nat, 3) or (nbatch, nat, 3) for a batch of geometries
+        # The (optional) output buffer is overwritten and returned.
         #
         # Wrapper0 and wrapper1 must have the same _atm, _bas, and _env.
         # The check should be done before calling this function.
-        assert len(wrappers) == 2
+        assert len(plan.wrappers) == 2
 
         ctx.save_for_backward(allcoeffs, allalphas, allposs)
-        ctx.wrappers = wrappers
-        ctx.int_nmgr = int_nmgr
-        ctx.hermitian = hermitian
+        ctx.plan = plan
+        ctx.env_version = plan.wrappers[0].env_version
+        ctx.active_atoms = plan.wrappers[0].active_atoms
 
-        # (..., nao0, nao1)
-        return Intor(int_nmgr, wrappers, hermitian=hermitian).calc()
+        # ([nbatch,] ..., nao0, nao1)
+        if allposs.ndim == 3:
+            return plan.calc_batch(allposs, out)
+        return plan.calc(out)
 
 
 class Int2c_V2(BaseInt2c):
@@ -279,51 +626,48 @@ class Int2c_V2(BaseInt2c):
         allcoeffs: Tensor,
         allalphas: Tensor,
         allposs: Tensor,
-        wrappers: list[LibcintWrapper],
-        int_nmgr: IntorNameManager,
-        hermitian: bool,
+        plan: IntegralPlan,
+        out: Tensor | None = None,
     ) -> Tensor:
         # Those tensors are not used directly in the forward calculation, but
         # required for backward propagation:
         # - allcoeffs: (ngauss_tot,)
         # - allalphas: (ngauss_tot,)
-        # - allposs: (nat, 3)
+        # - allposs: (nat, 3) or (nbatch, nat, 3) for a batch of geometries
+        # The (optional) output buffer is overwritten and returned.
         #
         # Wrapper0 and wrapper1 must have the same _atm, _bas, and _env.
         # The check should be done before calling this function.
-        assert len(wrappers) == 2
+        assert len(plan.wrappers) == 2
 
-        # (..., nao0, nao1)
-        return Intor(int_nmgr, wrappers, hermitian=hermitian).calc()
+        # ([nbatch,] ..., nao0, nao1)
+        if allposs.ndim == 3:
+            return plan.calc_batch(allposs, out)
+        return plan.calc(out)
 
     @staticmethod
     def setup_context(
         ctx: CTX,
-        inputs: tuple[
-            Tensor, Tensor, Tensor, list[LibcintWrapper], IntorNameManager, bool
-        ],
+        inputs: tuple[Tensor, Tensor, Tensor, IntegralPlan, Tensor | None],
         output: Tensor,
     ) -> None:
         allcoeffs = inputs[0]
         allalphas = inputs[1]
         allposs = inputs[2]
-        wrappers = inputs[3]
-        int_nmgr = inputs[4]
-        hermitian = inputs[5]
+        plan = inputs[3]
 
         ctx.save_for_backward(allcoeffs, allalphas, allposs)
-        ctx.wrappers = wrappers
-        ctx.int_nmgr = int_nmgr
-        ctx.hermitian = hermitian
+        ctx.plan = plan
+        ctx.env_version = plan.wrappers[0].env_version
+        ctx.active_atoms = plan.wrappers[0].active_atoms
 
 
 def _int2c(
     allcoeffs: Tensor,
     allalphas: Tensor,
     allposs: Tensor,
-    wrappers: list[LibcintWrapper],
-    namemgr: IntorNameManager,
-    hermitian: bool = False,
+    plan: IntegralPlan,
+    out: Tensor | None = None,
 ) -> Tensor:
     """
     Calculate the 2-centre integrals.
@@ -336,12 +680,10 @@ def _int2c(
         All exponents of the basis functions.
     allposs : Tensor
         All atomic positions of the basis functions.
-    wrappers : list[LibcintWrapper]
-        List of wrappers for the integrals.
-    namemgr : IntorNameManager
-        Name manager for the integrals.
-    hermitian : bool, optional
-        Whether the integral is hermitian. Defaults to `False`.
+    plan : IntegralPlan
+        Plan of the integral (contains the wrappers and the name manager).
+    out : Tensor | None, optional
+        Preallocated output tensor. Defaults to `None`.
 
     Returns
     -------
@@ -350,9 +692,7 @@ def _int2c(
     """
     Int2cFunction = Int2c_V1 if __tversion__ < (2, 0, 0) else Int2c_V2
 
-    integral = Int2cFunction.apply(
-        allcoeffs, allalphas, allposs, wrappers, namemgr, hermitian
-    )
+    integral = Int2cFunction.apply(allcoeffs, allalphas, allposs, plan, out)
 
     # only for typing
     assert integral is not None
@@ -394,13 +734,226 @@ def _check_and_set(
 
 
 def int1e(
+    shortname: str,
+    wrapper: LibcintWrapper | BatchedLibcintWrapper,
+    other: LibcintWrapper | None = None,
+    hermitian: bool = False,
+    out: Tensor | None = None,
+    pool: WorkspacePool | None = None,
+    positions: Tensor | None = None,
+    blockdiag: bool = False,
+    thresh: float | None = None,
+    blocksparse: bool = False,
+    incremental: bool = False,
+    grad_thresh: float | None = None,
+) -> Tensor | BlockSparseMatrix:
+    """
+    Shortcut for the 2-centre 1-electron integrals.
+
+    Parameters
+    ----------
+    shortname : str
+        Short name of the integral.
+    wrapper : LibcintWrapper | BatchedLibcintWrapper
+        Interface for libcint. For a batch of molecules, the integrals are
+        returned with a leading batch dimension and zero-padded.
+    other : LibcintWrapper | None, optional
+        The "other" interface for libcint. Defaults to `None`.
+    hermitian : bool, optional
+        Explicitly request the hermitian integral. Defaults to `False`.
+    out : Tensor | None, optional
+        Preallocated output tensor of shape `(..., nao0, nao1)`, which is
+        overwritten. The returned tensor shares its memory. Defaults to `None`.
+    pool : WorkspacePool | None, optional
+        Pool from which the output tensor is taken if `out` is not given. The
+        result should be returned to the pool with `pool.release` once it is
+        not needed anymore. Defaults to `None`.
+    positions : Tensor | None, optional
+        Batch of geometries of shape `(nbatch, natoms, 3)`. The integrals are
+        evaluated for all geometries with the atoms and basis sets of the
+        wrapper, i.e., its own positions are ignored. The gradients w.r.t.
+        the positions are obtained per geometry. Defaults to `None`.
+    blockdiag : bool, optional
+        Only evaluate the diagonal blocks of the independent fragments of a
+        concatenated wrapper (see :meth:`LibcintWrapper.concatenate`), e.g.,
+        the molecules of a minibatch. Every fragment is treated as a separate
+        system. Defaults to `False`.
+    thresh : float | None, optional
+        Screening threshold. Shell pairs whose overlap is estimated to be
+        below the threshold (see ``GTOoverlap_cond``) are skipped, i.e., the
+        corresponding blocks are zero. The same shell pairs are skipped in
+        the backward pass. Defaults to `None` (no screening).
+    blocksparse : bool, optional
+        Return a block-sparse matrix that only stores the blocks of the shell
+        pairs that are not screened out. The dense matrix is never formed,
+        neither in the forward nor in the backward pass. For hermitian
+        integrals, only the lower triangle of the blocks is stored. Not
+        supported together with `out`, `pool`, `positions` and `blockdiag`.
+        Defaults to `False`.
+    incremental : bool, optional
+        Keep the result of the previous call and only recompute the rows and
+        columns of the shells on atoms that moved since then (see
+        :meth:`LibcintWrapper.update_positions`). Only possible for operators
+        that do not depend on the other atoms (``ovlp`` and ``kin``). The
+        gradients are not affected. Not supported together with `positions`,
+        `blockdiag`, `thresh` and `blocksparse`. Defaults to `False`.
+    grad_thresh : float | None, optional
+        Threshold for the shell blocks of the incoming gradient in the
+        backward pass. The derivative integrals w.r.t. the positions are only
+        evaluated for the blocks whose maximum absolute gradient exceeds the
+        threshold, e.g., for a localized density or a masked loss. Ignored if
+        the gradient w.r.t. the incoming gradient is required (double
+        backward). Not supported together with `positions`, `blockdiag` and
+        `blocksparse`. Defaults to `None` (dense backward pass).
+
+    Returns
+    -------
+    Tensor | BlockSparseMatrix
+        Integral tensor of shape `(..., nao0, nao1)` or, for a batch of
+        geometries, `(nbatch, ..., nao0, nao1)` or, for a batch of molecules,
+        `(nmol, ..., nao_pad, nao_pad)`, or the block-sparse matrix.
+
+    Raises
+    ------
+    ValueError
+        If `out` requires a gradient, `positions` has the wrong shape, or
+        unsupported arguments are given for a batch of molecules or the
+        block-sparse format.
+    """
+    if isinstance(wrapper, BatchedLibcintWrapper):
+        if (
+            positions is not None
+            or thresh is not None
+            or blocksparse
+            or incremental
+            or grad_thresh is not None
+        ):
+            raise ValueError(
+                "Arguments `positions`, `thresh`, `blocksparse`, "
+                "`incremental` and `grad_thresh` are not supported here."
+            )
+        return _int1e_padded(shortname, wrapper, other, hermitian, out, pool)
+
+    if incremental is True and (positions is not None or blocksparse):
+        raise ValueError(
+            "Arguments `positions` and `blocksparse` are not supported for "
+            "incremental integrals."
+        )
+
+    if grad_thresh is not None and (positions is not None or blocksparse):
+        raise ValueError(
+            "Arguments `positions` and `blocksparse` are not supported with "
+            "a gradient threshold."
+        )
+
+    # check and set the other parameters
+    other1 = _check_and_set(wrapper, other)
+
+    plan = get_plan(
+        get_namemgr("int1e", shortname),
+        [wrapper, other1],
+        hermitian=hermitian,
+        blockdiag=blockdiag,
+        thresh=thresh,
+        incremental=incremental,
+        grad_thresh=grad_thresh,
+    )
+
+    allcoeffs, allalphas, allposs = wrapper.params
+    if blocksparse is True:
+        if any(x is not None for x in (out, pool, positions)) or blockdiag:
+            raise ValueError(
+                "Arguments `out`, `pool`, `positions` and `blockdiag` are not "
+                "supported for block-sparse integrals."
+            )
+
+        layout = plan.get_block_layout()
+        values = int2c_blocks(allcoeffs, allalphas, allposs, plan, layout)
+        return BlockSparseMatrix(values, layout, plan.intor.hermitian)
+
+    outshape = plan.outshape
+    if positions is not None:
+        if positions.ndim != 3 or positions.shape[1:] != allposs.shape:
+            raise ValueError(
+                "Positions must have shape (nbatch, "
+                f"{', '.join(str(i) for i in allposs.shape)}), but got "
+                f"{tuple(positions.shape)}."
+            )
+        allposs = positions
+        outshape = (positions.shape[0], *outshape)
+
+    if out is None and pool is not None:
+        dd = {"dtype": wrapper.dtype, "device": wrapper.device}
+        out = pool.get(outshape, **dd)
+    if out is not None and out.requires_grad:
+        raise ValueError("The output tensor must not require a gradient.")
+
+    return _int2c(allcoeffs, allalphas, allposs, plan=plan, out=out)
+
+
+def _int1e_padded(
+    shortname: str,
+    batch: BatchedLibcintWrapper,
+    other: LibcintWrapper | None,
+    hermitian: bool,
+    out: Tensor | None,
+    pool: WorkspacePool | None,
+) -> Tensor:
+    """
+    Padded 2-centre 1-electron integrals of a batch of molecules.
+
+    Parameters
+    ----------
+    shortname : str
+        Short name of the integral.
+    batch : BatchedLibcintWrapper
+        Batched wrapper.
+    other : LibcintWrapper | None
+        Must be `None`.
+    hermitian : bool
+        Explicitly request the hermitian integral.
+    out : Tensor | None
+        Preallocated output tensor.
+    pool : WorkspacePool | None
+        Pool for the output tensor.
+
+    Returns
+    -------
+    Tensor
+        Integral tensor of shape `(nmol, ..., nao_pad, nao_pad)`.
+    """
+    if other is not None:
+        raise ValueError("Argument `other` is not supported for batches.")
+
+    wrapper = batch.wrapper
+    plan = get_plan(
+        get_namemgr("int1e", shortname), [wrapper, wrapper], hermitian=hermitian
+    )
+
+    if out is None and pool is not None:
+        outshape = (batch.nmol, *plan.outshape[:-2], batch.nao(), batch.nao())
+        out = pool.get(outshape, dtype=batch.dtype, device=batch.device)
+    if out is not None and out.requires_grad:
+        raise ValueError("The output tensor must not require a gradient.")
+
+    return int2c_padded(*wrapper.params, plan=plan, batch=batch, out=out)
+
+
+def int1e_norms(
     shortname: str,
     wrapper: LibcintWrapper,
     other: LibcintWrapper | None = None,
     hermitian: bool = False,
+    level: str = "shell",
+    norm: str = "max",
 ) -> Tensor:
     """
-    Shortcut for the 2-centre 1-electron integrals.
+    Norms of the shell or atom blocks of a 2-centre 1-electron integral.
+
+    The norms are computed block by block in the integral driver, i.e., the
+    integral matrix is never stored. This allows to decide on a sparse or
+    dense strategy before the memory is committed. For existing matrices,
+    see :func:`~tad_libcint.interface.condense.block_norms`.
 
     Parameters
     ----------
@@ -412,39 +965,150 @@ def int1e(
         The "other" interface for libcint. Defaults to `None`.
     hermitian : bool, optional
         Explicitly request the hermitian integral. Defaults to `False`.
+    level : str, optional
+        Blocks of the shells ("shell") or of the atoms ("atom"). Defaults to
+        "shell".
+    norm : str, optional
+        Maximum absolute value ("max") or Frobenius norm ("fro") of the
+        blocks (over all components). Defaults to "max".
 
     Returns
     -------
     Tensor
-        Integral tensor.
+        Block norms of shape `(nshells0, nshells1)` or `(natoms, natoms)`
+        (not differentiable).
     """
-    # check and set the other parameters
     other1 = _check_and_set(wrapper, other)
-
-    return _int2c(
-        *wrapper.params,
-        wrappers=[wrapper, other1],
-        namemgr=IntorNameManager("int1e", shortname),
-        hermitian=hermitian,
+    plan = get_plan(
+        get_namemgr("int1e", shortname), [wrapper, other1], hermitian=hermitian
     )
 
+    norms = plan.calc_block_norms(norm)
+    res = reduce_shell_norms(norms, wrapper, other1, level, norm)
+    return torch.from_numpy(res).to(**wrapper.dd)
 
-def overlap(
-    wrapper: LibcintWrapper, other: LibcintWrapper | None = None
+
+def int1e_hessian(
+    shortname: str,
+    mat: Tensor,
+    wrapper: LibcintWrapper,
+    other: LibcintWrapper | None = None,
+    thresh: float | None = None,
 ) -> Tensor:
     """
-    Shortcut for the overlap integral.
+    Position Hessian of a 2-centre 1-electron integral contracted with a
+    matrix, i.e., `sum_ab mat[a,b] d^2 <a|op|b> / dA_x dB_y`.
+
+    The Hessian is obtained in a single pass of the C driver from the second
+    bra derivatives (e.g., "ipipnuc") and the mixed derivatives (e.g.,
+    "ipnucip"), which are contracted block by block and never stored. This
+    avoids the double backward through the integral. For translationally
+    invariant integrals ("ovlp" and "kin"), only the second bra derivatives
+    are evaluated. As for the position gradient, only the derivatives w.r.t.
+    the centres of the basis functions are included (e.g., not w.r.t. the
+    nuclei of "nuc").
 
     Parameters
     ----------
+    shortname : str
+        Short name of the integral.
+    mat : Tensor
+        Matrix of shape `(nao0, nao1)`, e.g., a density matrix.
     wrapper : LibcintWrapper
         Interface for libcint.
     other : LibcintWrapper | None, optional
-        Interface for libcint. Defaults to `None`.
+        The "other" interface for libcint. Defaults to `None`.
+    thresh : float | None, optional
+        Threshold of the overlap-based screening of the shell pairs, the same
+        pairs as in the forward pass are evaluated. Defaults to `None` (no
+        screening).
 
     Returns
     -------
     Tensor
+        Hessian of shape `(natoms, 3, natoms, 3)` (not differentiable).
+
+    Raises
+    ------
+    ValueError
+        If the integral is not an underived integral of a scalar operator.
+    """
+    other1 = _check_and_set(wrapper, other)
+    nmgr = get_namemgr("int1e", shortname)
+    plan = get_plan(nmgr, [wrapper, other1], thresh=thresh)
+    if nmgr.order != 0 or plan.intor.ncomp != 1:
+        raise ValueError(
+            f"Contracted Hessians are only available for underived integrals "
+            f"of scalar operators, but not for '{shortname}'."
+        )
+
+    pairs = None
+    if thresh is not None:
+        pairs = _significant_pairs(plan, mat, None)
+
+    ipip = get_plan(get_namemgr("int1e", f"ipip{shortname}"), [wrapper, other1])
+
+    # the mixed derivatives are only required without invariance
+    mixed = None
+    if nmgr.translation_invariant is False:
+        nmgr_mixed = get_namemgr("int1e", f"ip{shortname}ip")
+        mixed = get_plan(nmgr_mixed, [wrapper, other1]).intor
+
+    hess = ipip.intor.calc_hessian(mat, mixed, pairs)
+    return torch.from_numpy(hess).to(**wrapper.dd)
+
+
+def overlap(
+    wrapper: LibcintWrapper | BatchedLibcintWrapper,
+    other: LibcintWrapper | None = None,
+    out: Tensor | None = None,
+    pool: WorkspacePool | None = None,
+    positions: Tensor | None = None,
+    thresh: float | None = None,
+    blocksparse: bool = False,
+    incremental: bool = False,
+    grad_thresh: float | None = None,
+) -> Tensor | BlockSparseMatrix:
+    """
+    Shortcut for the overlap integral.
+
+    Parameters
+    ----------
+    wrapper : LibcintWrapper | BatchedLibcintWrapper
+        Interface for libcint.
+    other : LibcintWrapper | None, optional
+        Interface for libcint. Defaults to `None`.
+    out : Tensor | None, optional
+        Preallocated output tensor. Defaults to `None`.
+    pool : WorkspacePool | None, optional
+        Pool for the output tensor. Defaults to `None`.
+    positions : Tensor | None, optional
+        Batch of geometries of shape `(nbatch, natoms, 3)`. Defaults to `None`.
+    thresh : float | None, optional
+        Screening threshold of the shell pairs. Defaults to `None`.
+    blocksparse : bool, optional
+        Return a block-sparse matrix. Defaults to `False`.
+    incremental : bool, optional
+        Only recompute the shells on moved atoms. Defaults to `False`.
+    grad_thresh : float | None, optional
+        Threshold for the shell blocks of the incoming gradient in the
+        backward pass. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor | BlockSparseMatrix
         Overlap integral.
     """
-    return int1e("ovlp", wrapper, other=other, hermitian=True)
+    return int1e(
+        "ovlp",
+        wrapper,
+        other=other,
+        hermitian=True,
+        out=out,
+        pool=pool,
+        positions=positions,
+        thresh=thresh,
+        blocksparse=blocksparse,
+        incremental=incremental,
+        grad_thresh=grad_thresh,
+    )
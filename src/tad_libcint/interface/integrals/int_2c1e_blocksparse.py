@@ -0,0 +1,336 @@
+# This file is part of tad-libcint, modified from diffqc/dqc.
+#
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Original file licensed under the Apache License, Version 2.0 by diffqc/dqc.
+# Modifications made by Grimme Group.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integrals: Block-Sparse Two-center One-electron Integrals
+=========================================================
+
+Autograd function for the 2c1e-integrals in the block-sparse format (see
+:class:`~tad_libcint.interface.blocksparse.BlockSparseMatrix`). Only the
+stored shell-pair blocks are evaluated, in the forward as well as in the
+backward pass, where all derivative integrals are obtained for the same
+blocks and contracted element-wise with the incoming gradient.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import torch
+from tad_mctc._version import __tversion__
+from tad_mctc.math import einsum
+
+from tad_libcint.typing import Callable, Protocol, Tensor
+
+from ..blocksparse import BlockLayout
+from ..plan import DerivRecipe, IntegralPlan
+from .utils import mask_inactive_atoms
+
+__all__ = ["int2c_blocks"]
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[[Tensor, Tensor, Tensor], None]
+    saved_tensors: tuple[Tensor, Tensor, Tensor]
+    plan: IntegralPlan
+    layout: BlockLayout
+    env_version: int
+    active_atoms: np.ndarray | None
+
+
+class BaseInt2cBlocks(torch.autograd.Function):
+    """
+    Base class for version-specific autograd function for block-sparse
+    2-centre integrals.
+    """
+
+    @staticmethod
+    def backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
+        # evaluate the derivatives at the positions of the forward pass
+        wrapper = ctx.plan.wrappers[0]
+        if wrapper.env_version != ctx.env_version:
+            with wrapper.at_positions(ctx.saved_tensors[2]):
+                return BaseInt2cBlocks._backward(ctx, grad_out)
+
+        return BaseInt2cBlocks._backward(ctx, grad_out)
+
+    @staticmethod
+    def _backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
+        # grad_out: (..., nnz)
+        allcoeffs = ctx.saved_tensors[0]
+        allalphas = ctx.saved_tensors[1]
+        allposs = ctx.saved_tensors[2]
+        plan = ctx.plan
+        layout = ctx.layout
+        wrappers = plan.wrappers
+
+        # (ncomp, nnz)
+        grad_out2 = grad_out.reshape(-1, layout.nnz)
+
+        # gradient for all atomic positions
+        grad_allposs: Tensor | None = None
+        if allposs.requires_grad:
+
+            def int_fcn(p: IntegralPlan, lay: BlockLayout) -> Tensor:
+                return int2c_blocks(allcoeffs, allalphas, allposs, p, lay)
+
+            # list of tensors with shape: (ndim, ..., nnz)
+            dout_dposs = get_block_integrals(
+                plan.get_deriv_recipes("ip"), layout, int_fcn
+            )
+            ndim = dout_dposs[0].shape[0]
+            shape = (ndim, *grad_out2.shape)
+
+            # negative because the integral calculates the nabla w.r.t. the
+            # spatial coordinate, not the basis central position
+            grad_dpos_i = -einsum(
+                "se,dse->de", grad_out2, dout_dposs[0].reshape(shape)
+            )
+            grad_dpos_j = -einsum(
+                "se,dse->de", grad_out2, dout_dposs[1].reshape(shape)
+            )
+
+            # scatter the elements to the atoms of their rows and columns
+            atom_i = wrappers[0].ao_to_atom()[layout.rows]
+            atom_j = wrappers[1].ao_to_atom()[layout.cols]
+
+            grad_allpossT = torch.zeros_like(allposs).transpose(-2, -1)
+            grad_allpossT = grad_allpossT.index_add(-1, atom_i, grad_dpos_i)
+            grad_allpossT = grad_allpossT.index_add(-1, atom_j, grad_dpos_j)
+            grad_allposs = grad_allpossT.transpose(-2, -1)
+
+            # the gradients of the inactive atoms are zero by definition
+            if ctx.active_atoms is not None:
+                grad_allposs = mask_inactive_atoms(
+                    grad_allposs, ctx.active_atoms
+                )
+
+        # gradient for the basis coefficients
+        grad_allcoeffs: Tensor | None = None
+        grad_allalphas: Tensor | None = None
+        if allcoeffs.requires_grad or allalphas.requires_grad:
+            # all primitive pairs of the stored shell pairs
+            u_plan, _ = plan.get_uncontracted_plan()
+            u_layout, u2e = plan.get_uncontracted_layout(layout)
+            u_wrappers = u_plan.wrappers
+            u_params = u_wrappers[0].params
+
+            # (ncomp, nu_nnz)
+            u_grad_out = grad_out2[:, u2e]
+
+            # gaussian of the row and column of every element
+            ao2shl0 = u_wrappers[0].ao_to_shell()[u_layout.rows]
+            ao2shl1 = u_wrappers[1].ao_to_shell()[u_layout.cols]
+
+            if allcoeffs.requires_grad:
+                dout_dcoeff = int2c_blocks(*u_params, u_plan, u_layout)
+                dout_dcoeff = dout_dcoeff.reshape(u_grad_out.shape)
+
+                # see `BaseInt2c` for the order of division and reduction
+                dout_dcoeff_i = dout_dcoeff / allcoeffs[ao2shl0]
+                dout_dcoeff_j = dout_dcoeff / allcoeffs[ao2shl1]
+
+                grad_dcoeff_i = einsum("se,se->e", u_grad_out, dout_dcoeff_i)
+                grad_dcoeff_j = einsum("se,se->e", u_grad_out, dout_dcoeff_j)
+
+                grad_allcoeffs = torch.zeros_like(allcoeffs)
+                grad_allcoeffs = grad_allcoeffs.index_add(
+                    0, ao2shl0, grad_dcoeff_i
+                )
+                grad_allcoeffs = grad_allcoeffs.index_add(
+                    0, ao2shl1, grad_dcoeff_j
+                )
+
+            if allalphas.requires_grad:
+
+                def u_int_fcn(p: IntegralPlan, lay: BlockLayout) -> Tensor:
+                    return int2c_blocks(*u_params, p, lay)
+
+                dout_dalphas = get_block_integrals(
+                    u_plan.get_deriv_recipes("rr"), u_layout, u_int_fcn
+                )
+
+                # negative because the exponent is negative alpha * (r-ra)^2
+                grad_dalpha_i = -einsum(
+                    "se,se->e",
+                    u_grad_out,
+                    dout_dalphas[0].reshape(u_grad_out.shape),
+                )
+                grad_dalpha_j = -einsum(
+                    "se,se->e",
+                    u_grad_out,
+                    dout_dalphas[1].reshape(u_grad_out.shape),
+                )
+
+                grad_allalphas = torch.zeros_like(allalphas)
+                grad_allalphas = grad_allalphas.index_add(
+                    0, ao2shl0, grad_dalpha_i
+                )
+                grad_allalphas = grad_allalphas.index_add(
+                    0, ao2shl1, grad_dalpha_j
+                )
+
+        return (grad_allcoeffs, grad_allalphas, grad_allposs, None, None)
+
+
+class Int2cBlocks_V1(BaseInt2cBlocks):
+    """
+    Wrapper class to provide the gradient of the block-sparse 2-centre
+    integrals.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        allcoeffs: Tensor,
+        allalphas: Tensor,
+        allposs: Tensor,
+        plan: IntegralPlan,
+        layout: BlockLayout,
+    ) -> Tensor:
+        ctx.save_for_backward(allcoeffs, allalphas, allposs)
+        ctx.plan = plan
+        ctx.layout = layout
+        ctx.env_version = plan.wrappers[0].env_version
+        ctx.active_atoms = plan.wrappers[0].active_atoms
+
+        # (..., nnz)
+        return _calc_blocks(plan, layout)
+
+
+class Int2cBlocks_V2(BaseInt2cBlocks):
+    """
+    Wrapper class to provide the gradient of the block-sparse 2-centre
+    integrals.
+    """
+
+    generate_vmap_rule = True
+
+    @staticmethod
+    def forward(
+        allcoeffs: Tensor,
+        allalphas: Tensor,
+        allposs: Tensor,
+        plan: IntegralPlan,
+        layout: BlockLayout,
+    ) -> Tensor:
+        # (..., nnz)
+        return _calc_blocks(plan, layout)
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[Tensor, Tensor, Tensor, IntegralPlan, BlockLayout],
+        output: Tensor,
+    ) -> None:
+        ctx.save_for_backward(*inputs[:3])
+        ctx.plan = inputs[3]
+        ctx.layout = inputs[4]
+        ctx.env_version = inputs[3].wrappers[0].env_version
+        ctx.active_atoms = inputs[3].wrappers[0].active_atoms
+
+
+def _calc_blocks(plan: IntegralPlan, layout: BlockLayout) -> Tensor:
+    # evaluate the compact blocks (ncomp, di, dj) and reorder the elements to
+    # the component-major layout (..., nnz)
+    buf = plan.calc_pairs(layout.pairs, compact=True)
+    idx = layout.index(plan.intor.ncomp)
+    return buf[idx].reshape(*plan.outshape[:-2], layout.nnz)
+
+
+def int2c_blocks(
+    allcoeffs: Tensor,
+    allalphas: Tensor,
+    allposs: Tensor,
+    plan: IntegralPlan,
+    layout: BlockLayout,
+) -> Tensor:
+    """
+    Calculate the stored elements of the block-sparse 2-centre integrals.
+
+    Parameters
+    ----------
+    allcoeffs : Tensor
+        All coefficients of the basis functions.
+    allalphas : Tensor
+        All exponents of the basis functions.
+    allposs : Tensor
+        All atomic positions of the basis functions.
+    plan : IntegralPlan
+        Plan of the integral.
+    layout : BlockLayout
+        Layout of the shell-pair blocks w.r.t. the wrappers of the plan.
+
+    Returns
+    -------
+    Tensor
+        Stored elements of shape `(..., nnz)`.
+    """
+    Int2cFunction = (
+        Int2cBlocks_V1 if __tversion__ < (2, 0, 0) else Int2cBlocks_V2
+    )
+
+    integral = Int2cFunction.apply(allcoeffs, allalphas, allposs, plan, layout)
+
+    # only for typing
+    assert integral is not None
+    return integral
+
+
+def get_block_integrals(
+    recipes: list[DerivRecipe],
+    layout: BlockLayout,
+    int_fcn: Callable[[IntegralPlan, BlockLayout], Tensor],
+) -> list[Tensor]:
+    # Block-sparse version of `get_integrals`, the results have the shape
+    # (..., nnz) w.r.t. the given layout. Transposed integrals are evaluated
+    # for the transposed layout, as the transposed blocks are usually not
+    # stored (e.g., for hermitian integrals).
+    res: list[Tensor] = []
+    for recipe in recipes:
+        # the new axis of the negated result is already moved
+        if recipe.negate is True:
+            assert recipe.source is not None
+            res.append(-res[recipe.source])
+            continue
+
+        if recipe.transpose_path is None:
+            assert recipe.plan is not None
+            res_i = int_fcn(recipe.plan, layout)
+        else:
+            assert recipe.permute_path is not None
+            plan = recipe.plan
+            if plan is None:
+                assert recipe.source is not None
+                plan = recipes[recipe.source].plan
+            assert plan is not None
+
+            res_i = int_fcn(plan, layout.transposed())
+            res_i = res_i[..., layout.transpose_index]
+
+            # the basis axes are merged into the last one
+            perm = recipe.permute_path[:-2]
+            res_i = res_i.permute(*perm, len(perm))
+
+        # move the new axis (if any) to dimension 0
+        if recipe.new_axis_pos is not None:
+            res_i = torch.movedim(res_i, recipe.new_axis_pos, 0)
+
+        res.append(res_i)
+
+    return res
@@ -0,0 +1,298 @@
+# This file is part of tad-libcint, modified from diffqc/dqc.
+#
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Original file licensed under the Apache License, Version 2.0 by diffqc/dqc.
+# Modifications made by Grimme Group.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integrals: Padded Two-center One-electron Integrals
+===================================================
+
+Autograd function for the 2c1e-integrals of a batch of molecules (see
+:class:`~tad_libcint.interface.batch.BatchedLibcintWrapper`). The results and
+all derivative integrals of the backward pass are evaluated in the padded
+layout `(nmol, ..., nao_pad, nao_pad)`, i.e., blocks between different
+molecules are never computed.
+"""
+
+from __future__ import annotations
+
+import torch
+from tad_mctc._version import __tversion__
+from tad_mctc.math import einsum
+
+from tad_libcint.typing import Callable, Protocol, Tensor
+
+from ..batch import BatchedLibcintWrapper
+from ..plan import IntegralPlan
+from .utils import get_integrals
+
+__all__ = ["int2c_padded"]
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[[Tensor, Tensor, Tensor], None]
+    saved_tensors: tuple[Tensor, Tensor, Tensor]
+    plan: IntegralPlan
+    batch: BatchedLibcintWrapper
+    env_version: int
+
+
+class BaseInt2cPadded(torch.autograd.Function):
+    """
+    Base class for version-specific autograd function for padded 2-centre
+    integrals of a batch of molecules.
+    """
+
+    @staticmethod
+    def backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
+        # evaluate the derivatives at the positions of the forward pass
+        wrapper = ctx.batch.wrapper
+        if wrapper.env_version != ctx.env_version:
+            with wrapper.at_positions(ctx.saved_tensors[2]):
+                return BaseInt2cPadded._backward(ctx, grad_out)
+
+        return BaseInt2cPadded._backward(ctx, grad_out)
+
+    @staticmethod
+    def _backward(ctx: CTX, grad_out: Tensor) -> tuple[Tensor | None, ...]:
+        # grad_out: (nmol, ..., nao_pad, nao_pad)
+        allcoeffs = ctx.saved_tensors[0]
+        allalphas = ctx.saved_tensors[1]
+        allposs = ctx.saved_tensors[2]
+        plan = ctx.plan
+        batch = ctx.batch
+        nmol = batch.nmol
+
+        # gradient for all atomic positions
+        grad_allposs: Tensor | None = None
+        if allposs.requires_grad:
+            natoms = allposs.shape[-2]
+
+            def int_fcn(p: IntegralPlan) -> Tensor:
+                return int2c_padded(allcoeffs, allalphas, allposs, p, batch)
+
+            # list of tensors with shape: (nmol, ndim, ..., nao_pad, nao_pad)
+            dout_dposs = get_integrals(
+                plan.get_deriv_recipes("ip"), int_fcn, batch_dims=1
+            )
+
+            ndim = dout_dposs[0].shape[1]
+            shape = (nmol, ndim, -1, *dout_dposs[0].shape[-2:])
+            grad_out2 = grad_out.reshape(nmol, *shape[2:])
+
+            # negative because the integral calculates the nabla w.r.t. the
+            # spatial coordinate, not the basis central position
+            grad_dpos = -einsum(
+                "bsij,bdsij->dbi", grad_out2, dout_dposs[0].reshape(shape)
+            ) - einsum(
+                "bsij,bdsij->dbj", grad_out2, dout_dposs[1].reshape(shape)
+            )
+
+            # scatter to the atoms, the padding goes to a dummy atom
+            ao_to_atom = batch.ao_to_atom(fill=natoms).reshape(1, -1)
+            grad_allpossT = torch.zeros(
+                (ndim, natoms + 1), dtype=allposs.dtype, device=allposs.device
+            )
+            grad_allpossT = torch.scatter_add(
+                grad_allpossT,
+                dim=-1,
+                index=ao_to_atom.expand(ndim, -1),
+                src=grad_dpos.reshape(ndim, -1),
+            )
+            grad_allposs = grad_allpossT[:, :natoms].transpose(-2, -1)
+
+        # gradient for the basis coefficients
+        grad_allcoeffs: Tensor | None = None
+        grad_allalphas: Tensor | None = None
+        if allcoeffs.requires_grad or allalphas.requires_grad:
+            u_plan, _ = plan.get_uncontracted_plan()
+            u_batch, uao2ao = batch.get_uncontracted_wrapper()
+            u_params = u_batch.params
+            ngauss = allcoeffs.shape[-1]
+
+            # uncontracted grad_out (nmol, ..., nu_ao_pad, nu_ao_pad)
+            u_grad_out = _gather_padded(grad_out, uao2ao)
+
+            # padded AO to gaussian index, the padding goes to a dummy index
+            ao2shl = u_batch.ao_to_shell(fill=ngauss)
+
+            def scatter(grad_ao: Tensor, like: Tensor) -> Tensor:
+                # (nmol, nu_ao_pad) -> (ngauss,)
+                res = like.new_zeros(ngauss + 1)
+                res = res.scatter_add(0, ao2shl.flatten(), grad_ao.flatten())
+                return res[:ngauss]
+
+            if allcoeffs.requires_grad:
+                dout_dcoeff = int2c_padded(*u_params, u_plan, u_batch)
+
+                # the padding is divided by one (the integrals are zero)
+                ones = allcoeffs.new_ones(1)
+                coeffs_ao = torch.cat([allcoeffs, ones])[ao2shl]
+                coeffs_ao = coeffs_ao.reshape(
+                    nmol, *(1,) * (dout_dcoeff.ndim - 3), -1
+                )
+
+                # see `BaseInt2c` for the order of division and reduction
+                dout_dcoeff_i = dout_dcoeff / coeffs_ao[..., None]
+                dout_dcoeff_j = dout_dcoeff / coeffs_ao[..., None, :]
+
+                grad_dcoeff = einsum(
+                    "b...ij,b...ij->bi", u_grad_out, dout_dcoeff_i
+                ) + einsum("b...ij,b...ij->bj", u_grad_out, dout_dcoeff_j)
+                grad_allcoeffs = scatter(grad_dcoeff, allcoeffs)
+
+            if allalphas.requires_grad:
+
+                def u_int_fcn(p: IntegralPlan) -> Tensor:
+                    return int2c_padded(*u_params, p, u_batch)
+
+                dout_dalphas = get_integrals(
+                    u_plan.get_deriv_recipes("rr"), u_int_fcn, batch_dims=1
+                )
+
+                # negative because the exponent is negative alpha * (r-ra)^2
+                grad_dalpha = -einsum(
+                    "b...ij,b...ij->bi", u_grad_out, dout_dalphas[0]
+                ) - einsum("b...ij,b...ij->bj", u_grad_out, dout_dalphas[1])
+                grad_allalphas = scatter(grad_dalpha, allalphas)
+
+        return (grad_allcoeffs, grad_allalphas, grad_allposs, None, None, None)
+
+
+class Int2cPadded_V1(BaseInt2cPadded):
+    """
+    Wrapper class to provide the gradient of the padded 2-centre integrals.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        allcoeffs: Tensor,
+        allalphas: Tensor,
+        allposs: Tensor,
+        plan: IntegralPlan,
+        batch: BatchedLibcintWrapper,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        ctx.save_for_backward(allcoeffs, allalphas, allposs)
+        ctx.plan = plan
+        ctx.batch = batch
+        ctx.env_version = batch.wrapper.env_version
+
+        # (nmol, ..., nao_pad, nao_pad)
+        return plan.calc_padded(
+            batch.mol_shl_loc, batch.mol_atm_loc, batch.nao(), out
+        )
+
+
+class Int2cPadded_V2(BaseInt2cPadded):
+    """
+    Wrapper class to provide the gradient of the padded 2-centre integrals.
+    """
+
+    generate_vmap_rule = True
+
+    @staticmethod
+    def forward(
+        allcoeffs: Tensor,
+        allalphas: Tensor,
+        allposs: Tensor,
+        plan: IntegralPlan,
+        batch: BatchedLibcintWrapper,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        # (nmol, ..., nao_pad, nao_pad)
+        return plan.calc_padded(
+            batch.mol_shl_loc, batch.mol_atm_loc, batch.nao(), out
+        )
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[
+            Tensor,
+            Tensor,
+            Tensor,
+            IntegralPlan,
+            BatchedLibcintWrapper,
+            Tensor | None,
+        ],
+        output: Tensor,
+    ) -> None:
+        ctx.save_for_backward(*inputs[:3])
+        ctx.plan = inputs[3]
+        ctx.batch = inputs[4]
+        ctx.env_version = inputs[4].wrapper.env_version
+
+
+def int2c_padded(
+    allcoeffs: Tensor,
+    allalphas: Tensor,
+    allposs: Tensor,
+    plan: IntegralPlan,
+    batch: BatchedLibcintWrapper,
+    out: Tensor | None = None,
+) -> Tensor:
+    """
+    Calculate the padded 2-centre integrals of a batch of molecules.
+
+    Parameters
+    ----------
+    allcoeffs : Tensor
+        All coefficients of the basis functions.
+    allalphas : Tensor
+        All exponents of the basis functions.
+    allposs : Tensor
+        All atomic positions of the basis functions.
+    plan : IntegralPlan
+        Plan of the integral for the wrapper containing all molecules.
+    batch : BatchedLibcintWrapper
+        Batched wrapper defining the molecules and the padding.
+    out : Tensor | None, optional
+        Preallocated output tensor. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Integral tensor of shape `(nmol, ..., nao_pad, nao_pad)`.
+    """
+    Int2cFunction = (
+        Int2cPadded_V1 if __tversion__ < (2, 0, 0) else Int2cPadded_V2
+    )
+
+    integral = Int2cFunction.apply(
+        allcoeffs, allalphas, allposs, plan, batch, out
+    )
+
+    # only for typing
+    assert integral is not None
+    return integral
+
+
+def _gather_padded(inp: Tensor, mapidx: Tensor) -> Tensor:
+    # gather the last two dimensions of inp (nmol, ..., nold, nold) with a
+    # different mapping for every molecule, mapidx: (nmol, nnew)
+    nmol, nnew = mapidx.shape
+    ones = (1,) * (inp.ndim - 3)
+
+    idx = mapidx.reshape(nmol, *ones, nnew, 1)
+    idx = idx.expand(*inp.shape[:-2], nnew, inp.shape[-1])
+    out = torch.gather(inp, -2, idx)
+
+    idx = mapidx.reshape(nmol, *ones, 1, nnew)
+    idx = idx.expand(*out.shape[:-1], nnew)
+    return torch.gather(out, -1, idx)
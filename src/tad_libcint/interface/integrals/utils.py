@@ -26,90 +26,54 @@ This module contains utility functions for the integral interface.
 
 from __future__ import annotations
 
-import copy
-
+import numpy as np
 import torch
 
 from tad_libcint.typing import Callable, Tensor
 
-from ..namemanager import IntorNameManager
-from ..wrapper import LibcintWrapper
+from ..plan import DerivRecipe, IntegralPlan
 
-__all__ = ["get_integrals", "gather_at_dims"]
+__all__ = ["get_integrals", "gather_at_dims", "mask_inactive_atoms"]
 
 
 def get_integrals(
-    int_nmgrs: list[IntorNameManager],
-    wrappers: list[LibcintWrapper],
-    int_fcn: Callable[[list[LibcintWrapper], IntorNameManager], Tensor],
-    new_axes_pos: list[int | None],
+    recipes: list[DerivRecipe],
+    int_fcn: Callable[[IntegralPlan], Tensor],
+    batch_dims: int = 0,
 ) -> list[Tensor]:
-    # Return the list of tensors of the integrals given by the list of integral
-    # names. Int_fcn is the integral function that receives the name and
-    # returns the results. If new_axes_pos is specified, then move the new axes
-    # to 0, otherwise, just leave it as it is.
+    # Return the list of tensors of the integrals given by the list of
+    # recipes (see `IntegralPlan.get_deriv_recipes`). Int_fcn is the integral
+    # function that receives the plan and returns the results. If the recipe
+    # introduces a new axis, it is moved to 0 (or directly after the leading
+    # `batch_dims` batch dimensions).
 
     res: list[Tensor] = []
-    # indicating if the integral is available in the libcint-generated file
-    int_avail: list[bool] = [False] * len(int_nmgrs)
-
-    for i in range(len(int_nmgrs)):
-        res_i: Tensor | None = None
-
-        # check if the integral can be calculated from the previous results
-        for j in range(i - 1, -1, -1):
-            # check the integral names equivalence
-            transpose_path = int_nmgrs[j].get_transpose_path_to(int_nmgrs[i])
-            if transpose_path is not None:
-                # if the swapped wrappers remain unchanged, then just use the
-                # transposed version of the previous version
-                # TODO: think more about this (do we need to use different
-                # transpose path? e.g. transpose_path[::-1])
-                twrappers = _swap_list(wrappers, transpose_path)
-                if twrappers == wrappers:
-                    res_i = _transpose(res[j], transpose_path)
-                    permute_path = int_nmgrs[j].get_comp_permute_path(
-                        transpose_path
-                    )
-                    res_i = res_i.permute(*permute_path)
-                    break
-
-                # otherwise, use the swapped integral with the swapped wrappers,
-                # only if the integral is available in the libcint-generated
-                # files
-                elif int_avail[j]:
-                    res_i = int_fcn(twrappers, int_nmgrs[j])
-                    res_i = _transpose(res_i, transpose_path)
-                    permute_path = int_nmgrs[j].get_comp_permute_path(
-                        transpose_path
-                    )
-                    res_i = res_i.permute(*permute_path)
-                    break
-
-                # if the integral is not available, then continue the searching
-                else:
-                    continue
-
-        if res_i is None:
-            try:
-                # successfully executing the line below indicates that the integral
-                # is available in the libcint-generated files
-                res_i = int_fcn(wrappers, int_nmgrs[i])
-            except AttributeError as e:
-                msg = f"The integral {int_nmgrs[i].fullname} is not available from libcint, please add it"
-
-                raise AttributeError(msg) from e
-
-            int_avail[i] = True
+    for recipe in recipes:
+        if recipe.negate is True:
+            assert recipe.source is not None
+            res_i = -res[recipe.source]
+        elif recipe.source is not None:
+            res_i = res[recipe.source]
+        else:
+            assert recipe.plan is not None
+            res_i = int_fcn(recipe.plan)
+
+        if recipe.transpose_path is not None:
+            assert recipe.permute_path is not None
+            res_i = _transpose(res_i, recipe.transpose_path)
+            res_i = res_i.permute(
+                *range(batch_dims),
+                *(p + batch_dims for p in recipe.permute_path),
+            )
 
         res.append(res_i)
 
     # move the new axes (if any) to dimension 0
-    assert res_i is not None
-    for i in range(len(res)):
-        new_axes_pos_i = new_axes_pos[i]
-        if new_axes_pos_i is not None:
-            res[i] = torch.movedim(res[i], new_axes_pos_i, 0)
+    for i, recipe in enumerate(recipes):
+        if recipe.new_axis_pos is not None:
+            res[i] = torch.movedim(
+                res[i], recipe.new_axis_pos + batch_dims, batch_dims
+            )
 
     return res
 
@@ -121,17 +85,6 @@ def _transpose(a: Tensor, axes: list[tuple[int, int]]) -> Tensor:
     return a
 
 
-def _swap_list(a: list, swaps: list[tuple[int, int]]) -> list:
-    # swap the elements according to the swaps input
-    res = copy.copy(a)  # shallow copy
-    for idxs in swaps:
-        res[idxs[0]], res[idxs[1]] = (
-            res[idxs[1]],
-            res[idxs[0]],
-        )  # swap the elements
-    return res
-
-
 def gather_at_dims(
     inp: Tensor, mapidxs: list[Tensor], dims: list[int]
 ) -> Tensor:
@@ -149,3 +102,10 @@ def gather_at_dims(
         map2 = map2.expand(*out.shape[:dim], -1, *out.shape[dim + 1 :])
         out = torch.gather(out, dim=dim, index=map2)
     return out
+
+
+def mask_inactive_atoms(grad: Tensor, active: np.ndarray) -> Tensor:
+    # set the position gradients of the inactive atoms to zero
+    # grad: (..., natom, ndim), active: (natom,)
+    mask = torch.as_tensor(active, device=grad.device)
+    return torch.where(mask[:, None], grad, torch.zeros_like(grad))
@@ -28,17 +28,26 @@ from __future__ import annotations
 
 import ctypes
 import operator
+from collections import OrderedDict
 from functools import reduce
 
 import numpy as np
-from tad_mctc.convert import numpy_to_tensor
+import torch
 
 from tad_libcint.api import CGTO, CINT
 from tad_libcint.typing import Tensor
 
+from .condense import BLOCK_NORMS
 from .namemanager import IntorNameManager
-from .utils import int2ctypes, np2ctypes
-from .wrapper import LibcintWrapper
+from .wrapper import ATOM_OF, NPRIM_OF, PTR_COORD, LibcintWrapper
+
+__all__ = ["Intor", "OptimizerCache", "OPTIMIZER_CACHE"]
+
+LOCAL_OPS = ("ovlp", "kin")
+"""
+Raw operators whose shell pair blocks only depend on the positions of the two
+shells. Operators like ``nuc`` or ``rinv`` depend on all atoms.
+"""
 
 ################### integrator (direct interface to libcint) ###################
 
@@ -46,6 +55,24 @@ from .wrapper import LibcintWrapper
 class Intor:
     """
     Interface to the libcint integrals.
+
+    The operator, output shape and shell slices are resolved once, such that
+    the same object can be used for repeated evaluations (see
+    :class:`~tad_libcint.interface.plan.IntegralPlan`).
+
+    In the block-diagonal mode, only the shell pairs within the independent
+    fragments of the wrapper (see :meth:`LibcintWrapper.concatenate`) are
+    evaluated and all other blocks are zero.
+
+    With a screening threshold, only the shell pairs whose overlap estimate
+    (``GTOoverlap_cond``) exceeds the threshold are evaluated, all other
+    blocks are zero. The estimate does not depend on the operator, i.e., the
+    integral and its derivatives skip the same shell pairs.
+
+    In the incremental mode, the last result is cached and only the rows and
+    columns of the shells on atoms that moved since the previous evaluation
+    are recomputed. This is only valid for operators whose blocks depend on
+    the two shells alone (see :data:`LOCAL_OPS`).
     """
 
     def __init__(
@@ -53,9 +80,48 @@ class Intor:
         int_nmgr: IntorNameManager,
         wrappers: list[LibcintWrapper],
         hermitian: bool = False,
+        blockdiag: bool = False,
+        thresh: float | None = None,
+        incremental: bool = False,
     ) -> None:
         assert len(wrappers) > 0
         wrapper0 = wrappers[0]
+
+        self.blockdiag = blockdiag
+        if blockdiag is True:
+            if wrapper0.fragments is None or any(
+                w is not wrapper0 for w in wrappers
+            ):
+                raise ValueError(
+                    "Block-diagonal integrals require the same concatenated "
+                    "wrapper (see `LibcintWrapper.concatenate`) for all bases."
+                )
+
+        self.thresh = thresh
+        if thresh is not None:
+            if thresh <= 0.0:
+                raise ValueError("Screening threshold must be positive.")
+            if blockdiag is True or len(wrappers) != 2:
+                raise ValueError(
+                    "Screening is only supported for dense 2-centre integrals."
+                )
+        self._screened: tuple[int, np.ndarray, np.ndarray] | None = None
+
+        self.incremental = incremental
+        if incremental is True:
+            if int_nmgr.rawopname not in LOCAL_OPS:
+                raise ValueError(
+                    f"Incremental evaluation is not possible for the operator "
+                    f"'{int_nmgr.rawopname}', which does not only depend on "
+                    f"the two shells (allowed: {', '.join(LOCAL_OPS)})."
+                )
+            if blockdiag is True or thresh is not None or len(wrappers) != 2:
+                raise ValueError(
+                    "Incremental evaluation is only supported for dense "
+                    "2-centre integrals without screening."
+                )
+        self._cache: tuple[np.ndarray, Tensor] | None = None
+
         self.int_type = int_nmgr.int_type
         self.atm, self.bas, self.env = wrapper0.atm_bas_env
         self.wrapper0 = wrapper0
@@ -67,75 +133,946 @@ class Intor:
         self.hermitian = hermitian if int_nmgr.order == 0 else False
 
         # get the operator
-        opname = int_nmgr.get_intgl_name(wrapper0.spherical)
-        self.op = getattr(CINT, opname)
-        self.optimizer = _get_intgl_optimizer(
-            opname, self.atm, self.bas, self.env
-        )
+        self.opname = int_nmgr.get_intgl_name(wrapper0.spherical)
+        self.op = getattr(CINT, self.opname)
 
         # prepare the output
         comp_shape = int_nmgr.get_intgl_components_shape()
         self.outshape = comp_shape + tuple(w.nao() for w in wrappers)
         self.ncomp = reduce(operator.mul, comp_shape, 1)
         self.shls_slice = sum((w.shell_idxs for w in wrappers), ())
-        self.integral_done = False
+        self._c_shls_slice = (ctypes.c_int * len(self.shls_slice))(
+            *self.shls_slice
+        )
+
+        # raw pointers for the typed C functions (the arrays are only ever
+        # modified in place, i.e., the addresses remain valid)
+        self._c_ao_loc = wrapper0.full_shell_to_aoloc.ctypes.data
+        self._c_env_args = (
+            self.atm.ctypes.data,
+            self.atm.shape[0],
+            self.bas.ctypes.data,
+            self.bas.shape[0],
+            self.env.ctypes.data,
+        )
+
+    @property
+    def optimizer(self) -> ctypes.c_void_p:
+        """
+        Optimizer for the current version of the environment.
 
-    def calc(self) -> Tensor:
+        Returns
+        -------
+        ctypes.c_void_p
+            Optimizer for the integrals.
+        """
+        return OPTIMIZER_CACHE.get(self.opname, self.wrapper0)
+
+    def calc(self, out: Tensor | None = None) -> Tensor:
         """
         Calculate the integral.
 
+        Parameters
+        ----------
+        out : Tensor | None, optional
+            Preallocated output tensor of shape `outshape`, which is
+            overwritten. Defaults to `None` (new allocation).
+
         Returns
         -------
         Tensor
-            Integral tensor.
+            Integral tensor (`out` if given).
+
+        Raises
+        ------
+        ValueError
+            If the integral type is unknown or `out` has the wrong shape.
+        """
+        if out is not None and tuple(out.shape) != self.outshape:
+            raise ValueError(
+                f"Output tensor has shape {tuple(out.shape)}, but the "
+                f"integral has shape {self.outshape}."
+            )
+
+        if self.int_type in ("int1e", "int2c2e"):
+            if self.thresh is not None:
+                return self.calc_pairs(self.screened_pairs(), out=out)
+            if self.incremental is True:
+                return self._int2c_incremental(out)
+            return self._int2c(out)
+
+        raise ValueError(f"Unknown integral type: {self.int_type}.")
+
+    def calc_batch(
+        self, positions: Tensor, out: Tensor | None = None
+    ) -> Tensor:
+        """
+        Calculate the integral for a batch of geometries. The atoms, basis
+        sets and all other settings are taken from the wrapper.
+
+        Parameters
+        ----------
+        positions : Tensor
+            Positions of all atoms of the (parent) wrapper in all geometries
+            of shape `(nbatch, natoms, 3)`.
+        out : Tensor | None, optional
+            Preallocated output tensor of shape `(nbatch, *outshape)`.
+            Defaults to `None` (new allocation).
+
+        Returns
+        -------
+        Tensor
+            Integral tensor of shape `(nbatch, *outshape)`.
 
         Raises
         ------
         ValueError
-            If the integral type is unknown.
+            If the integral type is unknown or the shapes do not match.
         """
-        assert not self.integral_done
-        self.integral_done = True
+        if self.blockdiag is True:
+            raise ValueError("Batches of geometries are not block-diagonal.")
+        if self.thresh is not None:
+            raise ValueError("Batches of geometries cannot be screened.")
+        if self.incremental is True:
+            raise ValueError("Batches of geometries are not incremental.")
+
+        natm = self.atm.shape[0]
+        if positions.ndim != 3 or positions.shape[1:] != (natm, 3):
+            raise ValueError(
+                f"Positions must have shape (nbatch, {natm}, 3), but got "
+                f"{tuple(positions.shape)}."
+            )
+
+        outshape = (positions.shape[0], *self.outshape)
+        if out is not None and tuple(out.shape) != outshape:
+            raise ValueError(
+                f"Output tensor has shape {tuple(out.shape)}, but the "
+                f"integral has shape {outshape}."
+            )
 
         if self.int_type in ("int1e", "int2c2e"):
-            return self._int2c()
+            return self._int2c_batch(positions, out)
 
         raise ValueError(f"Unknown integral type: {self.int_type}.")
 
-    def _int2c(self) -> Tensor:
+    def calc_padded(
+        self,
+        mol_shl_loc: np.ndarray,
+        mol_atm_loc: np.ndarray,
+        nao_pad: int,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        """
+        Calculate the integral for a batch of molecules that are stored
+        consecutively in the wrapper. Every molecule is treated as an
+        independent system and the result is zero-padded to a common size.
+
+        Parameters
+        ----------
+        mol_shl_loc : np.ndarray
+            Shell offsets of the molecules of shape `(nmol + 1,)` (int32).
+        mol_atm_loc : np.ndarray
+            Atom offsets of the molecules of shape `(nmol + 1,)` (int32).
+        nao_pad : int
+            Padded number of atomic orbitals.
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor of shape `(nmol, ..., nao_pad, nao_pad)`.
+
+        Raises
+        ------
+        ValueError
+            If the integral type is not supported.
+        """
+        if self.int_type not in ("int1e", "int2c2e"):
+            raise ValueError(f"Unknown integral type: {self.int_type}.")
+
+        nmol = mol_shl_loc.shape[0] - 1
+        outshape = (nmol, *self.outshape[:-2], nao_pad, nao_pad)
+        if out is not None and tuple(out.shape) != outshape:
+            raise ValueError(
+                f"Output tensor has shape {tuple(out.shape)}, but the "
+                f"integral has shape {outshape}."
+            )
+
+        buf = _get_buffer(outshape, out)
+        CGTO.GTOint2c_padded(
+            self.op,
+            buf.data_ptr(),
+            self.ncomp,
+            self.hermitian,
+            mol_shl_loc.ctypes.data,
+            mol_atm_loc.ctypes.data,
+            nmol,
+            nao_pad,
+            self._c_ao_loc,
+            *self._c_env_args,
+        )
+        return self._finalize(buf, out)
+
+    def calc_pairs(
+        self,
+        pairs: np.ndarray,
+        compact: bool = False,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        """
+        Calculate the integral only for an explicit list of shell pairs.
+
+        In the dense mode, the blocks of the pairs are written into a
+        zero-initialized tensor of shape `outshape`. For hermitian integrals,
+        the transposed block is filled as well, i.e., only one of the pairs
+        `(i, j)` and `(j, i)` should be given. In the compact mode, the blocks
+        are stored consecutively in a flat tensor, where block `p` of shape
+        `(ncomp, di, dj)` starts at `pair_block_loc(pairs)[p]`.
+
+        Parameters
+        ----------
+        pairs : np.ndarray
+            Shell pairs of shape `(npairs, 2)`. The indices are relative to
+            the shells of the respective wrappers.
+        compact : bool, optional
+            Whether to return the compact block buffer instead of the dense
+            tensor. Defaults to `False`.
+        out : Tensor | None, optional
+            Preallocated output tensor. In the dense mode, it is overwritten
+            completely. Defaults to `None` (new allocation).
+
+        Returns
+        -------
+        Tensor
+            Dense integral tensor of shape `outshape` or compact block buffer
+            of shape `(pair_block_loc(pairs)[-1],)`.
+
+        Raises
+        ------
+        ValueError
+            If the integral type is not supported or the pairs or the output
+            shape are invalid.
+        """
+        if self.int_type not in ("int1e", "int2c2e"):
+            raise ValueError(f"Unknown integral type: {self.int_type}.")
+        if self.blockdiag is True:
+            raise ValueError("Shell pairs are not supported for blockdiag.")
+
+        pairs = self._check_pairs(pairs)
+        if compact is True:
+            block_loc = self.pair_block_loc(pairs)
+            outshape: tuple[int, ...] = (int(block_loc[-1]),)
+            c_block_loc = block_loc.ctypes.data
+        else:
+            outshape = self.outshape
+            c_block_loc = None
+
+        if out is not None and tuple(out.shape) != outshape:
+            raise ValueError(
+                f"Output tensor has shape {tuple(out.shape)}, but the "
+                f"integral has shape {outshape}."
+            )
+
+        buf = _get_buffer(outshape, out)
+        if compact is False:
+            buf.zero_()
+
+        self._fill_pairs(buf, pairs, c_block_loc)
+        return self._finalize(buf, out)
+
+    def calc_block_norms(self, norm: str = "max") -> np.ndarray:
+        """
+        Calculate the norms of the shell blocks of the integral (over all
+        components) without storing the integral.
+
+        Parameters
+        ----------
+        norm : str, optional
+            Maximum absolute value ("max") or Frobenius norm ("fro") of the
+            blocks. Defaults to "max".
+
+        Returns
+        -------
+        np.ndarray
+            Norms of shape `(nshells0, nshells1)`.
+
+        Raises
+        ------
+        ValueError
+            If the integral type or the norm is not supported.
+        """
+        if self.int_type not in ("int1e", "int2c2e"):
+            raise ValueError(f"Unknown integral type: {self.int_type}.")
+        if norm not in BLOCK_NORMS:
+            raise ValueError(f"Unknown block norm: {norm}.")
+
+        ish0, ish1, jsh0, jsh1 = self.shls_slice
+        out = np.empty((ish1 - ish0, jsh1 - jsh0), dtype=np.float64)
+        CGTO.GTOint2c_block_norms(
+            self.op,
+            out.ctypes.data,
+            self.ncomp,
+            self.hermitian,
+            BLOCK_NORMS[norm],
+            self._c_shls_slice,
+            self._c_ao_loc,
+            self.optimizer,
+            *self._c_env_args,
+        )
+        return out
+
+    def calc_grad(
+        self,
+        ket: Intor | None,
+        trans: bool,
+        grad_out: Tensor,
+        pairs: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Calculate the position gradient of the underlying integral contracted
+        with the incoming gradient, where this object evaluates the bra
+        derivative and `ket` the ket derivative (both with 3 components).
+
+        The derivative integrals are contracted block by block in the C
+        driver, i.e., they are never stored.
+
+        Parameters
+        ----------
+        ket : Intor | None
+            Integral of the ket derivative. If `trans` is `True`, it is
+            evaluated for the swapped shells (e.g., `<d j|op|i>` for
+            symmetric operators). If `None`, the integral is translationally
+            invariant and the ket derivative is the negative bra derivative.
+        trans : bool
+            Whether the ket derivative is obtained from the swapped shells.
+        grad_out : Tensor
+            Incoming gradient of shape `(nao0, nao1)`.
+        pairs : np.ndarray | None, optional
+            Shell pairs of shape `(npairs, 2)`, relative to the slices of this
+            object. Defaults to `None` (all pairs).
+
+        Returns
+        -------
+        np.ndarray
+            Gradient of shape `(natm, 3)`.
+
+        Raises
+        ------
+        ValueError
+            If the integrals are not supported or the shapes do not match.
+        """
+        kcomp = 3 if ket is None else ket.ncomp
+        if self.ncomp != 3 or kcomp != 3 or self.blockdiag is True:
+            raise ValueError(
+                "Contracted gradients require dense derivative integrals of "
+                "a scalar operator."
+            )
+        if tuple(grad_out.shape) != self.outshape[-2:]:
+            raise ValueError(
+                f"Incoming gradient has shape {tuple(grad_out.shape)}, but "
+                f"the integral has shape {self.outshape[-2:]}."
+            )
+
+        c_pairs = None
+        npairs = 0
+        if pairs is not None:
+            pairs = self._check_pairs(pairs)
+            c_pairs = pairs.ctypes.data
+            npairs = pairs.shape[0]
+
+        # no-op for contiguous double precision CPU tensors
+        gout = grad_out.detach().to(device="cpu", dtype=torch.float64)
+        gout = gout.contiguous()
+
+        grad = np.zeros((self.atm.shape[0], 3), dtype=np.float64)
+        CGTO.GTOgrad_int2c(
+            self.op,
+            None if ket is None else ket.op,
+            int(trans),
+            grad.ctypes.data,
+            gout.data_ptr(),
+            c_pairs,
+            npairs,
+            self._c_shls_slice,
+            self._c_ao_loc,
+            self.optimizer,
+            None if ket is None else ket.optimizer,
+            *self._c_env_args,
+        )
+        return grad
+
+    def calc_prim_grad(
+        self,
+        grad_out: Tensor,
+        value: bool = True,
+        bra: Intor | None = None,
+        ket: Intor | None = None,
+        trans: bool = False,
+        pairs: np.ndarray | None = None,
+    ) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """
+        Calculate the primitive-pair contributions of this integral and of
+        its bra and ket derivative integrals contracted with the incoming
+        gradient (scalar operators only).
+
+        All integrals are evaluated in a single pass over the primitive pairs
+        of the C driver, which treats the primitives as temporary shells,
+        i.e., neither an uncontracted wrapper nor uncontracted integrals are
+        required. The contributions of this integral divided by the
+        contraction coefficients are the gradient w.r.t. them. With the `rr`
+        derivatives, the negative contributions of the derivatives are the
+        gradient w.r.t. the exponents.
+
+        Parameters
+        ----------
+        grad_out : Tensor
+            Incoming gradient of shape `(nao0, nao1)`.
+        value : bool, optional
+            Whether to calculate the contributions of this integral. Defaults
+            to `True`.
+        bra : Intor | None, optional
+            Derivative integral of the bra primitives. Defaults to `None` (no
+            derivative contributions).
+        ket : Intor | None, optional
+            Derivative integral of the ket primitives. If `trans` is `True`,
+            it is evaluated for the swapped primitives. Defaults to `None`
+            (`bra` is used for both).
+        trans : bool, optional
+            Whether the ket derivative is obtained from the swapped
+            primitives. Defaults to `False`.
+        pairs : np.ndarray | None, optional
+            Shell pairs of shape `(npairs, 2)`, relative to the slices of this
+            object. Defaults to `None` (all pairs).
+
+        Returns
+        -------
+        tuple[np.ndarray | None, np.ndarray | None]
+            Contributions of this integral and of the derivatives of shape
+            `(ngauss,)` for all primitives of the environment (in the order
+            of the shells), `None` if not requested.
+
+        Raises
+        ------
+        ValueError
+            If the integrals are not supported or the shapes do not match.
+        """
+        ncomps = [i.ncomp for i in (self, bra, ket) if i is not None]
+        if any(n != 1 for n in ncomps) or self.blockdiag is True:
+            raise ValueError(
+                "Primitive gradients require dense integrals of a scalar "
+                "operator."
+            )
+        if tuple(grad_out.shape) != self.outshape:
+            raise ValueError(
+                f"Incoming gradient has shape {tuple(grad_out.shape)}, but "
+                f"the integral has shape {self.outshape}."
+            )
+
+        c_pairs = None
+        npairs = 0
+        if pairs is not None:
+            pairs = self._check_pairs(pairs)
+            c_pairs = pairs.ctypes.data
+            npairs = pairs.shape[0]
+
+        # no-op for contiguous double precision CPU tensors
+        gout = grad_out.detach().to(device="cpu", dtype=torch.float64)
+        gout = gout.contiguous()
+
+        ngauss = int(self.bas[:, NPRIM_OF].sum())
+        gval = np.zeros(ngauss, dtype=np.float64) if value is True else None
+        gderiv = None if bra is None else np.zeros(ngauss, dtype=np.float64)
+        CGTO.GTOgrad_prim_int2c(
+            None if gval is None else self.op,
+            None if bra is None else bra.op,
+            None if ket is None else ket.op,
+            int(trans),
+            None if gval is None else gval.ctypes.data,
+            None if gderiv is None else gderiv.ctypes.data,
+            gout.data_ptr(),
+            c_pairs,
+            npairs,
+            self._c_shls_slice,
+            self._c_ao_loc,
+            *self._c_env_args,
+        )
+        return gval, gderiv
+
+    def calc_hessian(
+        self,
+        mat: Tensor,
+        mixed: Intor | None = None,
+        pairs: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Calculate the position Hessian of an integral w.r.t. the centres of
+        the basis functions contracted with a matrix, where this object
+        evaluates the second bra derivative `<d d i|op|j>` (9 components,
+        e.g., "ipipnuc") and `mixed` the mixed derivative `<d i|op|d j>`
+        (9 components, e.g., "ipnucip").
+
+        The second ket derivative is obtained from the second bra derivative
+        of the swapped shells. For translationally invariant integrals
+        (`mixed` is `None`), all second derivatives of a shell pair follow
+        from the second bra derivative. The derivative integrals are
+        contracted block by block in the C driver, i.e., they are never
+        stored.
+
+        Parameters
+        ----------
+        mat : Tensor
+            Matrix of shape `(nao0, nao1)`, e.g., a density matrix.
+        mixed : Intor | None, optional
+            Integral of the mixed derivative. Defaults to `None`, i.e., the
+            integral is translationally invariant.
+        pairs : np.ndarray | None, optional
+            Shell pairs of shape `(npairs, 2)`, relative to the slices of this
+            object. Defaults to `None` (all pairs).
+
+        Returns
+        -------
+        np.ndarray
+            Hessian of shape `(natm, 3, natm, 3)`.
+
+        Raises
+        ------
+        ValueError
+            If the integrals are not supported or the shapes do not match.
+        """
+        mcomp = 9 if mixed is None else mixed.ncomp
+        if self.ncomp != 9 or mcomp != 9 or self.blockdiag is True:
+            raise ValueError(
+                "Contracted Hessians require the dense second derivatives "
+                "of a scalar operator."
+            )
+        if tuple(mat.shape) != self.outshape[-2:]:
+            raise ValueError(
+                f"Matrix has shape {tuple(mat.shape)}, but the integral has "
+                f"shape {self.outshape[-2:]}."
+            )
+
+        c_pairs = None
+        npairs = 0
+        if pairs is not None:
+            pairs = self._check_pairs(pairs)
+            c_pairs = pairs.ctypes.data
+            npairs = pairs.shape[0]
+
+        # no-op for contiguous double precision CPU tensors
+        dm = mat.detach().to(device="cpu", dtype=torch.float64).contiguous()
+
+        natm = self.atm.shape[0]
+        hess = np.zeros((natm, 3, natm, 3), dtype=np.float64)
+        CGTO.GTOhess_int2c(
+            self.op,
+            None if mixed is None else mixed.op,
+            hess.ctypes.data,
+            dm.data_ptr(),
+            c_pairs,
+            npairs,
+            self._c_shls_slice,
+            self._c_ao_loc,
+            self.optimizer,
+            None if mixed is None else mixed.optimizer,
+            *self._c_env_args,
+        )
+        return hess
+
+    def screened_pairs(self) -> np.ndarray:
+        """
+        Shell pairs that are not screened out for the current geometry (all
+        shell pairs if no threshold is set).
+
+        The candidates are taken from the spatial index of the wrapper (see
+        :meth:`LibcintWrapper.get_shell_pairs`) and refined with the overlap
+        estimate of libcint, i.e., no quadratic loop over all shell pairs is
+        required. The pairs are only recomputed if the environment changed
+        (see :attr:`LibcintWrapper.env_version`). For hermitian integrals,
+        only the lower triangle is returned (see :meth:`calc_pairs`).
+
+        With a skin distance (see :meth:`LibcintWrapper.set_pair_skin`), the
+        pairs of the Verlet list are used without refinement and reused as
+        long as the list is valid.
+
+        Returns
+        -------
+        np.ndarray
+            Shell pairs of shape `(npairs, 2)` (int32).
+        """
+        version = self.wrapper0.env_version
+        if self._screened is not None and self._screened[0] == version:
+            return self._screened[2]
+
+        ish0, ish1, jsh0, jsh1 = self.shls_slice
+        cand = np.empty((0, 2), dtype=np.int32)
+        if self.thresh is None:
+            mask = np.ones((ish1 - ish0, jsh1 - jsh0), dtype=bool)
+            if self.hermitian is True:
+                mask = np.tril(mask)
+            pairs = np.ascontiguousarray(np.argwhere(mask), dtype=np.int32)
+        else:
+            cand = self.wrapper0.get_shell_pairs(self.thresh)
+            if self._screened is not None and self._screened[1] is cand:
+                # the Verlet list is still valid
+                self._screened = (version, cand, self._screened[2])
+                return self._screened[2]
+
+            pairs = _restrict_pairs(cand, self.shls_slice, self.hermitian)
+            if self.wrapper0.pair_skin == 0.0:
+                # cond ~ -log(max|<i|j>|) of each shell pair
+                cond = np.empty(pairs.shape[0], dtype=np.float64)
+                CGTO.GTOoverlap_cond_pairs(
+                    cond.ctypes.data,
+                    pairs.ctypes.data,
+                    pairs.shape[0],
+                    *self._c_env_args,
+                )
+                pairs = pairs[cond < -np.log(self.thresh)]
+
+            pairs = np.ascontiguousarray(pairs - (ish0, jsh0), dtype=np.int32)
+
+        self._screened = (version, cand, pairs)
+        return pairs
+
+    def pair_block_loc(self, pairs: np.ndarray) -> np.ndarray:
+        """
+        Offsets of the blocks of the shell pairs in the compact block buffer
+        (see :meth:`calc_pairs`).
+
+        Parameters
+        ----------
+        pairs : np.ndarray
+            Shell pairs of shape `(npairs, 2)`.
+
+        Returns
+        -------
+        np.ndarray
+            Offsets of shape `(npairs + 1,)` (int64).
+        """
+        pairs = self._check_pairs(pairs)
+        ao_loc = self.wrapper0.full_shell_to_aoloc
+        ish0, _, jsh0, _ = self.shls_slice
+
+        ishs = pairs[:, 0] + ish0
+        jshs = pairs[:, 1] + jsh0
+        di = ao_loc[ishs + 1] - ao_loc[ishs]
+        dj = ao_loc[jshs + 1] - ao_loc[jshs]
+
+        block_loc = np.zeros(pairs.shape[0] + 1, dtype=np.int64)
+        np.cumsum(self.ncomp * di.astype(np.int64) * dj, out=block_loc[1:])
+        return block_loc
+
+    def _check_pairs(self, pairs: np.ndarray) -> np.ndarray:
+        """
+        Validate the shell pairs and convert them to a contiguous int32 array
+        as required by libcint.
+
+        Parameters
+        ----------
+        pairs : np.ndarray
+            Shell pairs of shape `(npairs, 2)`.
+
+        Returns
+        -------
+        np.ndarray
+            Shell pairs of shape `(npairs, 2)` (int32, C-order).
+
+        Raises
+        ------
+        ValueError
+            If the shape is wrong or the shell indices are out of range.
+        """
+        if len(self.shls_slice) != 4:
+            raise ValueError("Shell pairs require a 2-centre integral.")
+
+        pairs = np.ascontiguousarray(pairs, dtype=np.int32)
+        if pairs.ndim != 2 or pairs.shape[1] != 2:
+            raise ValueError(
+                f"Shell pairs must have shape (npairs, 2), but got "
+                f"{pairs.shape}."
+            )
+
+        ish0, ish1, jsh0, jsh1 = self.shls_slice
+        if pairs.size > 0 and (
+            pairs.min() < 0
+            or pairs[:, 0].max() >= ish1 - ish0
+            or pairs[:, 1].max() >= jsh1 - jsh0
+        ):
+            raise ValueError("Shell pair index out of range.")
+
+        return pairs
+
+    def _int2c(self, out: Tensor | None = None) -> Tensor:
         """
         Calculate the 2-centre integrals with libcint.
 
+        The integrals are written directly into the memory of the (contiguous)
+        output tensor in C-order, i.e., no transposition or additional copy is
+        required for double precision on the CPU.
+
+        Parameters
+        ----------
+        out : Tensor | None, optional
+            Preallocated output tensor. If it is not a contiguous double
+            precision CPU tensor, the integrals are copied into it. Defaults
+            to `None` (new allocation).
+
         Returns
         -------
         Tensor
             Integral tensor.
         """
-        drv = CGTO.GTOint2c
-        outshape = self.outshape
-        out = np.empty(
-            (*outshape[:-2], outshape[-1], outshape[-2]), dtype=np.float64
+        if self.blockdiag is True:
+            return self._int2c_blockdiag(out)
+
+        buf = _get_buffer(self.outshape, out)
+        self._fill_int2c(buf)
+        return self._finalize(buf, out)
+
+    def _int2c_incremental(self, out: Tensor | None = None) -> Tensor:
+        """
+        Calculate the 2-centre integrals by patching the cached result of the
+        previous evaluation.
+
+        The moved atoms are detected by comparing the environment with the
+        copy stored alongside the cached result. Only the shell pairs with at
+        least one shell on a moved atom are recomputed (directly in the
+        cache). Any other change of the environment (or the first call)
+        triggers a full evaluation.
+
+        Parameters
+        ----------
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None` (new allocation).
+
+        Returns
+        -------
+        Tensor
+            Integral tensor (a copy of the cache).
+        """
+        if self._cache is None:
+            buf = torch.empty(self.outshape, dtype=torch.float64)
+            self._fill_int2c(buf)
+        else:
+            ref_env, buf = self._cache
+            changed = self.env != ref_env
+
+            coord_ptr = self.atm[:, PTR_COORD, None] + np.arange(3)
+            moved = changed[coord_ptr].any(axis=-1)
+            if np.count_nonzero(changed[coord_ptr]) != np.count_nonzero(
+                changed
+            ):
+                # not only the positions changed
+                self._fill_int2c(buf)
+            elif moved.any():
+                pairs = self._moved_pairs(moved)
+                self._fill_pairs(buf, pairs, None)
+
+        self._cache = (self.env.copy(), buf)
+
+        # the cache must not be handed out (or modified) by the caller
+        return self._finalize(buf.clone() if out is None else buf, out)
+
+    def _moved_pairs(self, moved: np.ndarray) -> np.ndarray:
+        """
+        Shell pairs with at least one shell on a moved atom.
+
+        Parameters
+        ----------
+        moved : np.ndarray
+            Mask of the moved atoms of shape `(natm,)`.
+
+        Returns
+        -------
+        np.ndarray
+            Shell pairs relative to the slices of shape `(npairs, 2)` (int32).
+            For hermitian integrals, only the lower triangle is returned.
+        """
+        ish0, ish1, jsh0, jsh1 = self.shls_slice
+        on_moved = moved[self.bas[:, ATOM_OF]]
+
+        mask = on_moved[ish0:ish1, None] | on_moved[None, jsh0:jsh1]
+        if self.hermitian is True:
+            mask = np.tril(mask)
+        return np.ascontiguousarray(np.argwhere(mask), dtype=np.int32)
+
+    def _fill_int2c(self, buf: Tensor) -> None:
+        # all shell pairs, written in C-order into the (contiguous) buffer
+        CGTO.GTOint2c_corder(
+            self.op,
+            buf.data_ptr(),
+            self.ncomp,
+            self.hermitian,
+            self._c_shls_slice,
+            self._c_ao_loc,
+            self.optimizer,
+            *self._c_env_args,
         )
-        drv(
+
+    def _fill_pairs(
+        self, buf: Tensor, pairs: np.ndarray, c_block_loc: int | None
+    ) -> None:
+        # only the blocks of the shell pairs, all other elements of the buffer
+        # are left untouched
+        CGTO.GTOint2c_pairs(
             self.op,
-            out.ctypes.data_as(ctypes.c_void_p),
-            int2ctypes(self.ncomp),
-            int2ctypes(self.hermitian),
-            (ctypes.c_int * len(self.shls_slice))(*self.shls_slice),
-            np2ctypes(self.wrapper0.full_shell_to_aoloc),
+            buf.data_ptr(),
+            self.ncomp,
+            self.hermitian,
+            pairs.ctypes.data,
+            pairs.shape[0],
+            c_block_loc,
+            self._c_shls_slice,
+            self._c_ao_loc,
             self.optimizer,
-            np2ctypes(self.atm),
-            int2ctypes(self.atm.shape[0]),
-            np2ctypes(self.bas),
-            int2ctypes(self.bas.shape[0]),
-            np2ctypes(self.env),
+            *self._c_env_args,
+        )
+
+    def _int2c_blockdiag(self, out: Tensor | None = None) -> Tensor:
+        """
+        Calculate the block-diagonal 2-centre integrals of the fragments with
+        a single call to libcint (parallelized over the fragments).
+
+        Parameters
+        ----------
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor.
+        """
+        frag_shl_loc, frag_atm_loc = self.wrapper0.fragments
+
+        # the blocks between the fragments are not touched by libcint
+        buf = _get_buffer(self.outshape, out)
+        buf.zero_()
+
+        CGTO.GTOint2c_blockdiag(
+            self.op,
+            buf.data_ptr(),
+            self.ncomp,
+            self.hermitian,
+            frag_shl_loc.ctypes.data,
+            frag_atm_loc.ctypes.data,
+            frag_shl_loc.shape[0] - 1,
+            self._c_ao_loc,
+            *self._c_env_args,
+        )
+        return self._finalize(buf, out)
+
+    def _int2c_batch(self, positions: Tensor, out: Tensor | None) -> Tensor:
+        """
+        Calculate the 2-centre integrals for a batch of geometries with a
+        single call to libcint (parallelized over geometries and shells).
+
+        Parameters
+        ----------
+        positions : Tensor
+            Positions of shape `(nbatch, natoms, 3)`.
+        out : Tensor | None
+            Preallocated output tensor.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor of shape `(nbatch, *outshape)`.
+        """
+        nbatch = positions.shape[0]
+        coords = positions.detach().to(device="cpu", dtype=torch.float64)
+        coords = coords.contiguous()
+
+        buf = _get_buffer((nbatch, *self.outshape), out)
+        CGTO.GTOint2c_batch(
+            self.op,
+            buf.data_ptr(),
+            self.ncomp,
+            self.hermitian,
+            self._c_shls_slice,
+            self._c_ao_loc,
+            coords.data_ptr(),
+            nbatch,
+            *self._c_env_args,
+            self.env.shape[0],
         )
+        return self._finalize(buf, out)
+
+    def _finalize(self, buf: Tensor, out: Tensor | None) -> Tensor:
+        # move the result to the requested device and dtype (no-op for double
+        # precision on the CPU) or copy it into the output tensor if it could
+        # not be filled directly
+        if out is None:
+            return buf.to(**self.dd)
+
+        if buf is not out:
+            out.copy_(buf)
+        return out
+
+
+def _restrict_pairs(
+    pairs: np.ndarray, shls_slice: tuple[int, ...], tril: bool
+) -> np.ndarray:
+    """
+    Restrict the (lower triangle of the) shell pairs to the shell slices.
 
-        out = np.swapaxes(out, -2, -1)
-        # TODO: check if we need to do the lines below for 3rd order grad and higher
-        # if out.ndim > 2:
-        #     out = np.moveaxis(out, -3, 0)
-        return numpy_to_tensor(out, **self.dd)
+    Parameters
+    ----------
+    pairs : np.ndarray
+        Absolute shell pairs `(i, j)` with `i >= j` of shape `(npairs, 2)`.
+    shls_slice : tuple[int, ...]
+        Shell slices `(ish0, ish1, jsh0, jsh1)`.
+    tril : bool
+        Whether only the lower triangle is required (hermitian integrals).
+
+    Returns
+    -------
+    np.ndarray
+        Absolute shell pairs within the slices in row-major order (int32).
+    """
+    if tril is False:
+        upper = pairs[pairs[:, 0] != pairs[:, 1], ::-1]
+        pairs = np.concatenate([pairs, upper])
+
+    ish0, ish1, jsh0, jsh1 = shls_slice
+    mask = (
+        (pairs[:, 0] >= ish0)
+        & (pairs[:, 0] < ish1)
+        & (pairs[:, 1] >= jsh0)
+        & (pairs[:, 1] < jsh1)
+    )
+    pairs = pairs[mask]
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    return np.ascontiguousarray(pairs, dtype=np.int32)
+
+
+def _get_buffer(shape: tuple[int, ...], out: Tensor | None) -> Tensor:
+    """
+    Get the buffer that is filled by libcint.
+
+    Parameters
+    ----------
+    shape : tuple[int, ...]
+        Shape of the integral tensor.
+    out : Tensor | None
+        Output tensor provided by the user.
+
+    Returns
+    -------
+    Tensor
+        `out` if it can be filled directly by libcint (contiguous double
+        precision CPU tensor), otherwise a new tensor.
+    """
+    if (
+        out is not None
+        and out.dtype == torch.float64
+        and out.device.type == "cpu"
+        and out.is_contiguous()
+    ):
+        return out
+
+    return torch.empty(shape, dtype=torch.float64)
 
 
 class _CintoptHandler(ctypes.c_void_p):
@@ -178,16 +1115,89 @@ def _get_intgl_optimizer(
     copt = getattr(CINT, optname)
     copt(
         ctypes.byref(cintopt),
-        np2ctypes(atm),
-        int2ctypes(atm.shape[0]),
-        np2ctypes(bas),
-        int2ctypes(bas.shape[0]),
-        np2ctypes(env),
+        atm.ctypes.data,
+        atm.shape[0],
+        bas.ctypes.data,
+        bas.shape[0],
+        env.ctypes.data,
     )
     opt = ctypes.cast(cintopt, _CintoptHandler)
     return opt
 
 
+class OptimizerCache:
+    """
+    Least-recently-used cache for libcint's integral optimizers.
+
+    The optimizers depend on the geometry. Hence, an entry is identified by
+    the name of the integral and the environment array of the wrapper, and it
+    is only valid for the version of the environment it was created with (see
+    :attr:`LibcintWrapper.env_version`). Entries of outdated versions are
+    replaced on access. Each entry keeps a reference to its environment, so
+    that its identity cannot be reused by another wrapper while cached.
+    """
+
+    maxsize: int
+    """Maximum number of cached optimizers."""
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self._cache: OrderedDict[
+            tuple[str, int], tuple[int, np.ndarray, ctypes.c_void_p]
+        ] = OrderedDict()
+
+    def get(self, opname: str, wrapper: LibcintWrapper) -> ctypes.c_void_p:
+        """
+        Get the optimizer of an integral, creating it if necessary.
+
+        Parameters
+        ----------
+        opname : str
+            Name of the integral operator.
+        wrapper : LibcintWrapper
+            Wrapper providing the environment.
+
+        Returns
+        -------
+        ctypes.c_void_p
+            Optimizer for the integrals.
+        """
+        atm, bas, env = wrapper.atm_bas_env
+        version = wrapper.env_version
+        key = (opname, id(env))
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[0] == version and entry[1] is env:
+                self._cache.move_to_end(key)
+                return entry[2]
+
+            # the environment changed since the optimizer was created
+            del self._cache[key]
+
+        opt = _get_intgl_optimizer(opname, atm, bas, env)
+        if self.maxsize > 0:
+            self._cache[key] = (version, env, opt)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return opt
+
+    def clear(self) -> None:
+        """
+        Remove all optimizers from the cache (and free them if they are not
+        used anymore).
+        """
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+OPTIMIZER_CACHE = OptimizerCache()
+"""Optimizer cache shared by all integral evaluations."""
+
+
 ############### name derivation manager functions ###############
 
 
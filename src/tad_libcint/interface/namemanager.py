@@ -30,11 +30,12 @@ from __future__ import annotations
 import copy
 import re
 from collections import defaultdict
+from functools import lru_cache
 
 from ..typing import Sequence
 from .symmetry import s1
 
-__all__ = ["IntorNameManager"]
+__all__ = ["IntorNameManager", "get_namemgr"]
 
 
 class IntorNameManager:
@@ -74,6 +75,11 @@ class IntorNameManager:
         },
     )
 
+    # raw operators that only depend on the relative position of the two
+    # centres, i.e., d/dA + d/dB = 0 (not "r0", which depends on the fixed
+    # origin and gives d/dA + d/dB = <a|b>)
+    invariant_ops = ["ovlp", "kin"]
+
     # the number of new dimensions added with the operators
     rawop_ndim = defaultdict(int, {k: len(v) for (k, v) in rawop_comp.items()})
     op_ndim = defaultdict(int, {k: len(v) for (k, v) in op_comp.items()})
@@ -103,6 +109,24 @@ class IntorNameManager:
     def shortname(self):
         return self._shortname
 
+    @property
+    def translation_invariant(self) -> bool:
+        """
+        Whether the integral is invariant under a common translation of both
+        basis centres. Then, the derivative w.r.t. the second centre is the
+        negative derivative w.r.t. the first one.
+
+        Returns
+        -------
+        bool
+            Whether the integral is translationally invariant.
+        """
+        return (
+            self._rawop in self.invariant_ops
+            and self._nbasis == 2
+            and all(len(ops) == 0 for ops in self._ops)
+        )
+
     @property
     def order(self) -> int:
         """
@@ -507,3 +531,24 @@ class IntorNameManager:
 
     def __repr__(self) -> str:
         return str(self)
+
+
+@lru_cache(maxsize=256)
+def get_namemgr(int_type: str, shortname: str) -> IntorNameManager:
+    """
+    Get the (cached) name manager of an integral. Name managers are never
+    modified after construction, so that they can be shared.
+
+    Parameters
+    ----------
+    int_type : str
+        Type of the integral.
+    shortname : str
+        Shortname of the integral.
+
+    Returns
+    -------
+    IntorNameManager
+        Name manager of the integral.
+    """
+    return IntorNameManager(int_type, shortname)
@@ -0,0 +1,141 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Neighbor Lists
+=========================
+
+Spatial index over the shell centres for the enumeration of shell pairs in
+linear time.
+
+Every shell is assigned an extent, i.e., the radius beyond which its most
+diffuse primitive is below the screening threshold. Two shells are candidates
+for a significant pair if their distance is smaller than the sum of their
+extents. The centres are sorted into a grid of cubic cells with an edge
+length of twice the largest extent, such that only the neighboring cells have
+to be searched. The candidates are subsequently refined with the overlap
+estimate of libcint (see :meth:`Intor.screened_pairs`).
+"""
+
+from __future__ import annotations
+
+from itertools import product
+
+import numpy as np
+
+__all__ = ["CellList"]
+
+
+# offsets of the neighboring cells, of which only one half is required
+# because every pair of cells is visited once
+_HALF_STENCIL = [o for o in product((-1, 0, 1), repeat=3) if o >= (0, 0, 0)]
+
+
+class CellList:
+    """
+    Cell list over points with individual extents.
+    """
+
+    centres: np.ndarray
+    """Centres of the points of shape `(n, 3)`."""
+
+    extents: np.ndarray
+    """Extents of the points of shape `(n,)`."""
+
+    cell_size: float
+    """Edge length of the cubic cells."""
+
+    def __init__(
+        self,
+        centres: np.ndarray,
+        extents: np.ndarray,
+        cell_size: float | None = None,
+    ) -> None:
+        self.centres = centres
+        self.extents = extents
+
+        if cell_size is None:
+            cell_size = 2.0 * float(extents.max(initial=0.0))
+        self.cell_size = max(cell_size, 1e-6)
+
+        # one layer of empty cells around the grid avoids wrapping of the
+        # linear cell keys of the neighbors
+        idx3 = np.floor(
+            (centres - centres.min(axis=0, initial=np.inf)) / self.cell_size
+        ).astype(np.int64)
+        dims = idx3.max(axis=0, initial=0) + 3
+        self._strides = np.array([dims[1] * dims[2], dims[2], 1])
+        keys = (idx3 + 1) @ self._strides
+
+        self._order = np.argsort(keys, kind="stable")
+        self._cell_keys, self._cell_start, self._cell_count = np.unique(
+            keys[self._order], return_index=True, return_counts=True
+        )
+
+    def pairs(self) -> np.ndarray:
+        """
+        All pairs `(i, j)` with `i >= j` (including `i == j`), whose distance
+        does not exceed the sum of their extents.
+
+        Returns
+        -------
+        np.ndarray
+            Pairs of shape `(npairs, 2)` (int32) in row-major order.
+        """
+        res = [
+            self._pairs_with_offset(np.array(offset))
+            for offset in _HALF_STENCIL
+        ]
+        pairs = np.concatenate(res)
+
+        # lower triangle in row-major order (locality in the integral drivers)
+        pairs = np.sort(pairs, axis=1)[:, ::-1]
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        return np.ascontiguousarray(pairs, dtype=np.int32)
+
+    def _pairs_with_offset(self, offset: np.ndarray) -> np.ndarray:
+        # pairs of points between each cell and its neighbor at `offset`
+        ncells = self._cell_keys.shape[0]
+        if ncells == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        nkeys = self._cell_keys + offset @ self._strides
+        pos = np.searchsorted(self._cell_keys, nkeys)
+        pos = np.minimum(pos, ncells - 1)
+        found = self._cell_keys[pos] == nkeys
+
+        ca = np.flatnonzero(found)
+        cb = pos[found]
+        na = self._cell_count[ca]
+        nb = self._cell_count[cb]
+
+        # enumerate all combinations of the points of both cells
+        count = na * nb
+        rep = np.repeat(np.arange(ca.shape[0]), count)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        ka, kb = np.divmod(k, nb[rep])
+        ia = self._order[self._cell_start[ca][rep] + ka]
+        ib = self._order[self._cell_start[cb][rep] + kb]
+
+        # every pair only once within the same cell
+        if not offset.any():
+            keep = ia >= ib
+            ia, ib = ia[keep], ib[keep]
+
+        dist2 = ((self.centres[ia] - self.centres[ib]) ** 2).sum(axis=-1)
+        cutoff = self.extents[ia] + self.extents[ib]
+        keep = dist2 <= cutoff**2
+        return np.stack([ia[keep], ib[keep]], axis=-1)
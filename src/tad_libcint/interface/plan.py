@@ -0,0 +1,569 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Integral Plan
+========================
+
+An integral plan bundles everything that is required to evaluate one integral
+for a fixed set of wrappers: the resolved libcint operator, the output shape,
+the shell slices and the recipes for the derivative integrals of the backward
+pass. Plans are created once per integral name, wrapper set and hermiticity
+and are cached on the first wrapper. Hence, repeated evaluations directly
+dispatch to the C driver without any name parsing.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+
+import numpy as np
+
+from tad_libcint.typing import Tensor
+
+from .blocksparse import BlockLayout
+from .intor import Intor
+from .namemanager import IntorNameManager
+from .wrapper import LibcintWrapper
+
+__all__ = ["IntegralPlan", "DerivRecipe", "get_plan", "PLAN_CACHE_SIZE"]
+
+
+PLAN_CACHE_SIZE = 64
+"""Maximum number of cached plans per wrapper (least recently used first)."""
+
+
+@dataclass
+class DerivRecipe:
+    """
+    Recipe for obtaining one derivative integral in the backward pass.
+
+    The integral is either evaluated with `plan` (possibly with swapped
+    wrappers) or reused from the `source`-th recipe of the same list. In the
+    latter two cases, the basis axes are transposed along `transpose_path`
+    and the component axes are permuted with `permute_path`.
+    """
+
+    namemgr: IntorNameManager
+    """Name manager of the derivative integral."""
+
+    new_axis_pos: int | None
+    """Position of the new derivative axis (moved to dimension 0)."""
+
+    plan: IntegralPlan | None = None
+    """Plan for the evaluation, `None` if a previous result is reused."""
+
+    source: int | None = None
+    """Index of the recipe whose result is reused."""
+
+    transpose_path: list[tuple[int, int]] | None = None
+    """Transpose path of the basis axes."""
+
+    permute_path: list[int] | None = None
+    """Permutation of all axes after the transposition."""
+
+    negate: bool = False
+    """Whether the reused result is negated (translational invariance)."""
+
+    @property
+    def direct(self) -> bool:
+        # whether the integral is directly evaluated (available in libcint)
+        return self.transpose_path is None and self.source is None
+
+
+class IntegralPlan:
+    """
+    Precompiled evaluation of an integral for a fixed set of wrappers.
+    """
+
+    int_nmgr: IntorNameManager
+    """Name manager of the integral."""
+
+    wrappers: list[LibcintWrapper]
+    """Wrappers of the basis sets (one per basis)."""
+
+    hermitian: bool
+    """Whether the integral is evaluated as hermitian."""
+
+    blockdiag: bool
+    """Whether only the blocks of the independent fragments are evaluated."""
+
+    thresh: float | None
+    """Screening threshold of the shell pairs (`None` for no screening)."""
+
+    incremental: bool
+    """Whether only the shells on moved atoms are recomputed."""
+
+    grad_thresh: float | None
+    """
+    Threshold of the shell blocks of the incoming gradient, below which the
+    derivative integrals are skipped in the backward pass (`None` for the
+    dense backward pass).
+    """
+
+    intor: Intor
+    """Direct interface to the C driver."""
+
+    def __init__(
+        self,
+        int_nmgr: IntorNameManager,
+        wrappers: list[LibcintWrapper],
+        hermitian: bool = False,
+        blockdiag: bool = False,
+        thresh: float | None = None,
+        incremental: bool = False,
+        grad_thresh: float | None = None,
+    ) -> None:
+        if grad_thresh is not None and (grad_thresh <= 0.0 or blockdiag):
+            raise ValueError(
+                "The gradient threshold must be positive and is not supported "
+                "for block-diagonal integrals."
+            )
+
+        self.int_nmgr = int_nmgr
+        self.wrappers = wrappers
+        self.hermitian = hermitian
+        self.blockdiag = blockdiag
+        self.thresh = thresh
+        self.incremental = incremental
+        self.grad_thresh = grad_thresh
+        self.intor = Intor(
+            int_nmgr,
+            wrappers,
+            hermitian=hermitian,
+            blockdiag=blockdiag,
+            thresh=thresh,
+            incremental=incremental,
+        )
+
+        self._deriv_recipes: dict[str, list[DerivRecipe]] = {}
+        self._uncontracted: tuple[IntegralPlan, list[Tensor]] | None = None
+        self._layout: BlockLayout | None = None
+        self._u_layout: tuple[BlockLayout, BlockLayout, Tensor] | None = None
+
+    @property
+    def outshape(self) -> tuple[int, ...]:
+        return self.intor.outshape
+
+    def calc(self, out: Tensor | None = None) -> Tensor:
+        """
+        Calculate the integral.
+
+        Parameters
+        ----------
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor.
+        """
+        return self.intor.calc(out)
+
+    def calc_batch(
+        self, positions: Tensor, out: Tensor | None = None
+    ) -> Tensor:
+        """
+        Calculate the integral for a batch of geometries.
+
+        Parameters
+        ----------
+        positions : Tensor
+            Positions of shape `(nbatch, natoms, 3)`.
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor of shape `(nbatch, *outshape)`.
+        """
+        return self.intor.calc_batch(positions, out)
+
+    def calc_padded(
+        self,
+        mol_shl_loc: np.ndarray,
+        mol_atm_loc: np.ndarray,
+        nao_pad: int,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        """
+        Calculate the integral for a batch of molecules stored consecutively
+        in the wrapper (see :meth:`Intor.calc_padded`).
+
+        Parameters
+        ----------
+        mol_shl_loc : np.ndarray
+            Shell offsets of the molecules of shape `(nmol + 1,)`.
+        mol_atm_loc : np.ndarray
+            Atom offsets of the molecules of shape `(nmol + 1,)`.
+        nao_pad : int
+            Padded number of atomic orbitals.
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Integral tensor of shape `(nmol, ..., nao_pad, nao_pad)`.
+        """
+        return self.intor.calc_padded(mol_shl_loc, mol_atm_loc, nao_pad, out)
+
+    def calc_pairs(
+        self,
+        pairs: np.ndarray,
+        compact: bool = False,
+        out: Tensor | None = None,
+    ) -> Tensor:
+        """
+        Calculate the integral only for an explicit list of shell pairs (see
+        :meth:`Intor.calc_pairs`).
+
+        Parameters
+        ----------
+        pairs : np.ndarray
+            Shell pairs of shape `(npairs, 2)`.
+        compact : bool, optional
+            Whether to return the compact block buffer. Defaults to `False`.
+        out : Tensor | None, optional
+            Preallocated output tensor. Defaults to `None`.
+
+        Returns
+        -------
+        Tensor
+            Dense integral tensor or compact block buffer.
+        """
+        return self.intor.calc_pairs(pairs, compact, out)
+
+    def calc_block_norms(self, norm: str = "max") -> np.ndarray:
+        """
+        Calculate the norms of the shell blocks without storing the integral
+        (see :meth:`Intor.calc_block_norms`).
+
+        Parameters
+        ----------
+        norm : str, optional
+            Norm of the blocks ("max" or "fro"). Defaults to "max".
+
+        Returns
+        -------
+        np.ndarray
+            Norms of shape `(nshells0, nshells1)`.
+        """
+        return self.intor.calc_block_norms(norm)
+
+    def get_block_layout(self) -> BlockLayout:
+        """
+        Get the layout of the block-sparse integral, which contains the shell
+        pairs that are not screened out for the current geometry (see
+        :meth:`Intor.screened_pairs`).
+
+        Returns
+        -------
+        BlockLayout
+            Layout of the stored shell-pair blocks.
+        """
+        pairs = self.intor.screened_pairs()
+        if self._layout is None or self._layout.pairs is not pairs:
+            self._layout = self.get_pair_layout(pairs)
+
+        return self._layout
+
+    def get_pair_layout(self, pairs: np.ndarray) -> BlockLayout:
+        """
+        Get the layout of the blocks of arbitrary shell pairs (not cached).
+
+        Parameters
+        ----------
+        pairs : np.ndarray
+            Shell pairs of shape `(npairs, 2)`, relative to the wrappers.
+
+        Returns
+        -------
+        BlockLayout
+            Layout of the shell-pair blocks.
+        """
+        ao_locs = [_relative_ao_loc(w) for w in self.wrappers]
+        return BlockLayout(pairs, *ao_locs, device=self.wrappers[0].device)
+
+    def get_uncontracted_layout(
+        self, layout: BlockLayout
+    ) -> tuple[BlockLayout, Tensor]:
+        """
+        Get the layout of the uncontracted plan that contains all primitive
+        pairs of the given layout (see :meth:`BlockLayout.expand`).
+
+        Parameters
+        ----------
+        layout : BlockLayout
+            Layout of this plan.
+
+        Returns
+        -------
+        tuple[BlockLayout, Tensor]
+            The uncontracted layout and the index of the contracted element
+            of every uncontracted element.
+        """
+        if self._u_layout is None or self._u_layout[0] is not layout:
+            u_plan, _ = self.get_uncontracted_plan()
+
+            ushl_locs = []
+            for w in self.wrappers:
+                sh0, sh1 = w.shell_idxs
+                ushl_loc = np.zeros(sh1 - sh0 + 1, dtype=np.int64)
+                np.cumsum(w.ngauss_at_shell[sh0:sh1], out=ushl_loc[1:])
+                ushl_locs.append(ushl_loc)
+
+            uao_locs = [_relative_ao_loc(w) for w in u_plan.wrappers]
+            self._u_layout = (layout, *layout.expand(*ushl_locs, *uao_locs))
+
+        return self._u_layout[1], self._u_layout[2]
+
+    def get_deriv_recipes(self, derivop: str) -> list[DerivRecipe]:
+        """
+        Get the recipes for the integrals with `derivop` applied to each of
+        the bases. Integrals that are not available in libcint are obtained
+        from the available ones by transposition. For translationally
+        invariant integrals, the position derivative w.r.t. the second basis
+        is the negative one w.r.t. the first basis and is not evaluated.
+
+        Parameters
+        ----------
+        derivop : str
+            String of the derivative operation.
+
+        Returns
+        -------
+        list[DerivRecipe]
+            One recipe per basis.
+
+        Raises
+        ------
+        AttributeError
+            If a required integral is not available from libcint.
+        """
+        if derivop in self._deriv_recipes:
+            return self._deriv_recipes[derivop]
+
+        nbasis = len(self.wrappers)
+        nmgrs = [
+            self.int_nmgr.get_intgl_deriv_namemgr(derivop, ib)
+            for ib in range(nbasis)
+        ]
+
+        recipes: list[DerivRecipe] = []
+        for i, nmgr in enumerate(nmgrs):
+            new_axis_pos = self.int_nmgr.get_intgl_deriv_newaxispos(derivop, i)
+            recipe: DerivRecipe | None = None
+
+            # d/dB = -d/dA, i.e., only the first derivative is evaluated
+            invariant = self.int_nmgr.translation_invariant
+            if i == 1 and derivop == "ip" and invariant is True:
+                recipes.append(
+                    DerivRecipe(nmgr, new_axis_pos, source=0, negate=True)
+                )
+                continue
+
+            # check if the integral can be obtained from the previous ones
+            for j in range(i - 1, -1, -1):
+                transpose_path = nmgrs[j].get_transpose_path_to(nmgr)
+                if transpose_path is None:
+                    continue
+
+                permute_path = nmgrs[j].get_comp_permute_path(transpose_path)
+
+                # if the swapped wrappers remain unchanged, then just use the
+                # transposed version of the previous result
+                # TODO: think more about this (do we need to use different
+                # transpose path? e.g. transpose_path[::-1])
+                twrappers = _swap_list(self.wrappers, transpose_path)
+                if twrappers == self.wrappers:
+                    recipe = DerivRecipe(
+                        nmgr,
+                        new_axis_pos,
+                        source=j,
+                        transpose_path=transpose_path,
+                        permute_path=permute_path,
+                    )
+                    break
+
+                # otherwise, use the swapped integral with the swapped
+                # wrappers, only if the integral is available in libcint
+                if recipes[j].direct is True:
+                    recipe = DerivRecipe(
+                        nmgr,
+                        new_axis_pos,
+                        plan=get_plan(
+                            nmgrs[j],
+                            twrappers,
+                            blockdiag=self.blockdiag,
+                            thresh=self.thresh,
+                        ),
+                        transpose_path=transpose_path,
+                        permute_path=permute_path,
+                    )
+                    break
+
+            if recipe is None:
+                try:
+                    plan = get_plan(
+                        nmgr,
+                        self.wrappers,
+                        blockdiag=self.blockdiag,
+                        thresh=self.thresh,
+                    )
+                except AttributeError as e:
+                    msg = (
+                        f"The integral {nmgr.fullname} is not available from "
+                        "libcint, please add it"
+                    )
+                    raise AttributeError(msg) from e
+
+                recipe = DerivRecipe(nmgr, new_axis_pos, plan=plan)
+
+            recipes.append(recipe)
+
+        self._deriv_recipes[derivop] = recipes
+        return recipes
+
+    def get_uncontracted_plan(self) -> tuple[IntegralPlan, list[Tensor]]:
+        """
+        Get the plan of the same integral for the uncontracted wrappers.
+
+        Returns
+        -------
+        tuple[IntegralPlan, list[Tensor]]
+            The plan and the mappings from uncontracted atomic orbitals to the
+            atomic orbitals for each wrapper.
+        """
+        if self._uncontracted is None:
+            u_wrappers_tup, uao2aos_tup = zip(
+                *[w.get_uncontracted_wrapper() for w in self.wrappers]
+            )
+            u_plan = get_plan(
+                self.int_nmgr,
+                list(u_wrappers_tup),
+                blockdiag=self.blockdiag,
+                thresh=self.thresh,
+            )
+            self._uncontracted = (u_plan, list(uao2aos_tup))
+
+        return self._uncontracted
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}"
+            f"({self.int_nmgr.fullname}, outshape={self.outshape})"
+        )
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+def get_plan(
+    int_nmgr: IntorNameManager,
+    wrappers: list[LibcintWrapper],
+    hermitian: bool = False,
+    blockdiag: bool = False,
+    thresh: float | None = None,
+    incremental: bool = False,
+    grad_thresh: float | None = None,
+) -> IntegralPlan:
+    """
+    Get the (cached) plan of an integral. The plans are cached per first
+    wrapper in a least-recently-used cache of size :data:`PLAN_CACHE_SIZE`.
+
+    Parameters
+    ----------
+    int_nmgr : IntorNameManager
+        Name manager of the integral.
+    wrappers : list[LibcintWrapper]
+        Wrappers of the basis sets (one per basis).
+    hermitian : bool, optional
+        Whether the integral is hermitian. Defaults to `False`.
+    blockdiag : bool, optional
+        Whether only the blocks of the independent fragments of the wrapper
+        are evaluated. Defaults to `False`.
+    thresh : float | None, optional
+        Screening threshold of the shell pairs. Defaults to `None`.
+    incremental : bool, optional
+        Whether only the shells on moved atoms are recomputed (see
+        :class:`Intor`). Defaults to `False`.
+    grad_thresh : float | None, optional
+        Threshold of the shell blocks of the incoming gradient in the
+        backward pass. Defaults to `None`.
+
+    Returns
+    -------
+    IntegralPlan
+        The plan of the integral.
+    """
+    # the plan holds references to the wrappers, i.e., their ids are unique
+    # as long as the plan is cached
+    key = (
+        int_nmgr.fullname,
+        hermitian,
+        blockdiag,
+        thresh,
+        incremental,
+        grad_thresh,
+        *(id(w) for w in wrappers[1:]),
+    )
+
+    # pylint: disable=protected-access
+    plans = wrappers[0]._plans
+    plan = plans.get(key)
+    if plan is not None:
+        plans.move_to_end(key)
+        return plan
+
+    plan = IntegralPlan(
+        int_nmgr,
+        wrappers,
+        hermitian=hermitian,
+        blockdiag=blockdiag,
+        thresh=thresh,
+        incremental=incremental,
+        grad_thresh=grad_thresh,
+    )
+
+    # bounded, so that the cache does not keep every other wrapper that was
+    # ever combined with this wrapper alive
+    plans[key] = plan
+    while len(plans) > PLAN_CACHE_SIZE:
+        plans.popitem(last=False)
+
+    return plan
+
+
+def _relative_ao_loc(wrapper: LibcintWrapper) -> np.ndarray:
+    # AO offsets of the shells of the wrapper relative to its first AO
+    sh0, sh1 = wrapper.shell_idxs
+    ao_loc = wrapper.full_shell_to_aoloc[sh0 : sh1 + 1]
+    return ao_loc - ao_loc[0]
+
+
+def _swap_list(a: list, swaps: list[tuple[int, int]]) -> list:
+    # swap the elements according to the swaps input
+    res = copy.copy(a)  # shallow copy
+    for idxs in swaps:
+        res[idxs[0]], res[idxs[1]] = (
+            res[idxs[1]],
+            res[idxs[0]],
+        )  # swap the elements
+    return res
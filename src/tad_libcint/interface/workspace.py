@@ -0,0 +1,133 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Interface: Workspace
+====================
+
+Pool of preallocated output buffers. In loops over many integral evaluations
+with the same shapes (e.g., SCF iterations or MD steps), the buffers are
+handed out and returned explicitly, which avoids a fresh allocation (and the
+corresponding page faults) in every step.
+
+Example
+-------
+>>> pool = WorkspacePool()
+>>> for step in range(nsteps):
+...     s = overlap(wrapper, pool=pool)
+...     ...
+...     pool.release(s)
+"""
+
+from __future__ import annotations
+
+import torch
+
+from tad_libcint.typing import Tensor
+
+__all__ = ["WorkspacePool"]
+
+
+class WorkspacePool:
+    """
+    Pool of reusable tensors keyed by shape, dtype and device.
+    """
+
+    def __init__(self) -> None:
+        self._free: dict[
+            tuple[tuple[int, ...], torch.dtype, torch.device], list[Tensor]
+        ] = {}
+
+    def get(
+        self,
+        shape: tuple[int, ...],
+        dtype: torch.dtype = torch.float64,
+        device: torch.device | None = None,
+    ) -> Tensor:
+        """
+        Get a buffer from the pool. A new buffer is allocated if none of the
+        requested kind is available. The content of the buffer is undefined.
+
+        Parameters
+        ----------
+        shape : tuple[int, ...]
+            Shape of the buffer.
+        dtype : torch.dtype, optional
+            Floating point precision. Defaults to `torch.float64`.
+        device : torch.device | None, optional
+            Device of the buffer. Defaults to `None` (CPU).
+
+        Returns
+        -------
+        Tensor
+            Contiguous buffer.
+        """
+        device = torch.device("cpu") if device is None else device
+        free = self._free.get((tuple(shape), dtype, device))
+        if free:
+            return free.pop()
+
+        return torch.empty(shape, dtype=dtype, device=device)
+
+    def release(self, tensor: Tensor) -> None:
+        """
+        Return a buffer to the pool. The buffer must not be used afterwards.
+
+        The pool keeps a detached view of the buffer, i.e., no autograd graph
+        is kept alive. As the integrals are written through the raw data
+        pointer, autograd's version counter of the buffer is not bumped when
+        it is refilled. Hence, a result that is still saved in a graph (e.g.,
+        for a later backward pass) must not be released, since its gradients
+        would silently be computed from the new values.
+
+        Parameters
+        ----------
+        tensor : Tensor
+            Buffer obtained from :meth:`get` (or a tensor returned by an
+            integral function that was called with this pool).
+
+        Raises
+        ------
+        ValueError
+            If the tensor is not contiguous or already in the pool.
+        """
+        if not tensor.is_contiguous():
+            raise ValueError("Only contiguous tensors can be pooled.")
+
+        tensor = tensor.detach()
+        key = (tuple(tensor.shape), tensor.dtype, tensor.device)
+        free = self._free.setdefault(key, [])
+
+        ptr = tensor.data_ptr()
+        if any(t.data_ptr() == ptr for t in free):
+            raise ValueError("Tensor was already released to the pool.")
+
+        free.append(tensor)
+
+    def clear(self) -> None:
+        """
+        Drop all buffers of the pool.
+        """
+        self._free.clear()
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._free.values())
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(nbuffers={len(self)})"
+
+    def __repr__(self) -> str:
+        return str(self)
@@ -28,19 +28,20 @@ internal format.
 
 from __future__ import annotations
 
+from collections import OrderedDict
 from contextlib import contextmanager
 
 import numpy as np
 import torch
 from tad_mctc.convert import tensor_to_numpy
 
-from tad_libcint.api import CINT
 from tad_libcint.basis import AtomCGTOBasis, CGTOBasis
 from tad_libcint.typing import Any, Iterator, Tensor
 
-from .utils import NDIM, int2ctypes, memoize_method, np2ctypes
+from .neighbors import CellList
+from .utils import NDIM, memoize_method
 
-__all__ = ["LibcintWrapper"]
+__all__ = ["LibcintWrapper", "SubsetLibcintWrapper"]
 
 # Terminology:
 # * gauss: one gaussian element (multiple gaussian becomes one shell)
@@ -50,7 +51,31 @@ __all__ = ["LibcintWrapper"]
 #       e.g. p-shell is splitted into 3 components for cartesian (x, y, z)
 
 # from libcint/src/cint_const.h
+PTR_EXPCUTOFF = 0
 PTR_RINV_ORIG = 4
+PTR_ENV_START = 20
+
+# slots of the atm and bas arrays (libcint/include/cint.h)
+CHARGE_OF = 0
+PTR_COORD = 1
+NUC_MOD_OF = 2
+PTR_ZETA = 3
+ATM_SLOTS = 6
+
+ATOM_OF = 0
+ANG_OF = 1
+NPRIM_OF = 2
+NCTR_OF = 3
+PTR_EXP = 5
+PTR_COEFF = 6
+BAS_SLOTS = 8
+
+ACCURACY_TIERS = {"tight": 60.0, "normal": 40.0, "loose": 20.0}
+"""
+Exponent cutoffs of the accuracy tiers (`PTR_EXPCUTOFF`). libcint skips all
+primitive pairs whose Gaussian product prefactor is below `exp(-cutoff)`.
+The tight tier corresponds to libcint's default, and 20 is its minimum.
+"""
 
 
 class LibcintWrapper:
@@ -66,35 +91,51 @@ class LibcintWrapper:
         ihelp: Any | None = None,
         spherical: bool = True,
         hermitian: bool = False,
+        accuracy: str = "tight",
     ) -> None:
+        if accuracy not in ACCURACY_TIERS:
+            raise ValueError(
+                f"Unknown accuracy tier '{accuracy}' (available: "
+                f"{', '.join(ACCURACY_TIERS)})."
+            )
+
         self._atombases = atombases
         self._spherical = spherical
         self._hermitian = hermitian
         self._fracz = False
         self._natoms = len(atombases)
+        self._env_version = 0
+        self._atombases_stale = False
         self.ihelp = ihelp
 
+        # integral plans with this wrapper as first wrapper (see `plan.py`)
+        self._plans: OrderedDict[tuple, Any] = OrderedDict()
+
+        # shell and atom offsets of independent fragments (see `concatenate`)
+        self._fragments: tuple[np.ndarray, np.ndarray] | None = None
+
+        # candidate shell pairs per screening threshold (see `get_shell_pairs`)
+        # with the version and the atomic positions at which they were built
+        self._candidates: dict[float, tuple[int, np.ndarray, np.ndarray]] = {}
+        self._pair_skin = 0.0
+
+        # atoms that require position gradients (see `set_active_atoms`)
+        self._active_atoms: np.ndarray | None = None
+
         # get dtype and device for torch's tensors
         self.dtype = atombases[0].bases[0].alphas.dtype
         self.device = atombases[0].bases[0].alphas.device
         self.dd = {"device": self.device, "dtype": self.dtype}
 
-        # construct _atm, _bas, and _env as well as the parameters
-        ptr_env = 20  # initial padding from libcint
-        atm_list: list[list[int]] = []
-        env_list: list[float] = [0.0] * ptr_env
-        bas_list: list[list[int]] = []
+        # collect the parameters and the integer basis information (only
+        # Python ints and tensor references, no element-wise conversion)
+        atomzs: list[int] = []
         allpos: list[Tensor] = []
         allalphas: list[Tensor] = []
         allcoeffs: list[Tensor] = []
-        allangmoms: list[int] = []
+        angmoms: list[int] = []
         shell_to_atom: list[int] = []
         ngauss_at_shell: list[int] = []
-        gauss_to_shell: list[int] = []
-
-        # constructing the triplet lists and also collecting the parameters
-        nshells = 0
-        ishell = 0
 
         for iatom, atombasis in enumerate(atombases):
             if atombasis.pos.numel() != NDIM:
@@ -103,28 +144,19 @@ class LibcintWrapper:
                     f"components, but {atombasis.pos.numel()} were found."
                 )
 
-            # construct the atom environment
-            atomz = atombasis.atomz
-            # charge, ptr_coord, nucl model (unused for standard nucl model)
-            atm_list.append([int(atomz), ptr_env, 1, ptr_env + NDIM, 0, 0])
-            env_list.extend([float(x) for x in atombasis.pos.detach()])
-            env_list.append(0.0)
-            ptr_env += NDIM + 1
-
             # check if the atomz is fractional
+            atomz = atombasis.atomz
             if isinstance(atomz, float) or (
                 isinstance(atomz, Tensor) and atomz.is_floating_point()
             ):
                 self._fracz = True
 
+            atomzs.append(int(atomz))
+
             # add the atom position into the parameter list
             # TODO: consider moving allpos into shell
             allpos.append(atombasis.pos.unsqueeze(0))
 
-            nshells += len(atombasis.bases)
-            shell_to_atom.extend([iatom] * len(atombasis.bases))
-
-            # then construct the basis
             for shell in atombasis.bases:
                 if shell.alphas.shape != shell.coeffs.shape:
                     raise ValueError(
@@ -141,69 +173,96 @@ class LibcintWrapper:
                 # WE DONT NORMALIZE!!!
                 # shell.wfnormalize_()
 
-                ngauss = len(shell.alphas)
-
-                bas_list.append(
-                    [
-                        iatom,
-                        shell.angmom,
-                        ngauss,
-                        1,  # ncontr
-                        0,  # kappa
-                        ptr_env,  # ptr_exp
-                        # ptr_coeffs,  # unused
-                        ptr_env + ngauss,
-                        0,
-                    ]
-                )
-                env_list.extend([float(x) for x in shell.alphas.detach()])
-                env_list.extend([float(x) for x in shell.coeffs.detach()])
-                ptr_env += 2 * ngauss
-
-                # add the alphas and coeffs to the parameters list
                 allalphas.append(shell.alphas)
                 allcoeffs.append(shell.coeffs)
-                allangmoms.extend([shell.angmom] * ngauss)
-                ngauss_at_shell.append(ngauss)
-                gauss_to_shell.extend([ishell] * ngauss)
-                ishell += 1
+                angmoms.append(shell.angmom)
+                shell_to_atom.append(iatom)
+                ngauss_at_shell.append(shell.alphas.shape[0])
+
+        nshells = len(angmoms)
 
         # compile the parameters of this object
         self._allpos_params = torch.cat(allpos, dim=0)  # (natom, NDIM)
         self._allalphas_params = torch.cat(allalphas, dim=0)  # (ntot_gauss)
         self._allcoeffs_params = torch.cat(allcoeffs, dim=0)  # (ntot_gauss)
-        self._allangmoms = torch.tensor(
-            allangmoms, dtype=torch.int32, device=self.device
-        )  # (ntot_gauss)
 
-        # convert the lists to numpy to make it contiguous
-        # (Python lists are not contiguous)
-        self._atm = np.array(atm_list, dtype=np.int32, order="C")
-        self._bas = np.array(bas_list, dtype=np.int32, order="C")
-        self._env = np.array(env_list, dtype=np.float64, order="C")
+        ngauss = np.array(ngauss_at_shell, dtype=np.int32)
+        angmom = np.array(angmoms, dtype=np.int32)
+        ntot_gauss = int(ngauss.sum())
+
+        # (ntot_gauss)
+        self._allangmoms = torch.repeat_interleave(
+            torch.tensor(angmoms, dtype=torch.int32, device=self.device),
+            torch.tensor(ngauss_at_shell, dtype=torch.long, device=self.device),
+        )
+
+        # Layout of the environment:
+        # [padding | (x, y, z, zeta) per atom | all exponents | all coeffs]
+        # The exponents (coefficients) of one shell are contiguous, which is
+        # all libcint requires from the pointers in `bas`.
+        ptr_coord = PTR_ENV_START + (NDIM + 1) * np.arange(
+            self._natoms, dtype=np.int32
+        )
+        ptr_gauss = PTR_ENV_START + (NDIM + 1) * self._natoms
+        gauss_loc = np.zeros(nshells, dtype=np.int32)
+        np.cumsum(ngauss[:-1], out=gauss_loc[1:])
+
+        # charge, ptr_coord, nucl model, ptr_zeta (unused for standard model)
+        atm = np.zeros((self._natoms, ATM_SLOTS), dtype=np.int32)
+        atm[:, CHARGE_OF] = atomzs
+        atm[:, PTR_COORD] = ptr_coord
+        atm[:, NUC_MOD_OF] = 1
+        atm[:, PTR_ZETA] = ptr_coord + NDIM
+
+        # atom, angmom, nprim, ncontr, kappa, ptr_exp, ptr_coeff, (unused)
+        bas = np.zeros((nshells, BAS_SLOTS), dtype=np.int32)
+        bas[:, ATOM_OF] = shell_to_atom
+        bas[:, ANG_OF] = angmom
+        bas[:, NPRIM_OF] = ngauss
+        bas[:, NCTR_OF] = 1
+        bas[:, PTR_EXP] = ptr_gauss + gauss_loc
+        bas[:, PTR_COEFF] = ptr_gauss + ntot_gauss + gauss_loc
+
+        # a single concatenation and a single transfer for the environment
+        pos = self._allpos_params.detach().reshape(self._natoms, NDIM)
+        env = torch.cat(
+            [
+                pos.new_zeros(PTR_ENV_START),
+                torch.nn.functional.pad(pos, (0, 1)).reshape(-1),
+                self._allalphas_params.detach().to(pos.dtype),
+                self._allcoeffs_params.detach().to(pos.dtype),
+            ]
+        )
+
+        self._atm = atm
+        self._bas = bas
+        self._env = tensor_to_numpy(env, dtype=np.float64)
+
+        self._accuracy = accuracy
+        self._env[PTR_EXPCUTOFF] = ACCURACY_TIERS[accuracy]
 
         self._ngauss_at_shell_list = ngauss_at_shell
         self._shell_idxs = (0, nshells if ihelp is None else ihelp.nsh)
 
+        # number of AOs per shell (only one contraction per shell)
+        if spherical is True:
+            self._nao_per_shell = 2 * angmom + 1
+        else:
+            self._nao_per_shell = (angmom + 1) * (angmom + 2) // 2
+
         if ihelp is None:
             # construct the full shell mapping
-            shell_to_aoloc = [0]
-            ao_to_shell: list[int] = []
-            ao_to_atom: list[int] = []
-            for i in range(nshells):
-                nao_at_shell_i = self._nao_at_shell(i)
-                shell_to_aoloc_i = shell_to_aoloc[-1] + nao_at_shell_i
-                shell_to_aoloc.append(shell_to_aoloc_i)
-                ao_to_shell.extend([i] * nao_at_shell_i)
-                ao_to_atom.extend([shell_to_atom[i]] * nao_at_shell_i)
-
-            self._shell_to_aoloc = np.array(shell_to_aoloc, dtype=np.int32)
-            self._ao_to_shell = torch.tensor(
-                ao_to_shell, dtype=torch.long, device=self.device
+            shell_to_aoloc = np.zeros(nshells + 1, dtype=np.int32)
+            np.cumsum(self._nao_per_shell, out=shell_to_aoloc[1:])
+            self._shell_to_aoloc = shell_to_aoloc
+
+            self._ao_to_shell = torch.repeat_interleave(
+                torch.arange(nshells, device=self.device),
+                torch.tensor(self._nao_per_shell, device=self.device).long(),
             )
             self._ao_to_atom = torch.tensor(
-                ao_to_atom, dtype=torch.long, device=self.device
-            )
+                shell_to_atom, dtype=torch.long, device=self.device
+            )[self._ao_to_shell]
         else:
             if spherical is True:
                 cs = torch.cumsum(ihelp.orbitals_per_shell, -1)[-1].unsqueeze(
@@ -266,14 +325,52 @@ class LibcintWrapper:
 
     @property
     def atombases(self) -> list[AtomCGTOBasis]:
+        # positions are only synchronized lazily after `update_positions`
+        if self._atombases_stale is True:
+            self._atombases_stale = False
+            self._atombases = [
+                AtomCGTOBasis(atomz=atb.atomz, bases=atb.bases, pos=pos)
+                for atb, pos in zip(
+                    self._atombases, self._allpos_params.unbind(0)
+                )
+            ]
         return self._atombases
 
+    @property
+    def fragments(self) -> tuple[np.ndarray, np.ndarray] | None:
+        # shell offsets and atom offsets (each of shape (nfrag + 1,)) of the
+        # independent fragments or `None` if the wrapper was not created by
+        # `concatenate`
+        return self._fragments
+
     @property
     def atm_bas_env(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         # returns the triplet lists, i.e. atm, bas, env
         # this shouldn't change in the sliced wrapper
         return self._atm, self._bas, self._env
 
+    @property
+    def env_version(self) -> int:
+        # counter that is incremented whenever the env is changed in place
+        # (e.g. by `update_positions`), objects derived from the env (such as
+        # libcint's optimizers) are only valid for the same version
+        return self._env_version
+
+    @property
+    def accuracy(self) -> str:
+        # accuracy tier of the integrals (see `set_accuracy`)
+        return self._accuracy
+
+    @property
+    def active_atoms(self) -> np.ndarray | None:
+        # mask of the atoms with position gradients (see `set_active_atoms`)
+        return self._active_atoms
+
+    @property
+    def pair_skin(self) -> float:
+        # skin distance of the shell pair lists (see `set_pair_skin`)
+        return self._pair_skin
+
     @property
     def full_angmoms(self) -> Tensor:
         return self._allangmoms
@@ -421,22 +518,430 @@ class LibcintWrapper:
 
         # Uncontracted wrapper does not work with the IndexHelper
         uncontr_wrapper = LibcintWrapper(
-            new_atombases, ihelp=None, spherical=self.spherical
+            new_atombases,
+            ihelp=None,
+            spherical=self.spherical,
+            accuracy=self.accuracy,
         )
 
-        # get the mapping uncontracted ao to the contracted ao
-        uao2ao: list[int] = []
-        idx_ao = 0
-        # iterate over shells
-        for i in range(len(self)):
-            nao = self._nao_at_shell(i)
-            uao2ao += (
-                list(range(idx_ao, idx_ao + nao)) * self.ngauss_at_shell[i]
+        # the fragments consist of the same atoms, but every shell is split
+        # into one shell per primitive
+        if self._fragments is not None:
+            frag_shl_loc, frag_atm_loc = self._fragments
+            ushl_loc = np.zeros(len(self.ngauss_at_shell) + 1, dtype=np.int32)
+            np.cumsum(self.ngauss_at_shell, out=ushl_loc[1:])
+            uncontr_wrapper._fragments = (
+                ushl_loc[frag_shl_loc],
+                frag_atm_loc,
             )
-            idx_ao += nao
+
+        # get the mapping uncontracted ao to the contracted ao: every shell
+        # contributes its AO range once per primitive
+        sh0, sh1 = self.shell_idxs
+        ngauss = np.array(self.ngauss_at_shell[sh0:sh1], dtype=np.int64)
+        nao = self._nao_per_shell[sh0:sh1].astype(np.int64)
+        aoloc = self.full_shell_to_aoloc[sh0:sh1].astype(np.int64)
+        aoloc = aoloc - self.full_shell_to_aoloc[sh0]
+
+        ushell_to_shell = np.repeat(np.arange(sh1 - sh0), ngauss)
+        unao = nao[ushell_to_shell]
+        uao_to_ushell = np.repeat(np.arange(unao.shape[0]), unao)
+        uaoloc = np.cumsum(unao) - unao
+        offset = np.arange(uao_to_ushell.shape[0]) - uaoloc[uao_to_ushell]
+        uao2ao = aoloc[ushell_to_shell[uao_to_ushell]] + offset
+
         uao2ao_res = torch.tensor(uao2ao, dtype=torch.long, device=self.device)
         return uncontr_wrapper, uao2ao_res
 
+    ############### subsets and concatenation ###############
+    def __getitem__(self, inp: slice) -> LibcintWrapper:
+        """
+        Get a subset of the shells of this wrapper. The subset shares the
+        environment of the parent.
+
+        Parameters
+        ----------
+        inp : slice
+            Relative shell indices (without step).
+
+        Returns
+        -------
+        LibcintWrapper
+            Subset of the wrapper.
+        """
+        start, stop, step = inp.indices(len(self))
+        if step != 1:
+            raise ValueError("Only slices with unit step are supported.")
+
+        sh0 = self.shell_idxs[0]
+        return SubsetLibcintWrapper(self.parent, slice(sh0 + start, sh0 + stop))
+
+    @staticmethod
+    def concatenate(*wrappers: LibcintWrapper) -> tuple[LibcintWrapper, ...]:
+        """
+        Concatenate the wrappers into one wrapper with a common environment.
+
+        The returned subsets correspond to the input wrappers and can be
+        combined in the integrals (e.g., `int1e("ovlp", w1, w2)`). The parents
+        of the input wrappers are stored only once and form the independent
+        fragments of the common parent, for which block-diagonal integrals
+        are available (`int1e(..., blockdiag=True)`).
+
+        Parameters
+        ----------
+        *wrappers : LibcintWrapper
+            Wrappers to concatenate.
+
+        Returns
+        -------
+        tuple[LibcintWrapper, ...]
+            Subsets of the concatenated wrapper for each input wrapper.
+
+        Raises
+        ------
+        ValueError
+            If the wrappers use different kinds of basis functions.
+        """
+        if len(wrappers) == 0:
+            raise ValueError("At least one wrapper is required.")
+
+        spherical = wrappers[0].spherical
+        if any(w.spherical != spherical for w in wrappers):
+            raise ValueError(
+                "Cannot concatenate spherical and cartesian basis sets."
+            )
+
+        # unique parents (in order of appearance) and their shell offset
+        offsets: dict[int, int] = {}
+        parents: list[LibcintWrapper] = []
+        nshells = 0
+        for w in wrappers:
+            if id(w.parent) not in offsets:
+                offsets[id(w.parent)] = nshells
+                parents.append(w.parent)
+                nshells += len(w.parent)
+
+        # the common environment uses the tightest tier of all parents
+        accuracy = max(
+            (p.accuracy for p in parents), key=ACCURACY_TIERS.__getitem__
+        )
+
+        atombases = [ab for p in parents for ab in p.atombases]
+        parent = LibcintWrapper(
+            atombases, spherical=spherical, accuracy=accuracy
+        )
+
+        frag_shl_loc = np.zeros(len(parents) + 1, dtype=np.int32)
+        frag_atm_loc = np.zeros(len(parents) + 1, dtype=np.int32)
+        np.cumsum([len(p) for p in parents], out=frag_shl_loc[1:])
+        np.cumsum([p.natoms for p in parents], out=frag_atm_loc[1:])
+        parent._fragments = (frag_shl_loc, frag_atm_loc)
+
+        res: list[LibcintWrapper] = []
+        for w in wrappers:
+            sh0 = offsets[id(w.parent)]
+            start, stop = w.shell_idxs
+            res.append(
+                SubsetLibcintWrapper(parent, slice(sh0 + start, sh0 + stop))
+            )
+        return tuple(res)
+
+    ############### geometry update ###############
+    def update_positions(self, pos: Tensor) -> None:
+        """
+        Update the atomic positions in place.
+
+        Only the coordinate slots of the environment and the position
+        parameters are overwritten, i.e., the cost scales with the number of
+        atoms and not with the size of the basis set. Derived wrappers (the
+        uncontracted wrapper) are updated as well and the version of the
+        environment is incremented, which invalidates cached optimizers.
+
+        Integrals calculated before the update remain differentiable, because
+        the backward pass temporarily restores the positions of the forward
+        pass (see :meth:`at_positions`).
+
+        Parameters
+        ----------
+        pos : Tensor
+            New positions of shape `(natoms, ndim)`. Gradients with respect to
+            this tensor are available for all subsequent integrals.
+
+        Raises
+        ------
+        ValueError
+            If the shape of the positions does not match the atoms.
+        """
+        if pos.shape != self._allpos_params.shape:
+            raise ValueError(
+                f"The shape of the new positions ({pos.shape}) does not match "
+                f"the shape of the current positions "
+                f"({self._allpos_params.shape})."
+            )
+
+        ptr = self._atm[:, PTR_COORD, None] + np.arange(NDIM)
+        self._env[ptr] = tensor_to_numpy(pos.reshape(self._natoms, NDIM))
+
+        self._allpos_params = pos
+        self._atombases_stale = True
+        self._env_version += 1
+
+        # derived wrappers that share the geometry
+        cachename = "__cch_get_uncontracted_wrapper"
+        if cachename in self.__dict__:
+            self.__dict__[cachename][0].update_positions(pos)
+
+    @contextmanager
+    def at_positions(self, pos: Tensor) -> Iterator:
+        """
+        Temporarily evaluate the integrals at the given positions.
+
+        Parameters
+        ----------
+        pos : Tensor
+            The positions of shape `(natoms, ndim)`.
+
+        Yields
+        ------
+        Iterator
+            The context manager.
+        """
+        prev_pos = self._allpos_params
+        if pos is prev_pos:
+            yield
+            return
+
+        try:
+            self.update_positions(pos)
+            yield
+        finally:
+            self.update_positions(prev_pos)
+
+    def set_active_atoms(self, active: Tensor | np.ndarray | None) -> None:
+        """
+        Declare the atoms for which position gradients are required, e.g.,
+        the QM region or the unconstrained atoms.
+
+        In the backward pass of the integrals, the derivative integrals are
+        only evaluated for the shell pairs with at least one shell on an
+        active atom, and the gradients of all inactive atoms are zero. The
+        mask is taken at the time of the forward pass.
+
+        Parameters
+        ----------
+        active : Tensor | np.ndarray | None
+            Boolean mask of shape `(natoms,)` or indices of the active atoms.
+            `None` activates all atoms (default).
+
+        Raises
+        ------
+        ValueError
+            If the mask has the wrong shape or an index is out of range.
+        """
+        if active is None:
+            self._active_atoms = None
+            return
+
+        # not `tensor_to_numpy`, which has no mapping for bool tensors
+        if isinstance(active, Tensor):
+            active = active.detach().cpu().numpy()
+        active = np.asarray(active)
+
+        if active.dtype == bool:
+            if active.shape != (self._natoms,):
+                raise ValueError(
+                    f"The mask of the active atoms must have shape "
+                    f"({self._natoms},), but has shape {active.shape}."
+                )
+            mask = active.copy()
+        else:
+            if active.size > 0 and (
+                active.min() < -self._natoms or active.max() >= self._natoms
+            ):
+                raise ValueError("Index of an active atom out of range.")
+            mask = np.zeros(self._natoms, dtype=bool)
+            mask[active] = True
+
+        self._active_atoms = mask
+
+    ############### accuracy ###############
+    def set_accuracy(self, accuracy: str) -> None:
+        """
+        Set the accuracy tier of all integrals of the wrapper.
+
+        The tier sets libcint's exponent cutoff (see :data:`ACCURACY_TIERS`),
+        below which primitive pairs are dropped. Looser tiers skip more
+        primitive pairs of distant shells, which is faster at the cost of
+        a larger error of small integrals (roughly `exp(-cutoff)`). The
+        gradients use the same tier.
+
+        Parameters
+        ----------
+        accuracy : str
+            Accuracy tier ("tight", "normal" or "loose").
+
+        Raises
+        ------
+        ValueError
+            If the tier is unknown.
+        """
+        if accuracy not in ACCURACY_TIERS:
+            raise ValueError(
+                f"Unknown accuracy tier '{accuracy}' (available: "
+                f"{', '.join(ACCURACY_TIERS)})."
+            )
+        if accuracy == self._accuracy:
+            return
+
+        self._accuracy = accuracy
+        self._env[PTR_EXPCUTOFF] = ACCURACY_TIERS[accuracy]
+        self._env_version += 1
+
+        # derived wrappers with their own environment
+        cachename = "__cch_get_uncontracted_wrapper"
+        if cachename in self.__dict__:
+            self.__dict__[cachename][0].set_accuracy(accuracy)
+
+    ############### shell pairs ###############
+    def shell_extents(self, thresh: float) -> np.ndarray:
+        """
+        Extents of all shells, i.e., radii such that all shell pairs whose
+        distance exceeds the sum of their extents are screened out by the
+        overlap estimate of libcint (see `GTOoverlap_cond`),
+
+            mu r^2 - (li+lj+1)/2 log(r^2+1) - log|ci| - log|cj| >= -log(thresh)
+
+        with the reduced exponent `mu = ai aj / (ai + aj)` of every pair of
+        primitives. As the partner of a shell is not known, the largest
+        coefficient, the largest angular momentum and the smallest exponent
+        of the wrapper are assumed for it. With `r > sqrt(yi/ai) + sqrt(yj/aj)`,
+        the estimate exceeds `min(yi, yj)`, where `y` is the smallest solution
+        of the estimate for the worst partner of each primitive.
+
+        Parameters
+        ----------
+        thresh : float
+            Screening threshold.
+
+        Returns
+        -------
+        np.ndarray
+            Extents of shape `(nshells,)`.
+        """
+        bas, env = self._bas, self._env
+        nprim = bas[:, NPRIM_OF]
+        start = np.cumsum(nprim) - nprim
+
+        # exponents, coefficients and angular momenta of all primitives
+        shl = np.repeat(np.arange(bas.shape[0]), nprim)
+        k = np.arange(shl.shape[0]) - start[shl]
+        alpha = env[bas[shl, PTR_EXP] + k]
+        logc = np.log(np.maximum(np.abs(env[bas[shl, PTR_COEFF] + k]), 1e-300))
+        angmom = bas[shl, ANG_OF]
+
+        # estimate with the worst partner: y >= c + l log(b y + 1), where
+        # b y bounds r^2 = y / mu from above
+        c = -np.log(thresh) + logc + logc.max()
+        l = 0.5 * (angmom + angmom.max() + 1)
+        b = 1.0 / alpha + 1.0 / alpha.min()
+
+        def h(y: np.ndarray) -> np.ndarray:
+            return y - c - l * np.log(b * y + 1.0)
+
+        # upper bound of the largest root, then Newton steps, which approach
+        # the root of the convex function from above (i.e., stay conservative)
+        y = np.maximum(np.maximum(c, l), 1.0)
+        while True:
+            below = h(y) < 0.0
+            if not below.any():
+                break
+            y[below] *= 2.0
+
+        for _ in range(10):
+            y = y - h(y) / (1.0 - l * b / (b * y + 1.0))
+
+        return np.maximum.reduceat(np.sqrt(y / alpha), start)
+
+    def set_pair_skin(self, skin: float) -> None:
+        """
+        Set the skin distance of the shell pair lists (Verlet lists).
+
+        With a skin, the pair lists are built with the extents enlarged by
+        half of the skin. They remain valid and are reused without any
+        screening until an atom has moved by more than half of the skin since
+        the list was built, which amortizes the screening over the steps of a
+        molecular dynamics simulation. The integrals then evaluate all pairs
+        of the list, i.e., slightly more pairs than without skin.
+
+        Parameters
+        ----------
+        skin : float
+            Skin distance. Zero disables the reuse (default).
+
+        Raises
+        ------
+        ValueError
+            If the skin is negative.
+        """
+        if skin < 0.0:
+            raise ValueError("The skin distance must not be negative.")
+
+        self._pair_skin = float(skin)
+        self._candidates.clear()
+
+        # derived wrappers that share the geometry
+        cachename = "__cch_get_uncontracted_wrapper"
+        if cachename in self.__dict__:
+            self.__dict__[cachename][0].set_pair_skin(skin)
+
+    def get_shell_pairs(self, thresh: float) -> np.ndarray:
+        """
+        Candidate shell pairs of the full wrapper, whose distance does not
+        exceed the sum of their extents (see :meth:`shell_extents`).
+
+        The pairs are obtained from a cell list in linear time and cached for
+        the current geometry (see :attr:`env_version`), i.e., they are shared
+        by all integrals of the wrapper and its subsets. With a skin (see
+        :meth:`set_pair_skin`), the same array is returned as long as the
+        list is valid.
+
+        Parameters
+        ----------
+        thresh : float
+            Screening threshold.
+
+        Returns
+        -------
+        np.ndarray
+            Absolute shell indices `(i, j)` with `i >= j` of shape
+            `(npairs, 2)` (int32).
+        """
+        atom_coords = self._env[self._atm[:, PTR_COORD, None] + np.arange(NDIM)]
+
+        entry = self._candidates.get(thresh)
+        if entry is not None:
+            version, pairs, ref_coords = entry
+            if version == self._env_version:
+                return pairs
+
+            # Verlet criterion: no atom moved by more than half of the skin
+            if self._pair_skin > 0.0:
+                disp2 = ((atom_coords - ref_coords) ** 2).sum(axis=-1)
+                if disp2.max() <= (0.5 * self._pair_skin) ** 2:
+                    self._candidates[thresh] = (
+                        self._env_version,
+                        pairs,
+                        ref_coords,
+                    )
+                    return pairs
+
+        coords = atom_coords[self._bas[:, ATOM_OF]]
+        extents = self.shell_extents(thresh) + 0.5 * self._pair_skin
+        pairs = CellList(coords, extents).pairs()
+
+        self._candidates[thresh] = (self._env_version, pairs, atom_coords)
+        return pairs
+
     ############### misc functions ###############
     @contextmanager
     def centre_on_r(self, r: Tensor) -> Iterator:
@@ -476,13 +981,7 @@ class LibcintWrapper:
         int
             The number of atomic orbitals at the given shell index.
         """
-        if self.spherical is True:
-            op = CINT.CINTcgto_spheric
-        else:
-            op = CINT.CINTcgto_cart
-
-        bas = self.atm_bas_env[1]
-        return op(int2ctypes(sh), np2ctypes(bas))
+        return int(self._nao_per_shell[sh])
 
     def __str__(self) -> str:
         name = self.__class__.__name__
@@ -493,3 +992,92 @@ class LibcintWrapper:
 
     def __repr__(self) -> str:
         return str(self)
+
+
+class SubsetLibcintWrapper(LibcintWrapper):
+    """
+    Subset of the shells of a :class:`LibcintWrapper`.
+
+    The subset shares the environment and the parameters with its parent,
+    i.e., integrals between different subsets of the same parent can be
+    evaluated. All attributes that are not specific to the subset are taken
+    from the parent.
+    """
+
+    def __init__(self, parent: LibcintWrapper, subset: slice) -> None:
+        self._parent = parent
+        self._shell_idxs = (subset.start, subset.stop)
+        self._plans: OrderedDict[tuple, Any] = OrderedDict()
+
+    def __getattr__(self, name: str) -> Any:
+        # only called if the attribute is not found in the subset
+        if name == "_parent":
+            raise AttributeError(name)
+        return getattr(self._parent, name)
+
+    @property
+    def parent(self) -> LibcintWrapper:
+        return self._parent
+
+    @property
+    def atombases(self) -> list[AtomCGTOBasis]:
+        # the shells of the subset refer to all atoms of the parent
+        return self._parent.atombases
+
+    @property
+    def fragments(self) -> tuple[np.ndarray, np.ndarray] | None:
+        # fragments are only defined for the full wrapper
+        return None
+
+    @memoize_method
+    def get_uncontracted_wrapper(self) -> tuple[LibcintWrapper, Tensor]:
+        """
+        Create the subset of the uncontracted parent wrapper that corresponds
+        to this subset.
+
+        Returns
+        -------
+        tuple[LibcintWrapper, Tensor]
+            The uncontracted subset and the mapping from uncontracted atomic
+            orbital (relative index) to the relative index of the atomic
+            orbital.
+        """
+        pu_wrapper, p_uao2ao = self._parent.get_uncontracted_wrapper()
+
+        # every shell is split into one shell per primitive
+        ushl_loc = np.zeros(len(self._parent) + 1, dtype=np.int32)
+        np.cumsum(self._parent.ngauss_at_shell, out=ushl_loc[1:])
+
+        sh0, sh1 = self.shell_idxs
+        u_wrapper = SubsetLibcintWrapper(
+            pu_wrapper, slice(int(ushl_loc[sh0]), int(ushl_loc[sh1]))
+        )
+
+        uao0, uao1 = u_wrapper.ao_idxs()
+        uao2ao = p_uao2ao[uao0:uao1] - int(self.ao_idxs()[0])
+        return u_wrapper, uao2ao
+
+    def set_active_atoms(self, active: Tensor | np.ndarray | None) -> None:
+        # the atoms are shared with the parent
+        self._parent.set_active_atoms(active)
+
+    def set_accuracy(self, accuracy: str) -> None:
+        # the environment is shared with the parent
+        self._parent.set_accuracy(accuracy)
+
+    def set_pair_skin(self, skin: float) -> None:
+        # the pair lists are shared with the parent
+        self._parent.set_pair_skin(skin)
+
+    def get_shell_pairs(self, thresh: float) -> np.ndarray:
+        # the pairs are shared with the parent (absolute shell indices)
+        return self._parent.get_shell_pairs(thresh)
+
+    def update_positions(self, pos: Tensor) -> None:
+        # the geometry is shared with the parent
+        self._parent.update_positions(pos)
+
+    @contextmanager
+    def at_positions(self, pos: Tensor) -> Iterator:
+        with self._parent.at_positions(pos):
+            yield
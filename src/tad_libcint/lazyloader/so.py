@@ -26,6 +26,7 @@ from __future__ import annotations
 import ctypes
 import ctypes.util
 import sys
+from fnmatch import fnmatchcase
 from pathlib import Path
 
 from tad_libcint.typing import Any, Callable
@@ -36,6 +37,12 @@ __all__ = ["LazySharedLibraryLoader"]
 class LazySharedLibraryLoader:
     """
     Lazy loader for shared objects.
+
+    Functions are resolved only once and cached as attributes of the loader.
+    If a signature is registered for a function (exact name or `fnmatch`-style
+    pattern), its `restype` and `argtypes` are set upon first access. Typed
+    functions accept Python integers and raw pointers (integer addresses)
+    directly, which avoids the creation of intermediate ctypes objects.
     """
 
     name: str
@@ -47,13 +54,22 @@ class LazySharedLibraryLoader:
     lib: ctypes.CDLL | None
     """The shared object library."""
 
-    def __init__(self, name: str, relpath: str | Path) -> None:
+    signatures: dict[str, tuple[Any, list[Any]]]
+    """Signatures (restype, argtypes) of the functions."""
+
+    def __init__(
+        self,
+        name: str,
+        relpath: str | Path,
+        signatures: dict[str, tuple[Any, list[Any]]] | None = None,
+    ) -> None:
         # Determine the library extension based on the operating system
         ext = "dylib" if sys.platform == "darwin" else "so"
 
         self.path = Path(relpath) / f"lib{name.casefold()}.{ext}"
         self.name = name
         self.lib = None
+        self.signatures = signatures if signatures is not None else {}
 
     def __getattr__(self, func_name: str) -> Callable[..., Any]:
         if self.lib is None:
@@ -65,4 +81,35 @@ class LazySharedLibraryLoader:
                     raise exc
                 self.lib = ctypes.cdll.LoadLibrary(path2)
 
-        return getattr(self.lib, func_name)
+        func = getattr(self.lib, func_name)
+
+        signature = self._get_signature(func_name)
+        if signature is not None:
+            func.restype, func.argtypes = signature
+
+        # cache, i.e., `__getattr__` is not invoked again for this function
+        setattr(self, func_name, func)
+        return func
+
+    def _get_signature(self, func_name: str) -> tuple[Any, list[Any]] | None:
+        """
+        Get the signature of a function.
+
+        Parameters
+        ----------
+        func_name : str
+            Name of the function.
+
+        Returns
+        -------
+        tuple[Any, list[Any]] | None
+            Return type and argument types or `None` if not registered.
+        """
+        if func_name in self.signatures:
+            return self.signatures[func_name]
+
+        for pattern, signature in self.signatures.items():
+            if fnmatchcase(func_name, pattern):
+                return signature
+
+        return None
@@ -0,0 +1,544 @@
+/* This file is part of tad-libcint.
+
+   SPDX-Identifier: Apache-2.0
+   Copyright (C) 2024 Grimme Group
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+
+ *
+ * Drivers for 2-center integrals that complement fill_int2c.c.
+ */
+
+#include <stdlib.h>
+#include <stdint.h>
+#include <math.h>
+#include "config.h"
+#include "cint.h"
+#include "np_helper/np_helper.h"
+#include "gto/gto.h"
+
+#define PLAIN           0
+#define HERMITIAN       1
+#define ANTIHERMI       2
+#define SYMMETRIC       3
+
+/*
+ * Scatter the compact F-order block buf(di,dj,comp) of shell pair (i0,j0)
+ * into a C-order matrix with leading dimension ld, in which the components
+ * are cstride elements apart, e.g., mat(comp,naoi,naoj) with
+ * cstride = naoi*naoj and ld = naoj.
+ */
+static void _block_to_corder(double *mat, double *buf, int comp,
+                             size_t cstride, size_t ld,
+                             int i0, int j0, int di, int dj)
+{
+        int i, j, ic;
+        double *pmat, *pbuf;
+        for (ic = 0; ic < comp; ic++) {
+                pbuf = buf + (size_t)ic * di * dj;
+                pmat = mat + ic * cstride + i0 * ld + j0;
+                for (i = 0; i < di; i++) {
+                for (j = 0; j < dj; j++) {
+                        pmat[i*ld+j] = pbuf[j*di+i];
+                } }
+        }
+}
+
+/*
+ * Same as _block_to_corder, but the block is written transposed to the
+ * position (j0,i0) and multiplied by sign (for the other triangle of
+ * (anti-)hermitian matrices).
+ */
+static void _block_to_corder_t(double *mat, double *buf, int comp,
+                               size_t cstride, size_t ld,
+                               int i0, int j0, int di, int dj, double sign)
+{
+        int i, j, ic;
+        double *pmat, *pbuf;
+        for (ic = 0; ic < comp; ic++) {
+                pbuf = buf + (size_t)ic * di * dj;
+                pmat = mat + ic * cstride + j0 * ld + i0;
+                for (j = 0; j < dj; j++) {
+                for (i = 0; i < di; i++) {
+                        pmat[j*ld+i] = sign * pbuf[j*di+i];
+                } }
+        }
+}
+
+/*
+ * mat(comp,naoi,naoj) in C-order, i.e., the memory layout of a contiguous
+ * (comp, naoi, naoj) tensor. The caller can pass the data pointer of the
+ * final output tensor, no transposition is required afterwards.
+ */
+void GTOint2c_corder(int (*intor)(), double *mat, int comp, int hermi,
+                     int *shls_slice, int *ao_loc, CINTOpt *opt,
+                     int *atm, int natm, int *bas, int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const size_t naoi = ao_loc[ish1] - ao_loc[ish0];
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+#pragma omp parallel
+{
+        int ish, jsh, ij, i0, j0, di, dj;
+        int shls[2];
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic, 4)
+        for (ij = 0; ij < nish*njsh; ij++) {
+                ish = ij / njsh;
+                jsh = ij % njsh;
+                if (hermi != PLAIN && ish < jsh) {
+                        // fill up only lower triangle of C-array
+                        continue;
+                }
+
+                ish += ish0;
+                jsh += jsh0;
+                shls[0] = ish;
+                shls[1] = jsh;
+                i0 = ao_loc[ish] - ao_loc[ish0];
+                j0 = ao_loc[jsh] - ao_loc[jsh0];
+                di = ao_loc[ish+1] - ao_loc[ish];
+                dj = ao_loc[jsh+1] - ao_loc[jsh];
+                (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env, opt, cache);
+                _block_to_corder(mat, buf, comp, naoi*naoj, naoj,
+                                 i0, j0, di, dj);
+        }
+        free(buf);
+}
+        if (hermi != PLAIN) { // upper triangle of C-array
+                int ic;
+                for (ic = 0; ic < comp; ic++) {
+                        NPdsymm_triu(naoi, mat+ic*naoi*naoi, hermi);
+                }
+        }
+}
+
+/*
+ * mat(nbatch,comp,naoi,naoj) in C-order for nbatch geometries of the same
+ * molecule. The atm/bas/env arrays serve as template, the coordinates of
+ * all atoms are taken from coords(nbatch,natm,3) in C-order. The optimizer
+ * depends on the geometry and is therefore not used.
+ */
+void GTOint2c_batch(int (*intor)(), double *mat, int comp, int hermi,
+                    int *shls_slice, int *ao_loc, double *coords, int nbatch,
+                    int *atm, int natm, int *bas, int nbas,
+                    double *env, int nenv)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const size_t nij = (size_t)nish * njsh;
+        const size_t naoi = ao_loc[ish1] - ao_loc[ish0];
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const size_t nmat = comp * naoi * naoj;
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+        double *envs = malloc(sizeof(double) * nenv * nbatch);
+#pragma omp parallel
+{
+        int ib, ia, ish, jsh, i0, j0, di, dj;
+        size_t bij, ij;
+        int shls[2];
+        double *penv, *pcoord;
+#pragma omp for schedule(static)
+        for (ib = 0; ib < nbatch; ib++) {
+                penv = envs + (size_t)ib * nenv;
+                NPdcopy(penv, env, nenv);
+                for (ia = 0; ia < natm; ia++) {
+                        pcoord = coords + ((size_t)ib * natm + ia) * 3;
+                        penv[atm(PTR_COORD, ia)+0] = pcoord[0];
+                        penv[atm(PTR_COORD, ia)+1] = pcoord[1];
+                        penv[atm(PTR_COORD, ia)+2] = pcoord[2];
+                }
+        }
+
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic, 4)
+        for (bij = 0; bij < nbatch*nij; bij++) {
+                ib = bij / nij;
+                ij = bij % nij;
+                ish = ij / njsh;
+                jsh = ij % njsh;
+                if (hermi != PLAIN && ish < jsh) {
+                        continue;
+                }
+
+                ish += ish0;
+                jsh += jsh0;
+                shls[0] = ish;
+                shls[1] = jsh;
+                i0 = ao_loc[ish] - ao_loc[ish0];
+                j0 = ao_loc[jsh] - ao_loc[jsh0];
+                di = ao_loc[ish+1] - ao_loc[ish];
+                dj = ao_loc[jsh+1] - ao_loc[jsh];
+                (*intor)(buf, NULL, shls, atm, natm, bas, nbas,
+                         envs + (size_t)ib * nenv, NULL, cache);
+                _block_to_corder(mat + ib * nmat, buf, comp, naoi*naoj, naoj,
+                                 i0, j0, di, dj);
+        }
+        free(buf);
+
+        if (hermi != PLAIN) {
+                int ic;
+#pragma omp for schedule(static)
+                for (ib = 0; ib < nbatch; ib++) {
+                for (ic = 0; ic < comp; ic++) {
+                        NPdsymm_triu(naoi, mat+ib*nmat+ic*naoi*naoi, hermi);
+                } }
+        }
+}
+        free(envs);
+}
+
+/*
+ * Symmetrize the upper triangle of the n x n block of a matrix with leading
+ * dimension ld (C-order), similar to NPdsymm_triu.
+ */
+static void _dsymm_triu_ld(int n, size_t ld, double *mat, int hermi)
+{
+        int i, j;
+        if (hermi == HERMITIAN || hermi == SYMMETRIC) {
+                for (i = 0; i < n; i++) {
+                for (j = i+1; j < n; j++) {
+                        mat[i*ld+j] = mat[j*ld+i];
+                } }
+        } else {
+                for (i = 0; i < n; i++) {
+                for (j = i+1; j < n; j++) {
+                        mat[i*ld+j] = -mat[j*ld+i];
+                } }
+        }
+}
+
+/*
+ * Fill the diagonal block of fragment m, i.e., the shells
+ * frag_shl_loc[m]:frag_shl_loc[m+1] and the atoms
+ * frag_atm_loc[m]:frag_atm_loc[m+1], into the C-order matrix pmat with
+ * leading dimension ld and component stride cstride. The fragment is
+ * evaluated as an independent system (e.g., the nuclear attraction only
+ * includes its own atoms), for which the shells are copied to fbas with
+ * atom indices relative to the fragment.
+ */
+static void _fill_fragment(int (*intor)(), double *pmat, int comp, int hermi,
+                           size_t cstride, size_t ld, int m,
+                           int *frag_shl_loc, int *frag_atm_loc, int *ao_loc,
+                           int *atm, int *bas, double *env,
+                           int *fbas, double *buf, double *cache)
+{
+        const int sh0 = frag_shl_loc[m];
+        const int nsh = frag_shl_loc[m+1] - sh0;
+        const int a0 = frag_atm_loc[m];
+        const int natm = frag_atm_loc[m+1] - a0;
+        const int nao = ao_loc[sh0+nsh] - ao_loc[sh0];
+        int ish, jsh, ic, i0, j0, di, dj;
+        int shls[2];
+
+        for (ish = 0; ish < nsh; ish++) {
+                for (ic = 0; ic < BAS_SLOTS; ic++) {
+                        fbas[ish*BAS_SLOTS+ic] = bas(ic, sh0+ish);
+                }
+                fbas[ish*BAS_SLOTS+ATOM_OF] -= a0;
+        }
+
+        for (ish = 0; ish < nsh; ish++) {
+        for (jsh = 0; jsh < nsh; jsh++) {
+                if (hermi != PLAIN && ish < jsh) {
+                        continue;
+                }
+                shls[0] = ish;
+                shls[1] = jsh;
+                i0 = ao_loc[sh0+ish] - ao_loc[sh0];
+                j0 = ao_loc[sh0+jsh] - ao_loc[sh0];
+                di = ao_loc[sh0+ish+1] - ao_loc[sh0+ish];
+                dj = ao_loc[sh0+jsh+1] - ao_loc[sh0+jsh];
+                (*intor)(buf, NULL, shls, atm+a0*ATM_SLOTS, natm, fbas, nsh,
+                         env, NULL, cache);
+                _block_to_corder(pmat, buf, comp, cstride, ld, i0, j0, di, dj);
+        } }
+
+        if (hermi != PLAIN) {
+                for (ic = 0; ic < comp; ic++) {
+                        _dsymm_triu_ld(nao, ld, pmat+ic*cstride, hermi);
+                }
+        }
+}
+
+static int _max_fragment_shells(int *frag_shl_loc, int nfrag)
+{
+        int m;
+        int maxshl = 0;
+        for (m = 0; m < nfrag; m++) {
+                maxshl = MAX(maxshl, frag_shl_loc[m+1] - frag_shl_loc[m]);
+        }
+        return maxshl;
+}
+
+/*
+ * mat(nmol,comp,nao_pad,nao_pad) in C-order for a batch of molecules that
+ * are stored consecutively in atm/bas/env. Molecule m consists of the
+ * shells mol_shl_loc[m]:mol_shl_loc[m+1] and the atoms
+ * mol_atm_loc[m]:mol_atm_loc[m+1] and is evaluated as an independent system
+ * by one thread. The padding of every block is set to zero.
+ */
+void GTOint2c_padded(int (*intor)(), double *mat, int comp, int hermi,
+                     int *mol_shl_loc, int *mol_atm_loc, int nmol,
+                     int nao_pad, int *ao_loc,
+                     int *atm, int natm, int *bas, int nbas, double *env)
+{
+        int shls_slice[] = {0, nbas, 0, nbas};
+        const size_t cstride = (size_t)nao_pad * nao_pad;
+        const int maxshl = _max_fragment_shells(mol_shl_loc, nmol);
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+#pragma omp parallel
+{
+        int m;
+        double *pmat;
+        int *mbas = malloc(sizeof(int) * BAS_SLOTS * (maxshl + 1));
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic)
+        for (m = 0; m < nmol; m++) {
+                pmat = mat + (size_t)m * comp * cstride;
+                NPdset0(pmat, comp * cstride);
+                _fill_fragment(intor, pmat, comp, hermi, cstride, nao_pad, m,
+                               mol_shl_loc, mol_atm_loc, ao_loc,
+                               atm, bas, env, mbas, buf, cache);
+        }
+        free(buf);
+        free(mbas);
+}
+}
+
+/*
+ * mat(comp,nao,nao) in C-order with the diagonal blocks of the independent
+ * fragments (defined as in GTOint2c_padded) of the whole system. The shell
+ * pairs between different fragments are never visited, the caller has to
+ * initialize the off-diagonal blocks.
+ */
+void GTOint2c_blockdiag(int (*intor)(), double *mat, int comp, int hermi,
+                        int *frag_shl_loc, int *frag_atm_loc, int nfrag,
+                        int *ao_loc,
+                        int *atm, int natm, int *bas, int nbas, double *env)
+{
+        int shls_slice[] = {0, nbas, 0, nbas};
+        const size_t nao = ao_loc[nbas] - ao_loc[0];
+        const size_t cstride = nao * nao;
+        const int maxshl = _max_fragment_shells(frag_shl_loc, nfrag);
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+#pragma omp parallel
+{
+        int m;
+        size_t off;
+        int *fbas = malloc(sizeof(int) * BAS_SLOTS * (maxshl + 1));
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic)
+        for (m = 0; m < nfrag; m++) {
+                off = ao_loc[frag_shl_loc[m]] - ao_loc[0];
+                _fill_fragment(intor, mat + off * nao + off, comp, hermi,
+                               cstride, nao, m,
+                               frag_shl_loc, frag_atm_loc, ao_loc,
+                               atm, bas, env, fbas, buf, cache);
+        }
+        free(buf);
+        free(fbas);
+}
+}
+
+/*
+ * Evaluate only the shell pairs pairs(npairs,2), given relative to the shell
+ * slice, which may be in any order.
+ *
+ * If block_loc is NULL, the blocks are written into the dense C-order
+ * matrix out(comp,naoi,naoj), which has to be initialized by the caller.
+ * For (anti-)hermitian integrals, the transposed block is written as well,
+ * i.e., only one of the pairs (i,j) and (j,i) should be listed.
+ *
+ * Otherwise, block p is stored compactly as (comp,di,dj) in C-order at
+ * out + block_loc[p].
+ */
+void GTOint2c_pairs(int (*intor)(), double *out, int comp, int hermi,
+                    int *pairs, int npairs, int64_t *block_loc,
+                    int *shls_slice, int *ao_loc, CINTOpt *opt,
+                    int *atm, int natm, int *bas, int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const size_t naoi = ao_loc[ish1] - ao_loc[ish0];
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const double sign = (hermi == ANTIHERMI) ? -1. : 1.;
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+#pragma omp parallel
+{
+        int p, ish, jsh, i0, j0, di, dj;
+        int shls[2];
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic, 4)
+        for (p = 0; p < npairs; p++) {
+                ish = pairs[p*2  ] + ish0;
+                jsh = pairs[p*2+1] + jsh0;
+                shls[0] = ish;
+                shls[1] = jsh;
+                di = ao_loc[ish+1] - ao_loc[ish];
+                dj = ao_loc[jsh+1] - ao_loc[jsh];
+                (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env, opt, cache);
+
+                if (block_loc != NULL) {
+                        _block_to_corder(out + block_loc[p], buf, comp,
+                                         (size_t)di * dj, dj, 0, 0, di, dj);
+                        continue;
+                }
+
+                i0 = ao_loc[ish] - ao_loc[ish0];
+                j0 = ao_loc[jsh] - ao_loc[jsh0];
+                _block_to_corder(out, buf, comp, naoi*naoj, naoj,
+                                 i0, j0, di, dj);
+                if (hermi != PLAIN && ish != jsh) {
+                        _block_to_corder_t(out, buf, comp, naoi*naoj, naoj,
+                                           i0, j0, di, dj, sign);
+                }
+        }
+        free(buf);
+}
+}
+
+/*
+ * Norms of the shell blocks out(nish,njsh) over all components, without
+ * storing the integrals. norm_type 0 is the maximum absolute value, 1 the
+ * Frobenius norm. For (anti-)hermitian integrals, only the lower triangle
+ * is evaluated and mirrored.
+ */
+void GTOint2c_block_norms(int (*intor)(), double *out, int comp, int hermi,
+                          int norm_type, int *shls_slice, int *ao_loc,
+                          CINTOpt *opt, int *atm, int natm, int *bas,
+                          int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                                 atm, natm, bas, nbas, env);
+#pragma omp parallel
+{
+        int i, j, n, nf;
+        int shls[2];
+        double norm;
+        double *buf = malloc(sizeof(double) * (dmax*dmax*comp + cache_size));
+        double *cache = buf + dmax * dmax * comp;
+#pragma omp for schedule(dynamic, 4)
+        for (i = 0; i < nish; i++) {
+        for (j = 0; j < njsh; j++) {
+                if (hermi != PLAIN && i < j) {
+                        break;
+                }
+
+                shls[0] = i + ish0;
+                shls[1] = j + jsh0;
+                nf = (ao_loc[shls[0]+1] - ao_loc[shls[0]])
+                   * (ao_loc[shls[1]+1] - ao_loc[shls[1]]) * comp;
+                (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env, opt, cache);
+
+                norm = 0;
+                if (norm_type == 0) {
+                        for (n = 0; n < nf; n++) {
+                                norm = MAX(norm, fabs(buf[n]));
+                        }
+                } else {
+                        for (n = 0; n < nf; n++) {
+                                norm += buf[n] * buf[n];
+                        }
+                        norm = sqrt(norm);
+                }
+
+                out[(size_t)i*njsh+j] = norm;
+                if (hermi != PLAIN) {
+                        out[(size_t)j*njsh+i] = norm;
+                }
+        } }
+        free(buf);
+}
+}
+
+/*
+ * Same estimate as GTOoverlap_cond, but only for the shell pairs
+ * pairs(npairs,2) (absolute shell indices), e.g., the candidates of a
+ * spatial index. The coefficients of the first contraction are used.
+ */
+void GTOoverlap_cond_pairs(double *cond, int *pairs, int npairs,
+                           int *atm, int natm, int *bas, int nbas, double *env)
+{
+#pragma omp parallel
+{
+        int p, ish, jsh, ip, jp, li, lj, iprim, jprim;
+        double aij, eij, cceij, min_cceij, log_rr_ij, dx, dy, dz, rr_ij;
+        double *ai, *aj, *ci, *cj, *ri, *rj;
+#pragma omp for schedule(static)
+        for (p = 0; p < npairs; p++) {
+                ish = pairs[p*2  ];
+                jsh = pairs[p*2+1];
+                iprim = bas(NPRIM_OF, ish);
+                jprim = bas(NPRIM_OF, jsh);
+                li = bas(ANG_OF, ish);
+                lj = bas(ANG_OF, jsh);
+                ai = env + bas(PTR_EXP, ish);
+                aj = env + bas(PTR_EXP, jsh);
+                ci = env + bas(PTR_COEFF, ish);
+                cj = env + bas(PTR_COEFF, jsh);
+                ri = env + atm(PTR_COORD, bas(ATOM_OF, ish));
+                rj = env + atm(PTR_COORD, bas(ATOM_OF, jsh));
+                dx = ri[0] - rj[0];
+                dy = ri[1] - rj[1];
+                dz = ri[2] - rj[2];
+                rr_ij = dx * dx + dy * dy + dz * dz;
+                log_rr_ij = (li+lj+1) * log(rr_ij+1) / 2;
+
+                min_cceij = 1e9;
+                for (jp = 0; jp < jprim; jp++) {
+                for (ip = 0; ip < iprim; ip++) {
+                        aij = ai[ip] + aj[jp];
+                        eij = rr_ij * ai[ip] * aj[jp] / aij;
+                        cceij = eij - log_rr_ij - log(fabs(ci[ip]))
+                              - log(fabs(cj[jp]));
+                        min_cceij = MIN(min_cceij, cceij);
+                } }
+                cond[p] = min_cceij;
+        }
+}
+}
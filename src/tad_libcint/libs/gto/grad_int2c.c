@@ -0,0 +1,495 @@
+/* This file is part of tad-libcint.
+
+   SPDX-Identifier: Apache-2.0
+   Copyright (C) 2024 Grimme Group
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+
+ *
+ * Contracted gradients (and Hessians) of 2-center integrals w.r.t. the
+ * positions and the primitives, in which the derivative integrals are only
+ * evaluated block by block and never stored.
+ */
+
+#include <stdlib.h>
+#include "config.h"
+#include "cint.h"
+#include "np_helper/np_helper.h"
+#include "gto/gto.h"
+
+/*
+ * Contract the block buf(di,dj,ncomp) (F-order) or, if trans, the block
+ * buf(dj,di,ncomp) of the swapped shells with the block pg(di,dj) of the
+ * incoming gradient (leading dimension ld),
+ *
+ *      s(ncomp) = sum_ab pg[a,b] buf[a,b,:]
+ */
+static void _contract_block(double *s, double *buf, double *pg, size_t ld,
+                            int di, int dj, int ncomp, int trans)
+{
+        const size_t dij = (size_t)di * dj;
+        const size_t sa = trans ? dj : 1;
+        const size_t sb = trans ? 1 : di;
+        int a, b, x;
+        for (x = 0; x < ncomp; x++) {
+                s[x] = 0;
+                for (a = 0; a < di; a++) {
+                for (b = 0; b < dj; b++) {
+                        s[x] += pg[a*ld+b] * buf[x*dij+a*sa+b*sb];
+                } }
+        }
+}
+
+static void _grad_pair(int (*intor_i)(), int (*intor_j)(), int trans_j,
+                       double *grad, double *gout, size_t ld,
+                       int ish, int jsh, int *shls_slice, int *ao_loc,
+                       CINTOpt *opt_i, CINTOpt *opt_j,
+                       int *atm, int natm, int *bas, int nbas, double *env,
+                       double *buf, double *cache)
+{
+        const int i0 = ao_loc[ish] - ao_loc[shls_slice[0]];
+        const int j0 = ao_loc[jsh] - ao_loc[shls_slice[2]];
+        const int di = ao_loc[ish+1] - ao_loc[ish];
+        const int dj = ao_loc[jsh+1] - ao_loc[jsh];
+        double *pg = gout + i0 * ld + j0;
+        double *gi = grad + bas(ATOM_OF,ish) * 3;
+        double *gj = grad + bas(ATOM_OF,jsh) * 3;
+        double s[3];
+        int shls[2];
+        int x;
+
+        // bra derivative <d i|op|j>, contributes to the atom of shell i
+        shls[0] = ish;
+        shls[1] = jsh;
+        (*intor_i)(buf, NULL, shls, atm, natm, bas, nbas, env, opt_i, cache);
+        _contract_block(s, buf, pg, ld, di, dj, 3, 0);
+        for (x = 0; x < 3; x++) {
+                gi[x] -= s[x];
+        }
+
+        // translationally invariant, <i|op|d j> = -<d i|op|j>
+        if (intor_j == NULL) {
+                for (x = 0; x < 3; x++) {
+                        gj[x] += s[x];
+                }
+                return;
+        }
+
+        // ket derivative <i|op|d j> or <d j|op|i>, atom of shell j
+        if (trans_j) {
+                shls[0] = jsh;
+                shls[1] = ish;
+        }
+        (*intor_j)(buf, NULL, shls, atm, natm, bas, nbas, env, opt_j, cache);
+        _contract_block(s, buf, pg, ld, di, dj, 3, trans_j);
+        for (x = 0; x < 3; x++) {
+                gj[x] -= s[x];
+        }
+}
+
+/*
+ * Position gradient grad(natm,3) of a 2-center integral of a scalar
+ * operator, contracted with the incoming gradient gout(naoi,naoj) (C-order):
+ *
+ *      grad[A] = -sum_ab gout[a,b] (<d a|op|b> [a on A] + <a|op|d b> [b on A])
+ *
+ * The bra derivative is evaluated by intor_i for the shells (i,j), the ket
+ * derivative by intor_j for (i,j) or, if trans_j, for (j,i), e.g., <d j|op|i>
+ * for symmetric operators. Both intors have 3 components. If intor_j is NULL,
+ * the operator is translationally invariant and the ket derivative is the
+ * negative bra derivative, i.e., only intor_i is evaluated.
+ *
+ * If pairs is NULL, all shell pairs of the slice are evaluated, otherwise
+ * only pairs(npairs,2) given relative to the slice. The memory does not
+ * depend on the number of AOs apart from gout, as every thread accumulates
+ * its own copy of grad.
+ */
+void GTOgrad_int2c(int (*intor_i)(), int (*intor_j)(), int trans_j,
+                   double *grad, double *gout, int *pairs, int npairs,
+                   int *shls_slice, int *ao_loc,
+                   CINTOpt *opt_i, CINTOpt *opt_j,
+                   int *atm, int natm, int *bas, int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        int cache_size = GTOmax_cache_size(intor_i, shls_slice, 2,
+                                           atm, natm, bas, nbas, env);
+        if (intor_j != NULL) {
+                cache_size = MAX(cache_size,
+                                 GTOmax_cache_size(intor_j, shls_slice, 2,
+                                                   atm, natm, bas, nbas, env));
+        }
+#pragma omp parallel
+{
+        int i, j, p, n;
+        double *gthread = calloc(natm * 3, sizeof(double));
+        double *buf = malloc(sizeof(double) * (dmax*dmax*3 + cache_size));
+        double *cache = buf + dmax * dmax * 3;
+        if (pairs == NULL) {
+#pragma omp for schedule(dynamic, 4)
+                for (i = 0; i < nish; i++) {
+                for (j = 0; j < njsh; j++) {
+                        _grad_pair(intor_i, intor_j, trans_j, gthread, gout,
+                                   naoj, i+ish0, j+jsh0, shls_slice, ao_loc,
+                                   opt_i, opt_j, atm, natm, bas, nbas, env,
+                                   buf, cache);
+                } }
+        } else {
+#pragma omp for schedule(dynamic, 4)
+                for (p = 0; p < npairs; p++) {
+                        _grad_pair(intor_i, intor_j, trans_j, gthread, gout,
+                                   naoj, pairs[p*2]+ish0, pairs[p*2+1]+jsh0,
+                                   shls_slice, ao_loc, opt_i, opt_j,
+                                   atm, natm, bas, nbas, env, buf, cache);
+                }
+        }
+#pragma omp critical
+        for (n = 0; n < natm * 3; n++) {
+                grad[n] += gthread[n];
+        }
+        free(buf);
+        free(gthread);
+}
+}
+
+/*
+ * Single primitive p of the shell ish as a shell of its own. The exponent and
+ * coefficient pointers refer to the primitive in the original environment.
+ */
+static void _prim_shell(int *pbas, int *bas, int ish, int p)
+{
+        int n;
+        for (n = 0; n < BAS_SLOTS; n++) {
+                pbas[n] = bas(n,ish);
+        }
+        pbas[NPRIM_OF] = 1;
+        pbas[PTR_EXP] += p;
+        pbas[PTR_COEFF] += p;
+}
+
+static void _prim_grad_pair(int (*intor)(), int (*intor_i)(),
+                            int (*intor_j)(), int trans_j,
+                            double *gval, double *gderiv, double *gout,
+                            size_t ld, int ish, int jsh, int *prim_loc,
+                            int *shls_slice, int *ao_loc,
+                            int *atm, int natm, int *bas, double *env,
+                            double *buf, double *cache)
+{
+        const int i0 = ao_loc[ish] - ao_loc[shls_slice[0]];
+        const int j0 = ao_loc[jsh] - ao_loc[shls_slice[2]];
+        const int di = ao_loc[ish+1] - ao_loc[ish];
+        const int dj = ao_loc[jsh+1] - ao_loc[jsh];
+        const int npi = bas(NPRIM_OF,ish);
+        const int npj = bas(NPRIM_OF,jsh);
+        double *pg = gout + i0 * ld + j0;
+        int pbas[BAS_SLOTS*2];
+        int shls[2];
+        int p, q;
+        double s;
+
+        for (p = 0; p < npi; p++) {
+                _prim_shell(pbas, bas, ish, p);
+                for (q = 0; q < npj; q++) {
+                        // the temporary shells and the block of the incoming
+                        // gradient are shared by all integrals of the pair
+                        _prim_shell(pbas+BAS_SLOTS, bas, jsh, q);
+                        shls[0] = 0;
+                        shls[1] = 1;
+
+                        // <p|op|q> for both primitives
+                        if (intor != NULL) {
+                                (*intor)(buf, NULL, shls, atm, natm, pbas, 2,
+                                         env, NULL, cache);
+                                _contract_block(&s, buf, pg, ld, di, dj, 1, 0);
+                                gval[prim_loc[ish]+p] += s;
+                                gval[prim_loc[jsh]+q] += s;
+                        }
+                        if (intor_i == NULL) {
+                                continue;
+                        }
+
+                        // derivative of the bra primitive p
+                        (*intor_i)(buf, NULL, shls, atm, natm, pbas, 2, env,
+                                   NULL, cache);
+                        _contract_block(&s, buf, pg, ld, di, dj, 1, 0);
+                        gderiv[prim_loc[ish]+p] += s;
+
+                        // derivative of the ket primitive q
+                        if (intor_j == NULL) {
+                                gderiv[prim_loc[jsh]+q] += s;
+                                continue;
+                        }
+                        if (trans_j) {
+                                shls[0] = 1;
+                                shls[1] = 0;
+                        }
+                        (*intor_j)(buf, NULL, shls, atm, natm, pbas, 2, env,
+                                   NULL, cache);
+                        _contract_block(&s, buf, pg, ld, di, dj, 1, trans_j);
+                        gderiv[prim_loc[jsh]+q] += s;
+                }
+        }
+}
+
+/*
+ * Primitive-pair contributions of a 2-center integral of a scalar operator
+ * and of its bra/ket derivatives, contracted with the incoming gradient
+ * gout(naoi,naoj) (C-order) in a single pass over the primitive pairs:
+ *
+ *      gval[p] = sum_ab gout[a,b] (<a_p|op|b> [p in a] + <a|op|b_p> [p in b])
+ *      gderiv[p] = sum_ab gout[a,b] (<D a_p|op|b> [p in a]
+ *                                    + <a|op|D b_p> [p in b])
+ *
+ * Both have the shape (nprim), the total number of primitives of all shells
+ * in bas (in the order of the shells). The integral is evaluated by intor
+ * (skipped if NULL), which gives the gradient w.r.t. the contraction
+ * coefficients as gval[p] / c[p]. The bra derivative D (e.g., rr for the
+ * exponents) is evaluated by intor_i for the primitives (p,q) (skipped if
+ * NULL), the ket derivative by intor_j for (p,q) or, if trans_j, for (q,p).
+ * If intor_j is NULL, the block of intor_i is used for both.
+ *
+ * The primitives are evaluated as temporary shells of their own, i.e., no
+ * uncontracted basis or integrals are required. If pairs is NULL, all shell
+ * pairs of the slice are evaluated, otherwise only pairs(npairs,2) given
+ * relative to the slice.
+ */
+void GTOgrad_prim_int2c(int (*intor)(), int (*intor_i)(), int (*intor_j)(),
+                        int trans_j, double *gval, double *gderiv,
+                        double *gout, int *pairs, int npairs,
+                        int *shls_slice, int *ao_loc,
+                        int *atm, int natm, int *bas, int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        int (*intors[3])() = {intor, intor_i, intor_j};
+        int cache_size = 0;
+        int n;
+        for (n = 0; n < 3; n++) {
+                if (intors[n] != NULL) {
+                        cache_size = MAX(cache_size,
+                                         GTOmax_cache_size(intors[n],
+                                                           shls_slice, 2,
+                                                           atm, natm, bas,
+                                                           nbas, env));
+                }
+        }
+
+        int *prim_loc = malloc(sizeof(int) * (nbas + 1));
+        prim_loc[0] = 0;
+        for (n = 0; n < nbas; n++) {
+                prim_loc[n+1] = prim_loc[n] + bas(NPRIM_OF,n);
+        }
+        const int nprim = prim_loc[nbas];
+
+#pragma omp parallel
+{
+        int i, j, p, k;
+        double *gthread = calloc(nprim * 2, sizeof(double));
+        double *dthread = gthread + nprim;
+        double *buf = malloc(sizeof(double) * (dmax*dmax + cache_size));
+        double *cache = buf + dmax * dmax;
+        if (pairs == NULL) {
+#pragma omp for schedule(dynamic, 4)
+                for (i = 0; i < nish; i++) {
+                for (j = 0; j < njsh; j++) {
+                        _prim_grad_pair(intor, intor_i, intor_j, trans_j,
+                                        gthread, dthread, gout, naoj,
+                                        i+ish0, j+jsh0, prim_loc,
+                                        shls_slice, ao_loc, atm, natm,
+                                        bas, env, buf, cache);
+                } }
+        } else {
+#pragma omp for schedule(dynamic, 4)
+                for (p = 0; p < npairs; p++) {
+                        _prim_grad_pair(intor, intor_i, intor_j, trans_j,
+                                        gthread, dthread, gout, naoj,
+                                        pairs[p*2]+ish0, pairs[p*2+1]+jsh0,
+                                        prim_loc, shls_slice, ao_loc,
+                                        atm, natm, bas, env, buf, cache);
+                }
+        }
+#pragma omp critical
+{
+        if (intor != NULL) {
+                for (k = 0; k < nprim; k++) {
+                        gval[k] += gthread[k];
+                }
+        }
+        if (intor_i != NULL) {
+                for (k = 0; k < nprim; k++) {
+                        gderiv[k] += dthread[k];
+                }
+        }
+}
+        free(buf);
+        free(gthread);
+}
+        free(prim_loc);
+}
+
+static void _hess_pair(int (*intor)(), int (*intor_ab)(), double *hess,
+                       double *dm, size_t ld, int ish, int jsh,
+                       int *shls_slice, int *ao_loc,
+                       CINTOpt *opt, CINTOpt *opt_ab,
+                       int *atm, int natm, int *bas, int nbas, double *env,
+                       double *buf, double *cache)
+{
+        const int i0 = ao_loc[ish] - ao_loc[shls_slice[0]];
+        const int j0 = ao_loc[jsh] - ao_loc[shls_slice[2]];
+        const int di = ao_loc[ish+1] - ao_loc[ish];
+        const int dj = ao_loc[jsh+1] - ao_loc[jsh];
+        const size_t ia = bas(ATOM_OF,ish);
+        const size_t ja = bas(ATOM_OF,jsh);
+        const size_t n3 = (size_t)natm * 3;
+        double *pg = dm + i0 * ld + j0;
+        double s[9];
+        int shls[2];
+        int x, y;
+
+        // no contribution from the pairs on the same atom (invariance)
+        if (intor_ab == NULL && ia == ja) {
+                return;
+        }
+
+        // second bra derivative <d d a|op|b>, atom of shell i
+        shls[0] = ish;
+        shls[1] = jsh;
+        (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env, opt, cache);
+        _contract_block(s, buf, pg, ld, di, dj, 9, 0);
+
+        // translationally invariant, all blocks follow from <d d a|op|b>
+        if (intor_ab == NULL) {
+                for (x = 0; x < 3; x++) {
+                for (y = 0; y < 3; y++) {
+#pragma omp atomic
+                        hess[(ia*3+x)*n3+ia*3+y] += s[x*3+y];
+#pragma omp atomic
+                        hess[(ja*3+x)*n3+ja*3+y] += s[x*3+y];
+#pragma omp atomic
+                        hess[(ia*3+x)*n3+ja*3+y] -= s[x*3+y];
+#pragma omp atomic
+                        hess[(ja*3+x)*n3+ia*3+y] -= s[x*3+y];
+                } }
+                return;
+        }
+
+        for (x = 0; x < 9; x++) {
+#pragma omp atomic
+                hess[(ia*3+x/3)*n3+ia*3+x%3] += s[x];
+        }
+
+        // second ket derivative <a|op|d d b> = <d d b|op|a>, atom of shell j
+        shls[0] = jsh;
+        shls[1] = ish;
+        (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env, opt, cache);
+        _contract_block(s, buf, pg, ld, di, dj, 9, 1);
+        for (x = 0; x < 9; x++) {
+#pragma omp atomic
+                hess[(ja*3+x/3)*n3+ja*3+x%3] += s[x];
+        }
+
+        // mixed derivative <d_x a|op|d_y b>, both off-diagonal blocks
+        shls[0] = ish;
+        shls[1] = jsh;
+        (*intor_ab)(buf, NULL, shls, atm, natm, bas, nbas, env, opt_ab, cache);
+        _contract_block(s, buf, pg, ld, di, dj, 9, 0);
+        for (x = 0; x < 3; x++) {
+        for (y = 0; y < 3; y++) {
+#pragma omp atomic
+                hess[(ia*3+x)*n3+ja*3+y] += s[x*3+y];
+#pragma omp atomic
+                hess[(ja*3+y)*n3+ia*3+x] += s[x*3+y];
+        } }
+}
+
+/*
+ * Position Hessian hess(natm,3,natm,3) of a 2-center integral w.r.t. the
+ * centers of the basis functions, contracted with the matrix dm(naoi,naoj)
+ * (C-order):
+ *
+ *      hess[A,x,B,y] = sum_ab dm[a,b] d^2 <a|op|b> / dA_x dB_y
+ *
+ * intor evaluates the second bra derivative <d_x d_y a|op|b> (9 components,
+ * e.g., int1e_ipipnuc) and intor_ab the mixed derivative <d_x a|op|d_y b>
+ * (9 components, e.g., int1e_ipnucip). The second ket derivative is obtained
+ * from intor for the swapped shells, i.e., the operator must be symmetric.
+ *
+ * If intor_ab is NULL, the integral is translationally invariant (e.g.,
+ * overlap or kinetic energy) and all second derivatives of a pair follow
+ * from the second bra derivative, i.e., only intor is evaluated:
+ *
+ *      d^2/dA dA = d^2/dB dB = -d^2/dA dB = -d^2/dB dA = <d d a|op|b>
+ *
+ * If pairs is NULL, all shell pairs of the slice are evaluated, otherwise
+ * only pairs(npairs,2) given relative to the slice. The contributions are
+ * added atomically to hess, i.e., no copy per thread is required.
+ */
+void GTOhess_int2c(int (*intor)(), int (*intor_ab)(), double *hess,
+                   double *dm, int *pairs, int npairs,
+                   int *shls_slice, int *ao_loc,
+                   CINTOpt *opt, CINTOpt *opt_ab,
+                   int *atm, int natm, int *bas, int nbas, double *env)
+{
+        const int ish0 = shls_slice[0];
+        const int ish1 = shls_slice[1];
+        const int jsh0 = shls_slice[2];
+        const int jsh1 = shls_slice[3];
+        const int nish = ish1 - ish0;
+        const int njsh = jsh1 - jsh0;
+        const size_t naoj = ao_loc[jsh1] - ao_loc[jsh0];
+        const int dmax = GTOmax_shell_dim(ao_loc, shls_slice, 2);
+        int cache_size = GTOmax_cache_size(intor, shls_slice, 2,
+                                           atm, natm, bas, nbas, env);
+        if (intor_ab != NULL) {
+                cache_size = MAX(cache_size,
+                                 GTOmax_cache_size(intor_ab, shls_slice, 2,
+                                                   atm, natm, bas, nbas, env));
+        }
+#pragma omp parallel
+{
+        int i, j, p;
+        double *buf = malloc(sizeof(double) * (dmax*dmax*9 + cache_size));
+        double *cache = buf + dmax * dmax * 9;
+        if (pairs == NULL) {
+#pragma omp for schedule(dynamic, 4)
+                for (i = 0; i < nish; i++) {
+                for (j = 0; j < njsh; j++) {
+                        _hess_pair(intor, intor_ab, hess, dm, naoj,
+                                   i+ish0, j+jsh0, shls_slice, ao_loc,
+                                   opt, opt_ab, atm, natm, bas, nbas, env,
+                                   buf, cache);
+                } }
+        } else {
+#pragma omp for schedule(dynamic, 4)
+                for (p = 0; p < npairs; p++) {
+                        _hess_pair(intor, intor_ab, hess, dm, naoj,
+                                   pairs[p*2]+ish0, pairs[p*2+1]+jsh0,
+                                   shls_slice, ao_loc, opt, opt_ab,
+                                   atm, natm, bas, nbas, env, buf, cache);
+                }
+        }
+        free(buf);
+}
+}
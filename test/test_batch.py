@@ -0,0 +1,82 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the integrals for a batch of geometries.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper(pos: torch.Tensor) -> LibcintWrapper:
+    return get_wrapper([(1, "s"), (6, "sp"), (1, "s")], pos)
+
+
+def _positions(nbatch: int) -> torch.Tensor:
+    torch.manual_seed(0)
+    pos = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [1.2, 0.0, 2.0]])
+    return (pos + 0.2 * torch.rand(nbatch, 3, 3)).to(**DD)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc", "ipovlp"])
+@pytest.mark.parametrize("hermitian", [False, True])
+def test_values(shortname: str, hermitian: bool) -> None:
+    if hermitian and shortname.startswith("ip"):
+        pytest.skip("Derivatives are not hermitian.")
+
+    positions = _positions(4)
+    wrapper = _wrapper(positions[0])
+    res = int1e(shortname, wrapper, hermitian=hermitian, positions=positions)
+
+    for i in range(positions.shape[0]):
+        ref = int1e(shortname, _wrapper(positions[i]), hermitian=hermitian)
+        assert res.shape[1:] == ref.shape
+        assert pytest.approx(ref.numpy()) == res[i].numpy()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin"])
+def test_grad(shortname: str) -> None:
+    positions = _positions(3).requires_grad_(True)
+    wrapper = _wrapper(positions[0].detach())
+
+    # different weights for each geometry
+    res = int1e(shortname, wrapper, positions=positions)
+    weights = torch.arange(1, 4, **DD)[:, None, None]
+    (grad,) = torch.autograd.grad((weights * res).sum(), positions)
+
+    for i in range(positions.shape[0]):
+        pos = positions[i].detach().clone().requires_grad_(True)
+        ref = int1e(shortname, _wrapper(pos))
+        (grad_ref,) = torch.autograd.grad((weights[i] * ref).sum(), pos)
+        assert pytest.approx(grad_ref.numpy()) == grad[i].numpy()
+
+
+def test_shape() -> None:
+    positions = _positions(2)
+    wrapper = _wrapper(positions[0])
+
+    with pytest.raises(ValueError):
+        int1e("ovlp", wrapper, positions=positions[0])
+    with pytest.raises(ValueError):
+        int1e("ovlp", wrapper, positions=positions[:, :2])
@@ -0,0 +1,89 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the block-sparse integrals.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import BlockSparseMatrix, int1e
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    # two H2 molecules far apart
+    atoms = [(1, "sp"), (1, "s"), (1, "sp"), (1, "s")]
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, 30.0, 0.0], [0.0, 30.0, 1.4]]
+    return get_wrapper(atoms, pos, requires_grad=True)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+@pytest.mark.parametrize("hermitian", [False, True])
+def test_value(shortname: str, hermitian: bool) -> None:
+    wrapper = _wrapper()
+    ref = int1e(shortname, wrapper, hermitian=hermitian, thresh=1e-12)
+    res = int1e(
+        shortname, wrapper, hermitian=hermitian, thresh=1e-12, blocksparse=True
+    )
+
+    assert isinstance(res, BlockSparseMatrix)
+    assert res.shape == ref.shape
+    assert res.nnz < ref.numel()
+    assert pytest.approx(ref.detach().numpy()) == res.to_dense().detach()
+
+    x = torch.rand(wrapper.nao(), 3, **DD)
+    assert pytest.approx((ref @ x).detach().numpy()) == (res @ x).detach()
+
+    sp = res.to_sparse_coo().to_dense()
+    assert pytest.approx(ref.detach().numpy()) == sp.detach().numpy()
+
+
+def test_deriv_comp() -> None:
+    wrapper = _wrapper()
+    ref = int1e("ipkin", wrapper, thresh=1e-12)
+    res = int1e("ipkin", wrapper, thresh=1e-12, blocksparse=True)
+
+    assert res.shape == ref.shape
+    assert pytest.approx(ref.detach().numpy()) == res.to_dense().detach()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_grad(shortname: str) -> None:
+    wrapper = _wrapper()
+    params = wrapper.params
+    x = torch.rand(wrapper.nao(), wrapper.nao(), **DD)
+
+    ref = int1e(shortname, wrapper, hermitian=True, thresh=1e-12)
+    res = int1e(
+        shortname, wrapper, hermitian=True, thresh=1e-12, blocksparse=True
+    )
+
+    gref = torch.autograd.grad((ref * x).sum(), params)
+    gres = torch.autograd.grad((res.to_dense() * x).sum(), params)
+    for g1, g2 in zip(gref, gres):
+        assert pytest.approx(g1.numpy()) == g2.numpy()
+
+
+def test_fail() -> None:
+    wrapper = _wrapper()
+    with pytest.raises(ValueError):
+        int1e("ovlp", wrapper, blocksparse=True, out=torch.empty(0, **DD))
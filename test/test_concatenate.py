@@ -0,0 +1,117 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the concatenation of wrappers and the block-diagonal integrals.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e
+from tad_libcint.interface.wrapper import LibcintWrapper, SubsetLibcintWrapper
+
+from .utils import get_wrapper
+
+
+def _wrappers(requires_grad: bool = False) -> list[LibcintWrapper]:
+    pos1 = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]]
+    pos2 = [[0.0, 0.1, 0.0], [0.0, 0.0, 2.0]]
+    return [
+        get_wrapper([(1, "s"), (1, "s")], pos1, requires_grad=requires_grad),
+        get_wrapper([(6, "sp"), (1, "s")], pos2, requires_grad=requires_grad),
+    ]
+
+
+def test_concatenate() -> None:
+    w1, w2 = _wrappers()
+    c1, c2 = LibcintWrapper.concatenate(w1, w2)
+
+    assert isinstance(c1, SubsetLibcintWrapper)
+    assert c1.parent is c2.parent
+    assert c1.nao() == w1.nao()
+    assert c2.nao() == w2.nao()
+
+    parent = c1.parent
+    assert parent.nao() == w1.nao() + w2.nao()
+    assert parent.fragments is not None
+    assert parent.fragments[0].tolist() == [0, len(w1), len(w1) + len(w2)]
+    assert parent.fragments[1].tolist() == [0, 2, 4]
+
+    n1 = w1.nao()
+    ref = int1e("ovlp", parent).numpy()
+    assert pytest.approx(ref[:n1, :n1]) == int1e("ovlp", c1).numpy()
+    assert pytest.approx(ref[n1:, n1:]) == int1e("ovlp", c2).numpy()
+    assert pytest.approx(ref[:n1, n1:]) == int1e("ovlp", c1, c2).numpy()
+
+    # subsets of the same parent are stored once
+    d1, d2 = LibcintWrapper.concatenate(w1, w1[1:])
+    assert d1.parent.nao() == w1.nao()
+    assert d2.nao() == w1[1:].nao()
+
+
+def test_subset_grad() -> None:
+    w1, w2 = _wrappers(requires_grad=True)
+    c1, c2 = LibcintWrapper.concatenate(w1, w2)
+    leaves = [b.alphas for ab in w2.atombases for b in ab.bases]
+
+    grads = torch.autograd.grad(int1e("kin", c2).pow(2).sum(), leaves)
+    grads_ref = torch.autograd.grad(int1e("kin", w2).pow(2).sum(), leaves)
+    for g, g_ref in zip(grads, grads_ref):
+        assert pytest.approx(g_ref.numpy()) == g.numpy()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_blockdiag(shortname: str) -> None:
+    ws = _wrappers()
+    parent = LibcintWrapper.concatenate(*ws)[0].parent
+    res = int1e(shortname, parent, blockdiag=True)
+
+    n1 = ws[0].nao()
+    assert (res[:n1, n1:] == 0).all()
+    assert (res[n1:, :n1] == 0).all()
+
+    # the fragments are independent systems
+    ref1 = int1e(shortname, ws[0])
+    ref2 = int1e(shortname, ws[1])
+    assert pytest.approx(ref1.numpy()) == res[:n1, :n1].numpy()
+    assert pytest.approx(ref2.numpy()) == res[n1:, n1:].numpy()
+
+
+def test_blockdiag_grad() -> None:
+    ws = _wrappers(requires_grad=True)
+    parent = LibcintWrapper.concatenate(*ws)[0].parent
+
+    leaves = [ab.pos for w in ws for ab in w.atombases]
+    leaves += [b.coeffs for w in ws for ab in w.atombases for b in ab.bases]
+    leaves += [b.alphas for w in ws for ab in w.atombases for b in ab.bases]
+
+    res = int1e("kin", parent, blockdiag=True)
+    grads = torch.autograd.grad(res.pow(2).sum(), leaves)
+
+    ref = sum(int1e("kin", w).pow(2).sum() for w in ws)
+    grads_ref = torch.autograd.grad(ref, leaves)
+
+    for g, g_ref in zip(grads, grads_ref):
+        assert pytest.approx(g_ref.numpy()) == g.numpy()
+
+
+def test_blockdiag_requires_fragments() -> None:
+    w1, _ = _wrappers()
+    with pytest.raises(ValueError):
+        int1e("ovlp", w1, blockdiag=True)
@@ -0,0 +1,80 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the condensed block norms of the integrals.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import block_norms, int1e, int1e_norms
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    atoms = [(6, "sp"), (1, "s"), (1, "sp")]
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, 2.0, 0.0]]
+    return get_wrapper(atoms, pos)
+
+
+def _reference(mat: torch.Tensor, loc: list[int], norm: str) -> torch.Tensor:
+    n = len(loc) - 1
+    ref = torch.zeros(n, n, **DD)
+    for i in range(n):
+        for j in range(n):
+            block = mat[..., loc[i] : loc[i + 1], loc[j] : loc[j + 1]]
+            if norm == "max":
+                ref[i, j] = block.abs().max()
+            else:
+                ref[i, j] = block.pow(2).sum().sqrt()
+    return ref
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "ipkin"])
+@pytest.mark.parametrize("level", ["shell", "atom"])
+@pytest.mark.parametrize("norm", ["max", "fro"])
+def test_norms(shortname: str, level: str, norm: str) -> None:
+    wrapper = _wrapper()
+    mat = int1e(shortname, wrapper).detach()
+
+    if level == "shell":
+        loc = wrapper.full_shell_to_aoloc.tolist()
+    else:
+        loc = [0, 4, 5, 9]
+    ref = _reference(mat, loc, norm)
+
+    res = int1e_norms(shortname, wrapper, level=level, norm=norm)
+    assert pytest.approx(ref.numpy(), abs=1e-14) == res.numpy()
+
+    res = block_norms(mat, wrapper, level=level, norm=norm)
+    assert pytest.approx(ref.numpy(), abs=1e-14) == res.numpy()
+
+
+def test_fail() -> None:
+    wrapper = _wrapper()
+    mat = int1e("ovlp", wrapper)
+
+    with pytest.raises(ValueError):
+        block_norms(mat, wrapper, level="molecule")
+    with pytest.raises(ValueError):
+        block_norms(mat, wrapper, norm="l1")
+    with pytest.raises(ValueError):
+        block_norms(mat[:-1], wrapper)
@@ -0,0 +1,77 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the contracted position Hessians of the 1-electron integrals.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e, int1e_hessian
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    atoms = [(1, "s"), (6, "spd"), (8, "sp")]
+    pos = torch.tensor(
+        [[0.0, 0.0, 0.0], [0.1, 0.3, 1.4], [1.2, -0.4, 0.5]], **DD
+    ).requires_grad_(True)
+    return get_wrapper(atoms, pos)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_hessian(shortname: str) -> None:
+    wrapper = _wrapper()
+    pos = wrapper.params[2]
+    mat = torch.rand(wrapper.nao(), wrapper.nao(), **DD)
+
+    # reference from the double backward
+    (grad,) = torch.autograd.grad(
+        (mat * int1e(shortname, wrapper)).sum(), pos, create_graph=True
+    )
+    rows = [
+        torch.autograd.grad(g, pos, retain_graph=True)[0]
+        for g in grad.flatten()
+    ]
+    ref = torch.stack(rows).reshape(*pos.shape, *pos.shape)
+
+    res = int1e_hessian(shortname, mat, wrapper)
+    assert res.shape == (3, 3, 3, 3)
+    assert pytest.approx(ref.detach().numpy(), abs=1e-10) == res.numpy()
+
+    # screening with a threshold below all overlaps
+    res = int1e_hessian(shortname, mat, wrapper, thresh=1e-30)
+    assert pytest.approx(ref.detach().numpy(), abs=1e-10) == res.numpy()
+
+
+def test_fail() -> None:
+    wrapper = _wrapper()
+    mat = torch.rand(wrapper.nao(), wrapper.nao(), **DD)
+
+    # vector operator and derivative integral
+    with pytest.raises(ValueError):
+        int1e_hessian("r0", mat, wrapper)
+
+    with pytest.raises(ValueError):
+        int1e_hessian("ipovlp", mat, wrapper)
+
+    with pytest.raises(ValueError):
+        int1e_hessian("ovlp", mat[:-1], wrapper)
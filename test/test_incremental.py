@@ -0,0 +1,75 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the incremental recomputation of the integrals for moved atoms.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [1.5, 0.0, 0.0], [1.5, 0.0, 1.4]]
+    return get_wrapper([(1, "sp")] * 4, pos)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin"])
+@pytest.mark.parametrize("hermitian", [True, False])
+def test_incremental(shortname: str, hermitian: bool) -> None:
+    wrapper = _wrapper()
+    kw = {"hermitian": hermitian}
+
+    res0 = int1e(shortname, wrapper, incremental=True, **kw)
+    ref0 = int1e(shortname, wrapper, **kw)
+    assert pytest.approx(ref0.detach().numpy(), abs=1e-14) == res0.detach()
+
+    # move only one atom
+    pos = wrapper.params[2].detach().clone()
+    pos[2, 1] += 0.3
+    pos.requires_grad_(True)
+    wrapper.update_positions(pos)
+
+    res = int1e(shortname, wrapper, incremental=True, **kw)
+    ref = int1e(shortname, wrapper, **kw)
+    assert pytest.approx(ref.detach().numpy(), abs=1e-14) == res.detach()
+
+    # the returned tensor is not the cache
+    res.detach().zero_()
+    res = int1e(shortname, wrapper, incremental=True, **kw)
+    assert pytest.approx(ref.detach().numpy(), abs=1e-14) == res.detach()
+
+    (gref,) = torch.autograd.grad(ref.sum(), pos)
+    (gres,) = torch.autograd.grad(res.sum(), pos)
+    assert pytest.approx(gref.numpy(), abs=1e-12) == gres.numpy()
+
+
+def test_fail() -> None:
+    wrapper = _wrapper()
+
+    # the nuclear attraction depends on all atoms
+    with pytest.raises(ValueError):
+        int1e("nuc", wrapper, incremental=True)
+
+    with pytest.raises(ValueError):
+        int1e("ovlp", wrapper, thresh=1e-10, incremental=True)
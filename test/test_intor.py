@@ -0,0 +1,175 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the direct interface to libcint.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis, CGTOBasis
+from tad_libcint.interface.intor import Intor
+from tad_libcint.interface.namemanager import get_namemgr
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.3, 1.4]]
+    return get_wrapper([(1, "s"), (6, "spd")], pos, contracted=False)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_corder(shortname: str) -> None:
+    wrapper = _wrapper()
+    nmgr = get_namemgr("int1e", shortname)
+
+    full = Intor(nmgr, [wrapper, wrapper]).calc()
+    herm = Intor(nmgr, [wrapper, wrapper], hermitian=True).calc()
+
+    assert full.is_contiguous()
+    assert full.shape == (wrapper.nao(), wrapper.nao())
+    assert pytest.approx(full.numpy()) == full.mT.numpy()
+    assert pytest.approx(full.numpy()) == herm.numpy()
+
+
+def test_corder_deriv() -> None:
+    wrapper = _wrapper()
+    nao = wrapper.nao()
+
+    # <nabla i|j> = -<i|nabla j> for the overlap
+    ip = Intor(get_namemgr("int1e", "ipovlp"), [wrapper, wrapper]).calc()
+    assert ip.is_contiguous()
+    assert ip.shape == (3, nao, nao)
+    assert pytest.approx(ip.numpy()) == -ip.mT.numpy()
+
+
+@pytest.mark.parametrize("hermitian", [False, True])
+def test_pairs(hermitian: bool) -> None:
+    wrapper = _wrapper()
+    nmgr = get_namemgr("int1e", "kin")
+    intor = Intor(nmgr, [wrapper, wrapper], hermitian=hermitian)
+    full = intor.calc().numpy()
+
+    # subset of the lower triangle of the shell pairs
+    pairs = np.array([[0, 0], [1, 1], [2, 0], [2, 1], [2, 2], [3, 3]])
+    dense = intor.calc_pairs(pairs).numpy()
+
+    ao_loc = wrapper.full_shell_to_aoloc
+    ref = np.zeros_like(full)
+    for ish, jsh in pairs:
+        i = slice(ao_loc[ish], ao_loc[ish + 1])
+        j = slice(ao_loc[jsh], ao_loc[jsh + 1])
+        ref[i, j] = full[i, j]
+        if hermitian:
+            ref[j, i] = full[j, i]
+    assert pytest.approx(ref) == dense
+
+    # compact blocks
+    block_loc = intor.pair_block_loc(pairs)
+    compact = intor.calc_pairs(pairs, compact=True).numpy()
+    assert compact.shape == (block_loc[-1],)
+    for p, (ish, jsh) in enumerate(pairs):
+        i = slice(ao_loc[ish], ao_loc[ish + 1])
+        j = slice(ao_loc[jsh], ao_loc[jsh + 1])
+        block = compact[block_loc[p] : block_loc[p + 1]]
+        assert pytest.approx(full[i, j]) == block.reshape(full[i, j].shape)
+
+    with pytest.raises(ValueError):
+        intor.calc_pairs(np.array([[0, 4]]))
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "nuc"])
+def test_calc_grad(shortname: str) -> None:
+    wrapper = _wrapper()
+    nao = wrapper.nao()
+    grad_out = torch.rand(nao, nao, dtype=torch.double)
+
+    # the ket derivative <i|op|nabla j> is obtained from <nabla j|op|i>
+    intor = Intor(get_namemgr("int1e", f"ip{shortname}"), [wrapper, wrapper])
+    ip = intor.calc().numpy()
+
+    ao2atom = wrapper.ao_to_atom().numpy()
+    g = grad_out.numpy()
+    ref = np.zeros((2, 3))
+    np.add.at(ref, ao2atom, -np.einsum("ab,dab->ad", g, ip))
+    np.add.at(ref, ao2atom, -np.einsum("ab,dba->bd", g, ip))
+
+    res = intor.calc_grad(intor, True, grad_out)
+    assert pytest.approx(ref) == res
+
+    # subset of the shell pairs
+    pairs = np.array([[0, 0], [2, 1], [3, 0]], dtype=np.int32)
+    ao_loc = wrapper.full_shell_to_aoloc
+    masked = np.zeros_like(g)
+    for ish, jsh in pairs:
+        i = slice(ao_loc[ish], ao_loc[ish + 1])
+        j = slice(ao_loc[jsh], ao_loc[jsh + 1])
+        masked[i, j] = g[i, j]
+    full = intor.calc_grad(intor, True, torch.from_numpy(masked))
+    res = intor.calc_grad(intor, True, grad_out, pairs)
+    assert pytest.approx(full) == res
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "nuc"])
+def test_calc_prim_grad(shortname: str) -> None:
+    dd = {"dtype": torch.double}
+    s = CGTOBasis(
+        0,
+        torch.tensor([3.0, 1.0, 0.2], **dd),
+        torch.tensor([0.2, 0.5, 0.4], **dd),
+    )
+    p = CGTOBasis(
+        1, torch.tensor([0.9, 0.3], **dd), torch.tensor([0.6, 0.5], **dd)
+    )
+    wrapper = LibcintWrapper(
+        [
+            AtomCGTOBasis(1, [s], torch.tensor([0.0, 0.0, 0.0], **dd)),
+            AtomCGTOBasis(6, [s, p], torch.tensor([0.0, 0.3, 1.4], **dd)),
+        ]
+    )
+    nmgr = get_namemgr("int1e", shortname)
+    grad_out = torch.rand(wrapper.nao(), wrapper.nao(), **dd)
+
+    # reference from the uncontracted integrals
+    u_wrapper, uao2ao = wrapper.get_uncontracted_wrapper()
+    u = Intor(nmgr, [u_wrapper, u_wrapper]).calc().numpy()
+    u_grad_out = grad_out[uao2ao][:, uao2ao].numpy()
+    ao2shl = u_wrapper.ao_to_shell().numpy()
+
+    ref = np.zeros(wrapper.params[0].shape[0])
+    np.add.at(ref, ao2shl, (u_grad_out * u).sum(axis=1))
+    np.add.at(ref, ao2shl, (u_grad_out * u).sum(axis=0))
+
+    intor = Intor(nmgr, [wrapper, wrapper])
+    res, deriv = intor.calc_prim_grad(grad_out)
+    assert deriv is None
+    assert pytest.approx(ref) == res
+
+    # the derivative contributions in the same pass, here with the integral
+    # itself as "derivative", i.e., the same result
+    res, deriv = intor.calc_prim_grad(grad_out, bra=intor, ket=intor)
+    assert pytest.approx(ref) == res
+    assert pytest.approx(ref) == deriv
+
+    res, deriv = intor.calc_prim_grad(grad_out, value=False, bra=intor)
+    assert res is None
+    assert pytest.approx(ref) == deriv
@@ -0,0 +1,136 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the spatial index for the shell pairs.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from tad_libcint.api import CGTO
+from tad_libcint.interface import overlap
+from tad_libcint.interface.neighbors import CellList
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_atombases, get_wrapper
+
+
+@pytest.mark.parametrize("n", [1, 2, 50, 300])
+def test_cell_list(n: int) -> None:
+    rng = np.random.default_rng(n)
+    centres = rng.random((n, 3)) * 20.0
+    extents = rng.random(n) * 2.0
+
+    pairs = CellList(centres, extents).pairs()
+
+    # brute force
+    dist = np.linalg.norm(centres[:, None] - centres[None], axis=-1)
+    mask = np.tril(dist <= extents[:, None] + extents[None])
+    assert (pairs == np.argwhere(mask)).all()
+
+
+def _wrapper() -> LibcintWrapper:
+    atoms = [(1, "s"), (6, "sp"), (1, "s")]
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, 40.0, 0.0]]
+    return get_wrapper(atoms, pos, contracted=False)
+
+
+def test_wrapper() -> None:
+    wrapper = _wrapper()
+    pairs = wrapper.get_shell_pairs(1e-12)
+    assert wrapper.get_shell_pairs(1e-12) is pairs
+    # the distant atom only pairs with itself
+    ref = [[0, 0], [1, 0], [1, 1], [2, 0], [2, 1], [2, 2], [3, 3]]
+    assert pairs.tolist() == ref
+
+    # recomputed after the geometry changed
+    pos = wrapper.params[2].clone()
+    pos[2, 1] = 2.0
+    wrapper.update_positions(pos)
+    assert len(wrapper.get_shell_pairs(1e-12)) == 10
+
+
+def test_skin() -> None:
+    wrapper = _wrapper()
+    wrapper.set_pair_skin(1.0)
+    pairs = wrapper.get_shell_pairs(1e-12)
+
+    # reused as long as no atom moved by more than half of the skin
+    pos = wrapper.params[2].clone()
+    pos[0, 0] = 0.3
+    wrapper.update_positions(pos)
+    assert wrapper.get_shell_pairs(1e-12) is pairs
+
+    pos = pos.clone()
+    pos[0, 0] = 0.6
+    wrapper.update_positions(pos)
+    assert wrapper.get_shell_pairs(1e-12) is not pairs
+
+    # the integrals use the Verlet list
+    ref = overlap(wrapper).numpy()
+    assert pytest.approx(ref) == overlap(wrapper, thresh=1e-12).numpy()
+
+    with pytest.raises(ValueError):
+        wrapper.set_pair_skin(-1.0)
+
+
+@pytest.mark.parametrize("thresh", [1e-6, 1e-8, 1e-12])
+def test_candidates(thresh: float) -> None:
+    # diffuse and tight shells, for which the estimate of the pair is far
+    # larger than the product of the single shells
+    diffuse = {"s": ([0.1], [1.0]), "p": ([0.05], [1.0])}
+    tight = {"s": ([1000.0], [1.0]), "p": ([50.0], [1.0])}
+    dists = np.arange(4.0, 30.0, 0.5)
+
+    atombases = []
+    for i, d in enumerate(dists):
+        pos = [[0.0, 50.0 * i, 0.0], [0.0, 50.0 * i, d]]
+        atombases += get_atombases([(1, "sp")], pos[:1], shells=diffuse)
+        atombases += get_atombases([(1, "sp")], pos[1:], shells=tight)
+    wrapper = LibcintWrapper(atombases)
+
+    # reference from the estimate over the full rectangle of shell pairs
+    atm, bas, env = wrapper.atm_bas_env
+    nbas = bas.shape[0]
+    cond = np.empty((nbas, nbas), dtype=np.float64)
+    shls_slice = np.array([0, nbas, 0, nbas], dtype=np.int32)
+    CGTO.GTOoverlap_cond(
+        cond.ctypes.data,
+        shls_slice.ctypes.data,
+        atm.ctypes.data,
+        atm.shape[0],
+        bas.ctypes.data,
+        nbas,
+        env.ctypes.data,
+    )
+    ref = np.argwhere(np.tril(cond < -np.log(thresh)))
+
+    # all pairs of the estimate are candidates
+    cand = {tuple(p) for p in wrapper.get_shell_pairs(thresh).tolist()}
+    assert {tuple(p) for p in ref.tolist()} <= cand
+
+    # hence, the screening keeps the same blocks as the full estimate
+    ao_loc = wrapper.full_shell_to_aoloc
+    mask = np.zeros((wrapper.nao(), wrapper.nao()), dtype=bool)
+    for i, j in ref:
+        mask[ao_loc[i] : ao_loc[i + 1], ao_loc[j] : ao_loc[j + 1]] = True
+        mask[ao_loc[j] : ao_loc[j + 1], ao_loc[i] : ao_loc[i + 1]] = True
+    dense = overlap(wrapper).numpy()
+    res = overlap(wrapper, thresh=thresh).numpy()
+    assert pytest.approx(np.where(mask, dense, 0.0), abs=1e-300) == res
@@ -0,0 +1,83 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the cache of the libcint optimizers.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from tad_libcint.interface import intor
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_wrapper
+
+
+def _wrapper() -> LibcintWrapper:
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]]
+    return get_wrapper([(1, "s"), (1, "s")], pos, contracted=False)
+
+
+@pytest.fixture(name="created")
+def fixture_created(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    created: list[str] = []
+
+    def fake_optimizer(opname, *_):
+        created.append(opname)
+        return object()
+
+    monkeypatch.setattr(intor, "_get_intgl_optimizer", fake_optimizer)
+    return created
+
+
+def test_reuse(created: list[str]) -> None:
+    cache = intor.OptimizerCache(maxsize=4)
+    wrapper = _wrapper()
+
+    opt = cache.get("int1e_ovlp_sph", wrapper)
+    assert cache.get("int1e_ovlp_sph", wrapper) is opt
+    assert cache.get("int1e_kin_sph", wrapper) is not opt
+    assert created == ["int1e_ovlp_sph", "int1e_kin_sph"]
+    assert len(cache) == 2
+
+
+def test_invalidation(created: list[str]) -> None:
+    cache = intor.OptimizerCache(maxsize=4)
+    wrapper = _wrapper()
+
+    opt = cache.get("int1e_ovlp_sph", wrapper)
+    wrapper.update_positions(wrapper.params[2] + 0.1)
+    assert cache.get("int1e_ovlp_sph", wrapper) is not opt
+    assert len(created) == 2
+    assert len(cache) == 1
+
+
+def test_lru(created: list[str]) -> None:
+    cache = intor.OptimizerCache(maxsize=2)
+    wrapper = _wrapper()
+
+    cache.get("a", wrapper)
+    cache.get("b", wrapper)
+    cache.get("a", wrapper)  # "b" is now the least recently used
+    cache.get("c", wrapper)
+    assert len(cache) == 2
+
+    cache.get("a", wrapper)
+    assert created == ["a", "b", "c"]
+    cache.get("b", wrapper)
+    assert created == ["a", "b", "c", "b"]
@@ -0,0 +1,85 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the padded integrals of a batch of molecules.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis
+from tad_libcint.interface import BatchedLibcintWrapper, int1e
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_atombases
+
+
+def _molecules(requires_grad: bool = False) -> list[list[AtomCGTOBasis]]:
+    kw = {"requires_grad": requires_grad}
+    pos1 = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, 0.0, 0.0]]
+    pos2 = [[0.0, 0.1, 0.0], [0.0, 0.0, 2.0], [1.9, 0.0, -0.5]]
+    return [
+        get_atombases([(1, "s"), (1, "s"), (0, "")], pos1, **kw),
+        get_atombases([(6, "sp"), (1, "s"), (1, "s")], pos2, **kw),
+    ]
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc", "ipovlp"])
+@pytest.mark.parametrize("hermitian", [False, True])
+def test_values(shortname: str, hermitian: bool) -> None:
+    if hermitian and shortname.startswith("ip"):
+        pytest.skip("Derivatives are not hermitian.")
+
+    mols = _molecules()
+    batch = BatchedLibcintWrapper(mols)
+    res = int1e(shortname, batch, hermitian=hermitian)
+
+    assert batch.nmol == 2
+    assert batch.natoms == 5
+    assert res.shape[0] == 2
+    assert res.shape[-2:] == (batch.nao(), batch.nao())
+
+    for i, mol in enumerate(mols):
+        wrapper = LibcintWrapper([ab for ab in mol if len(ab.bases) > 0])
+        ref = int1e(shortname, wrapper, hermitian=hermitian)
+        nao = wrapper.nao()
+
+        # the nuclear attraction only includes the atoms of the molecule
+        assert pytest.approx(ref.numpy()) == res[i, ..., :nao, :nao].numpy()
+        assert (res[i, ..., nao:, :] == 0).all()
+        assert (res[i, ..., :, nao:] == 0).all()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin"])
+def test_grad(shortname: str) -> None:
+    mols = _molecules(requires_grad=True)
+    batch = BatchedLibcintWrapper(mols)
+    res = int1e(shortname, batch)
+
+    leaves = [ab.pos for ab in mols[1]]
+    leaves += [b.alphas for ab in mols[1] for b in ab.bases]
+    leaves += [b.coeffs for ab in mols[1] for b in ab.bases]
+    grads = torch.autograd.grad(res.pow(2).sum(), leaves)
+
+    wrapper = LibcintWrapper(mols[1])
+    ref = int1e(shortname, wrapper)
+    grads_ref = torch.autograd.grad(ref.pow(2).sum(), leaves)
+
+    for g, g_ref in zip(grads, grads_ref):
+        assert pytest.approx(g_ref.numpy()) == g.numpy()
@@ -0,0 +1,144 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the integral plans.
+"""
+
+from __future__ import annotations
+
+import gc
+import weakref
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e
+from tad_libcint.interface import plan as plan_module
+from tad_libcint.interface.namemanager import get_namemgr
+from tad_libcint.interface.plan import get_plan
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper(requires_grad: bool = False) -> LibcintWrapper:
+    pos = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]], **DD)
+    pos.requires_grad_(requires_grad)
+    return get_wrapper([(1, "s"), (6, "sp")], pos, contracted=False)
+
+
+def test_cached() -> None:
+    wrapper = _wrapper()
+    nmgr = get_namemgr("int1e", "ovlp")
+    assert get_namemgr("int1e", "ovlp") is nmgr
+
+    plan = get_plan(nmgr, [wrapper, wrapper], hermitian=True)
+    assert get_plan(nmgr, [wrapper, wrapper], hermitian=True) is plan
+    assert get_plan(nmgr, [wrapper, wrapper]) is not plan
+
+    assert plan.outshape == (wrapper.nao(), wrapper.nao())
+
+
+def test_deriv_recipes() -> None:
+    wrapper = _wrapper()
+    plan = get_plan(get_namemgr("int1e", "kin"), [wrapper, wrapper])
+
+    recipes = plan.get_deriv_recipes("ip")
+    assert plan.get_deriv_recipes("ip") is recipes
+    assert len(recipes) == 2
+
+    # bra derivative is available in libcint, the ket derivative is obtained
+    # by transposing the bra derivative
+    assert recipes[0].direct
+    assert recipes[0].namemgr.shortname == "ipkin"
+    assert recipes[0].plan is not None
+    assert recipes[0].plan.outshape == (3, wrapper.nao(), wrapper.nao())
+
+    assert not recipes[1].direct
+    assert recipes[1].namemgr.shortname == "kinip"
+    assert recipes[1].source == 0
+
+    # translationally invariant, the ket derivative is the negative bra one
+    assert recipes[1].negate
+    assert recipes[1].transpose_path is None
+
+
+def test_cache_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(plan_module, "PLAN_CACHE_SIZE", 2)
+    wrapper = _wrapper()
+    nmgr = get_namemgr("int1e", "ovlp")
+
+    # every subset is a new wrapper object, which the cache must not keep
+    # alive indefinitely
+    others = [wrapper[0:2] for _ in range(3)]
+    refs = [weakref.ref(other) for other in others]
+    plans = [get_plan(nmgr, [wrapper, other]) for other in others]
+    assert len(wrapper._plans) == 2
+
+    # the least recently used plan is dropped
+    assert get_plan(nmgr, [wrapper, others[2]]) is plans[2]
+    del others, plans
+    gc.collect()
+    assert [ref() is None for ref in refs] == [True, False, False]
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc", "r0"])
+def test_translation_invariant(shortname: str) -> None:
+    wrapper = _wrapper(requires_grad=True)
+    plan = get_plan(get_namemgr("int1e", shortname), [wrapper, wrapper])
+    invariant = shortname in ("ovlp", "kin")
+    assert plan.int_nmgr.translation_invariant is invariant
+    assert plan.get_deriv_recipes("ip")[1].negate is invariant
+
+    # the position gradient only contains the derivatives w.r.t. the basis
+    # centres, but a finite difference also moves the nuclei of "nuc"
+    if shortname == "nuc":
+        return
+
+    # finite difference of the position gradient
+    pos = wrapper.params[2]
+    weight = torch.rand(plan.outshape, dtype=torch.double)
+    loss = (weight * int1e(shortname, wrapper)).sum()
+    (grad,) = torch.autograd.grad(loss, pos)
+
+    step = 1e-5
+    delta = torch.zeros_like(pos)
+    delta[1, 2] = step
+    with wrapper.at_positions(pos.detach() + delta):
+        fp = (weight * int1e(shortname, wrapper)).sum()
+    with wrapper.at_positions(pos.detach() - delta):
+        fm = (weight * int1e(shortname, wrapper)).sum()
+    ref = (fp - fm) / (2 * step)
+    assert pytest.approx(ref.item(), abs=1e-7) == grad[1, 2].item()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "nuc"])
+def test_prim_grads(shortname: str) -> None:
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]]
+    wrapper = get_wrapper([(1, "s"), (6, "sp")], pos, requires_grad=True)
+    coeffs, alphas, _ = wrapper.params
+
+    weight = torch.rand(wrapper.nao(), wrapper.nao(), dtype=torch.double)
+    loss = (weight * int1e(shortname, wrapper)).sum()
+
+    # without a graph of the gradient, the primitive gradient driver is used,
+    # otherwise the gradients are obtained from the uncontracted integrals
+    grads = torch.autograd.grad(loss, (coeffs, alphas), retain_graph=True)
+    refs = torch.autograd.grad(loss, (coeffs, alphas), create_graph=True)
+
+    for grad, ref in zip(grads, refs):
+        assert pytest.approx(ref.detach().numpy()) == grad.numpy()
@@ -0,0 +1,132 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the overlap-based screening of the shell pairs.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import int1e, overlap
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper(dist: float = 30.0) -> LibcintWrapper:
+    # two H2 molecules far apart
+    atoms = [(1, "sp"), (1, "s"), (1, "sp"), (1, "s")]
+    pos = torch.tensor(
+        [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4], [0.0, dist, 0.0], [0.0, dist, 1.4]],
+        **DD,
+    ).requires_grad_(True)
+    return get_wrapper(atoms, pos)
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_screened(shortname: str) -> None:
+    wrapper = _wrapper()
+    n = wrapper.nao() // 2
+
+    ref = int1e(shortname, wrapper, hermitian=True)
+    res = int1e(shortname, wrapper, hermitian=True, thresh=1e-12)
+
+    # the blocks between the molecules are skipped
+    assert (res[:n, n:] == 0).all()
+    assert (res[n:, :n] == 0).all()
+    assert pytest.approx(ref.detach().numpy(), abs=1e-12) == res.detach()
+
+    # gradient skips the same pairs
+    pos = wrapper.params[2]
+    (gref,) = torch.autograd.grad(ref.sum(), pos)
+    (gres,) = torch.autograd.grad(res.sum(), pos)
+    assert pytest.approx(gref.numpy(), abs=1e-10) == gres.numpy()
+
+
+def test_geometry_update() -> None:
+    wrapper = _wrapper()
+    n = wrapper.nao() // 2
+    assert (overlap(wrapper, thresh=1e-12)[:n, n:] == 0).all()
+
+    # the screened pairs are recomputed for the new geometry
+    pos = wrapper.params[2].detach().clone()
+    pos[2:, 1] = 1.0
+    wrapper.update_positions(pos)
+
+    ref = overlap(wrapper)
+    res = overlap(wrapper, thresh=1e-12)
+    assert (res[:n, n:] != 0).any()
+    assert pytest.approx(ref.detach().numpy()) == res.detach().numpy()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin", "nuc"])
+def test_sparse_backward(shortname: str) -> None:
+    wrapper = _wrapper(dist=3.0)
+    n = wrapper.nao() // 2
+    pos = wrapper.params[2]
+
+    # the loss only depends on the first molecule
+    weight = torch.zeros(wrapper.nao(), wrapper.nao(), **DD)
+    weight[:n, :n] = torch.rand(n, n, **DD)
+
+    ref = int1e(shortname, wrapper)
+    res = int1e(shortname, wrapper, grad_thresh=1e-10)
+    assert pytest.approx(ref.detach().numpy()) == res.detach().numpy()
+
+    (gref,) = torch.autograd.grad((weight * ref).sum(), pos)
+    (gres,) = torch.autograd.grad((weight * res).sum(), pos)
+    assert pytest.approx(gref.numpy(), abs=1e-12) == gres.numpy()
+
+
+@pytest.mark.parametrize("shortname", ["ovlp", "kin"])
+def test_active_atoms(shortname: str) -> None:
+    wrapper = _wrapper(dist=3.0)
+    pos = wrapper.params[2]
+    weight = torch.rand(wrapper.nao(), wrapper.nao(), **DD)
+
+    ref = int1e(shortname, wrapper)
+    (gref,) = torch.autograd.grad((weight * ref).sum(), pos)
+    gref[[1, 3]] = 0.0
+
+    # indices and boolean masks are equivalent
+    wrapper.set_active_atoms(torch.tensor([0, 2]))
+    mask = wrapper.active_atoms
+    wrapper.set_active_atoms(torch.tensor([True, False, True, False]))
+    assert mask is not None and wrapper.active_atoms is not None
+    assert mask.tolist() == wrapper.active_atoms.tolist()
+
+    res = int1e(shortname, wrapper)
+    (gres,) = torch.autograd.grad((weight * res).sum(), pos)
+    assert pytest.approx(gref.numpy(), abs=1e-12) == gres.numpy()
+
+    # combined with the gradient threshold
+    res = int1e(shortname, wrapper, grad_thresh=1e-10)
+    (gres,) = torch.autograd.grad((weight * res).sum(), pos)
+    assert pytest.approx(gref.numpy(), abs=1e-12) == gres.numpy()
+
+    with pytest.raises(ValueError):
+        wrapper.set_active_atoms(torch.tensor([True, False]))
+
+
+def test_fail() -> None:
+    wrapper = _wrapper()
+    with pytest.raises(ValueError):
+        overlap(wrapper, thresh=0.0)
+    with pytest.raises(ValueError):
+        overlap(wrapper, grad_thresh=-1.0)
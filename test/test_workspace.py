@@ -0,0 +1,103 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the output buffers and the workspace pool.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.interface import WorkspacePool, int1e
+from tad_libcint.interface.integrals import overlap
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import DD, get_wrapper
+
+
+def _wrapper(requires_grad: bool = False) -> LibcintWrapper:
+    pos = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]], **DD)
+    pos.requires_grad_(requires_grad)
+    return get_wrapper([(1, "s"), (6, "sp")], pos, contracted=False)
+
+
+def test_pool() -> None:
+    pool = WorkspacePool()
+    a = pool.get((2, 3))
+    assert len(pool) == 0
+
+    pool.release(a)
+    assert len(pool) == 1
+    with pytest.raises(ValueError):
+        pool.release(a)
+
+    # same kind is reused (as a detached view), other kinds are allocated
+    assert pool.get((2, 3)).data_ptr() == a.data_ptr()
+    assert pool.get((2, 3), dtype=torch.float32).dtype == torch.float32
+
+    pool.release(a)
+    pool.clear()
+    assert len(pool) == 0
+
+
+def test_out() -> None:
+    wrapper = _wrapper()
+    ref = int1e("kin", wrapper)
+
+    out = torch.full_like(ref, float("nan"))
+    res = int1e("kin", wrapper, out=out)
+    assert res.data_ptr() == out.data_ptr()
+    assert pytest.approx(ref.numpy()) == out.numpy()
+
+    # non-contiguous output buffers are filled with a copy
+    outT = torch.zeros_like(ref).mT
+    int1e("kin", wrapper, out=outT)
+    assert pytest.approx(ref.numpy()) == outT.numpy()
+
+    with pytest.raises(ValueError):
+        int1e("kin", wrapper, out=torch.empty(1, 1))
+
+    with pytest.raises(ValueError):
+        int1e("kin", wrapper, out=torch.empty_like(ref, requires_grad=True))
+
+
+def test_out_pool_steady_state() -> None:
+    wrapper = _wrapper()
+    pool = WorkspacePool()
+
+    s0 = overlap(wrapper, pool=pool)
+    ptr = s0.data_ptr()
+    ref = s0.clone()
+    pool.release(s0)
+
+    for _ in range(3):
+        s = overlap(wrapper, pool=pool)
+        assert s.data_ptr() == ptr
+        assert pytest.approx(ref.numpy()) == s.numpy()
+        pool.release(s)
+
+
+def test_out_grad() -> None:
+    wrapper = _wrapper(requires_grad=True)
+    pos = wrapper.params[2]
+
+    (grad_ref,) = torch.autograd.grad(overlap(wrapper).sum(), pos)
+
+    out = torch.empty(wrapper.nao(), wrapper.nao(), dtype=torch.double)
+    (grad,) = torch.autograd.grad(overlap(wrapper, out=out).sum(), pos)
+    assert pytest.approx(grad_ref.numpy()) == grad.numpy()
@@ -0,0 +1,149 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test construction of the libcint wrapper.
+"""
+
+from __future__ import annotations
+
+import pytest
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis
+from tad_libcint.interface.wrapper import LibcintWrapper
+
+from .utils import get_atombases
+
+
+def _atombases() -> list[AtomCGTOBasis]:
+    shells = {
+        "s": ([3.0, 0.5], [0.4, 0.6]),
+        "p": ([1.2], [1.0]),
+        "d": ([2.0, 0.8, 0.3], [0.2, 0.5, 0.3]),
+    }
+    pos = [[0.0, 0.0, 0.0], [0.0, 0.0, 1.4]]
+    return get_atombases([(6, "spd"), (1, "s")], pos, shells=shells)
+
+
+@pytest.mark.parametrize("spherical", [True, False])
+def test_maps(spherical: bool) -> None:
+    wrapper = LibcintWrapper(_atombases(), spherical=spherical)
+
+    naos = [1, 3, 5, 1] if spherical else [1, 3, 6, 1]
+    aoloc = [0]
+    for n in naos:
+        aoloc.append(aoloc[-1] + n)
+
+    assert wrapper.full_shell_to_aoloc.tolist() == aoloc
+    assert wrapper.nao() == aoloc[-1]
+
+    ao2shell = sum(([i] * n for i, n in enumerate(naos)), [])
+    assert wrapper.full_ao_to_shell.tolist() == ao2shell
+
+    ao2atom = [0] * sum(naos[:3]) + [1] * naos[3]
+    assert wrapper.full_ao_to_atom.tolist() == ao2atom
+
+    assert wrapper.full_angmoms.tolist() == [0, 0, 1, 2, 2, 2, 0, 0]
+
+
+def test_env() -> None:
+    atombases = _atombases()
+    wrapper = LibcintWrapper(atombases)
+    atm, bas, env = wrapper.atm_bas_env
+
+    assert atm[:, 0].tolist() == [6, 1]
+    for iat, atombasis in enumerate(atombases):
+        ptr = atm[iat, 1]
+        assert env[ptr : ptr + 3].tolist() == atombasis.pos.tolist()
+
+    shells = [sh for atombasis in atombases for sh in atombasis.bases]
+    assert bas[:, 0].tolist() == [0, 0, 0, 1]
+    for ish, shell in enumerate(shells):
+        assert bas[ish, 1] == shell.angmom
+
+        nprim = bas[ish, 2]
+        ptr_exp, ptr_coeff = bas[ish, 5], bas[ish, 6]
+        assert env[ptr_exp : ptr_exp + nprim].tolist() == shell.alphas.tolist()
+        assert (
+            env[ptr_coeff : ptr_coeff + nprim].tolist() == shell.coeffs.tolist()
+        )
+
+
+def test_uncontracted() -> None:
+    wrapper = LibcintWrapper(_atombases())
+    uwrapper, uao2ao = wrapper.get_uncontracted_wrapper()
+
+    assert len(uwrapper) == 8
+    ref = [0, 0, 1, 2, 3, 4, 5, 6, 7, 8] + [4, 5, 6, 7, 8] * 2 + [9, 9]
+    assert uao2ao.tolist() == ref
+
+
+def test_update_positions() -> None:
+    wrapper = LibcintWrapper(_atombases())
+    uwrapper, _ = wrapper.get_uncontracted_wrapper()
+    version = wrapper.env_version
+
+    pos = torch.tensor([[0.1, 0.2, 0.3], [-0.4, 0.5, 1.6]], dtype=torch.double)
+    wrapper.update_positions(pos)
+
+    assert wrapper.env_version == version + 1
+    assert wrapper.params[2] is pos
+    for w in (wrapper, uwrapper):
+        atm, _, env = w.atm_bas_env
+        for iat in range(2):
+            ptr = atm[iat, 1]
+            assert env[ptr : ptr + 3].tolist() == pos[iat].tolist()
+            assert w.atombases[iat].pos.tolist() == pos[iat].tolist()
+
+    with pytest.raises(ValueError):
+        wrapper.update_positions(pos[:1])
+
+
+def test_at_positions() -> None:
+    wrapper = LibcintWrapper(_atombases())
+    pos0 = wrapper.params[2]
+    pos = pos0 + 1.0
+
+    with wrapper.at_positions(pos):
+        assert wrapper.params[2] is pos
+
+    assert wrapper.params[2] is pos0
+    atm, _, env = wrapper.atm_bas_env
+    assert env[atm[1, 1] : atm[1, 1] + 3].tolist() == pos0[1].tolist()
+
+
+def test_accuracy() -> None:
+    wrapper = LibcintWrapper(_atombases())
+    uwrapper, _ = wrapper.get_uncontracted_wrapper()
+    version = wrapper.env_version
+    assert wrapper.accuracy == "tight"
+    assert wrapper.atm_bas_env[2][0] == 60.0
+
+    wrapper.set_accuracy("loose")
+    assert wrapper.env_version == version + 1
+    for w in (wrapper, uwrapper, wrapper[1:]):
+        assert w.accuracy == "loose"
+        assert w.atm_bas_env[2][0] == 20.0
+
+    # no change, no new version
+    wrapper.set_accuracy("loose")
+    assert wrapper.env_version == version + 1
+
+    with pytest.raises(ValueError):
+        wrapper.set_accuracy("sloppy")
+    with pytest.raises(ValueError):
+        LibcintWrapper(_atombases(), accuracy="sloppy")
@@ -0,0 +1,129 @@
+# This file is part of tad-libcint.
+#
+# SPDX-Identifier: Apache-2.0
+# Copyright (C) 2024 Grimme Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test utilities for the construction of small molecules.
+"""
+
+from __future__ import annotations
+
+import torch
+
+from tad_libcint.basis import AtomCGTOBasis, CGTOBasis
+from tad_libcint.interface.wrapper import LibcintWrapper
+from tad_libcint.typing import Any, Sequence, Tensor
+
+__all__ = ["DD", "get_atombases", "get_wrapper"]
+
+
+DD: dict[str, Any] = {"dtype": torch.double}
+
+# exponents and coefficients of the default shells, the contracted s shell
+# has two primitives, all other shells only one
+SHELLS: dict[str, tuple[list[float], list[float]]] = {
+    "s": ([1.0, 0.3], [0.6, 0.4]),
+    "p": ([0.5], [1.0]),
+    "d": ([0.8], [1.0]),
+}
+
+
+def get_atombases(
+    atoms: Sequence[tuple[int, str]],
+    positions: Sequence[Sequence[float]] | Tensor,
+    contracted: bool = True,
+    requires_grad: bool = False,
+    shells: dict[str, tuple[list[float], list[float]]] | None = None,
+) -> list[AtomCGTOBasis]:
+    """
+    Create the bases of the atoms.
+
+    Parameters
+    ----------
+    atoms : Sequence[tuple[int, str]]
+        Atomic number and shells (e.g., "sp") of every atom. Atoms without
+        shells (e.g., padding) are allowed.
+    positions : Sequence[Sequence[float]] | Tensor
+        Positions of the atoms of shape `(natoms, 3)`. Tensors are used
+        as is.
+    contracted : bool, optional
+        Whether the s shells are contracted (two primitives) or consist of
+        the first primitive only. Defaults to `True`.
+    requires_grad : bool, optional
+        Whether the positions, exponents and coefficients require gradients.
+        Defaults to `False`.
+    shells : dict[str, tuple[list[float], list[float]]] | None, optional
+        Exponents and coefficients of the shells. Defaults to `None`, i.e.,
+        :data:`SHELLS`.
+
+    Returns
+    -------
+    list[AtomCGTOBasis]
+        Bases of the atoms.
+    """
+
+    def t(x: Sequence[float]) -> Tensor:
+        return torch.tensor(x, **DD).requires_grad_(requires_grad)
+
+    basis = SHELLS if shells is None else shells
+
+    def shell(symbol: str) -> CGTOBasis:
+        alphas, coeffs = basis[symbol]
+        if contracted is False:
+            alphas, coeffs = alphas[:1], [1.0]
+        return CGTOBasis("spd".index(symbol), t(alphas), t(coeffs))
+
+    if not isinstance(positions, Tensor):
+        positions = t(positions)
+
+    return [
+        AtomCGTOBasis(z, [shell(sym) for sym in symbols], pos)
+        for (z, symbols), pos in zip(atoms, positions)
+    ]
+
+
+def get_wrapper(
+    atoms: Sequence[tuple[int, str]],
+    positions: Sequence[Sequence[float]] | Tensor,
+    contracted: bool = True,
+    requires_grad: bool = False,
+    shells: dict[str, tuple[list[float], list[float]]] | None = None,
+) -> LibcintWrapper:
+    """
+    Create the wrapper of a molecule (see :func:`get_atombases`).
+
+    Parameters
+    ----------
+    atoms : Sequence[tuple[int, str]]
+        Atomic number and shells (e.g., "sp") of every atom.
+    positions : Sequence[Sequence[float]] | Tensor
+        Positions of the atoms of shape `(natoms, 3)`.
+    contracted : bool, optional
+        Whether the s shells are contracted. Defaults to `True`.
+    requires_grad : bool, optional
+        Whether the positions, exponents and coefficients require gradients.
+        Defaults to `False`.
+    shells : dict[str, tuple[list[float], list[float]]] | None, optional
+        Exponents and coefficients of the shells. Defaults to `None`.
+
+    Returns
+    -------
+    LibcintWrapper
+        Wrapper of the molecule.
+    """
+    atombases = get_atombases(
+        atoms, positions, contracted, requires_grad, shells
+    )
+    return LibcintWrapper(atombases)